@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+#################################################################################
+# INTEL CONFIDENTIAL
+# Copyright Intel Corporation All Rights Reserved.
+#
+# The source code contained or described herein and all documents related to
+# the source code ("Material") are owned by Intel Corporation or its suppliers
+# or licensors. Title to the Material remains with Intel Corporation or its
+# suppliers and licensors. The Material may contain trade secrets and proprietary
+# and confidential information of Intel Corporation and its suppliers and
+# licensors, and is protected by worldwide copyright and trade secret laws and
+# treaty provisions. No part of the Material may be used, copied, reproduced,
+# modified, published, uploaded, posted, transmitted, distributed, or disclosed
+# in any way without Intel's prior express written permission.
+#
+# No license under any patent, copyright, trade secret or other intellectual
+# property right is granted to or conferred upon you by disclosure or delivery
+# of the Materials, either expressly, by implication, inducement, estoppel or
+# otherwise. Any license under such intellectual property rights must be express
+# and approved by Intel in writing.
+#################################################################################
+import re
+import threading
+
+
+class DepexSyntaxError(ValueError):
+    """Raised when a bios knob depex expression can not be parsed"""
+
+
+class CompiledDepex(object):
+    """
+    Bios knob depex compiled to closures. Each closure takes a function which returns the current int value
+    of a knob by name and returns the bool result of the Sif / Gif condition.
+    """
+    __slots__ = ("depex", "suppress_if", "gray_out_if")
+
+    def __init__(self, depex, suppress_if, gray_out_if):
+        self.depex = depex
+        self.suppress_if = tuple(suppress_if)
+        self.gray_out_if = tuple(gray_out_if)
+
+    def is_suppressed(self, get_value):
+        """Checks if any Sif condition of the depex is true"""
+        return any(condition(get_value) for condition in self.suppress_if)
+
+    def is_grayed_out(self, get_value):
+        """Checks if any Gif condition of the depex is true"""
+        return any(condition(get_value) for condition in self.gray_out_if)
+
+
+class DepexParser(object):
+    """
+    Recursive descent parser of the bios knob depex grammar used in PlatformConfig.xml e.g.
+    "Sif( KnobA _EQU_ 0 ) _AND_ Gif( KnobB _NEQ_ 1 _OR_ KnobC _EQU_ 2 )".
+
+    Top level terms are Sif / Gif conditions joined with _AND_ / _OR_, other top level terms are ignored.
+    Compiled expressions are cached by the depex string.
+    """
+    SUPPRESS_IF = "Sif"
+    GRAY_OUT_IF = "Gif"
+    TRUE = "TRUE"
+    FALSE = "FALSE"
+
+    _AND = "and"
+    _OR = "or"
+    _NOT = "not"
+    _COMPARE_OPERATORS = {
+        "_EQU_": lambda left, right: left == right,
+        "_NEQ_": lambda left, right: left != right,
+        "_LTE_": lambda left, right: left <= right,
+        "_GTE_": lambda left, right: left >= right,
+        "_LT_": lambda left, right: left < right,
+        "_GT_": lambda left, right: left > right,
+    }
+    _LOGICAL_OPERATORS = {"_AND_": _AND, "AND": _AND, "_OR_": _OR, "OR": _OR, "_NOT_": _NOT, "NOT": _NOT}
+
+    # operators are only split out where they are not part of a knob name, e.g. Knob_OR_Mode is a single name.
+    # \b can not be used as the operators start and end with the word character '_'.
+    _OPERATOR_REGEX = re.compile(r"(?<![\w.\[\]])(_EQU_|_NEQ_|_LTE_|_GTE_|_LT_|_GT_|_AND_|_OR_|_NOT_)(?![\w.\[\]])")
+    _TOKEN_REGEX = re.compile(r"\s*(?:(?P<hex>0[xX][0-9A-Fa-f]+)\b|(?P<number>\d+)\b|(?P<name>[A-Za-z_][\w.\[\]]*)|"
+                              r"(?P<paren>[()]))")
+
+    _cache = {}
+    _lock = threading.Lock()
+
+    def __init__(self, depex):
+        self.depex = depex
+        self._tokens = self._tokenize(depex)
+        self._position = 0
+
+    @classmethod
+    def compile(cls, depex):
+        """
+        Compiles the depex expression, the result is cached by the depex string.
+
+        :param depex: depex expression
+        :return: CompiledDepex object
+        :raise: DepexSyntaxError - if the depex can not be parsed
+        """
+        depex = (depex or cls.TRUE).strip()
+        with cls._lock:
+            compiled = cls._cache.get(depex)
+        if compiled is None:
+            compiled = cls(depex)._parse()
+            with cls._lock:
+                cls._cache[depex] = compiled
+        return compiled
+
+    @classmethod
+    def _tokenize(cls, depex):
+        """Splits the depex into a list of (kind, value) tokens"""
+        tokens = []
+        for chunk in cls._OPERATOR_REGEX.split(depex):
+            if chunk in cls._COMPARE_OPERATORS:
+                tokens.append(("compare", chunk))
+                continue
+            if chunk in cls._LOGICAL_OPERATORS:
+                tokens.append((cls._LOGICAL_OPERATORS[chunk], chunk))
+                continue
+            position = 0
+            chunk = chunk.rstrip()
+            while position < len(chunk):
+                match = cls._TOKEN_REGEX.match(chunk, position)
+                if not match:
+                    raise DepexSyntaxError("Unexpected character '{}' in depex '{}'".format(chunk[position], depex))
+                position = match.end()
+                if match.group("hex"):
+                    tokens.append(("number", int(match.group("hex"), 16)))
+                elif match.group("number"):
+                    # depex values are decimal, a leading zero does not make the value octal
+                    tokens.append(("number", int(match.group("number"), 10)))
+                elif match.group("paren"):
+                    tokens.append((match.group("paren"), match.group("paren")))
+                else:
+                    name = match.group("name")
+                    tokens.append((cls._LOGICAL_OPERATORS.get(name, "name"), name))
+        return tokens
+
+    def _peek(self, offset=0):
+        """Gets the kind of the token at the offset from the current position"""
+        position = self._position + offset
+        if position < len(self._tokens):
+            return self._tokens[position][0]
+        return None
+
+    def _next(self, expected_kind=None):
+        """Consumes the current token"""
+        if self._position >= len(self._tokens):
+            raise DepexSyntaxError("Unexpected end of depex '{}'".format(self.depex))
+        kind, value = self._tokens[self._position]
+        if expected_kind and kind != expected_kind:
+            raise DepexSyntaxError("Expected '{}' but found '{}' in depex '{}'".format(expected_kind, value,
+                                                                                      self.depex))
+        self._position += 1
+        return value
+
+    def _parse(self):
+        """Parses the top level Sif / Gif terms"""
+        suppress_if = []
+        gray_out_if = []
+        while self._peek() is not None:
+            is_condition = self._peek() == "name" and self._peek(1) == "(" and \
+                self._tokens[self._position][1] in (self.SUPPRESS_IF, self.GRAY_OUT_IF)
+            if is_condition:
+                conditions = suppress_if if self._next() == self.SUPPRESS_IF else gray_out_if
+                self._next("(")
+                conditions.append(self._parse_or())
+                self._next(")")
+            else:
+                self._parse_or()
+            if self._peek() in (self._AND, self._OR):
+                self._next()
+            elif self._peek() is not None:
+                raise DepexSyntaxError("Unexpected '{}' in depex '{}'".format(self._tokens[self._position][1],
+                                                                            self.depex))
+        return CompiledDepex(self.depex, suppress_if, gray_out_if)
+
+    def _parse_or(self):
+        """expression := and_expression ('_OR_' and_expression)*"""
+        operands = [self._parse_and()]
+        while self._peek() == self._OR:
+            self._next()
+            operands.append(self._parse_and())
+        if len(operands) == 1:
+            return operands[0]
+        return lambda get_value: any(operand(get_value) for operand in operands)
+
+    def _parse_and(self):
+        """and_expression := not_expression ('_AND_' not_expression)*"""
+        operands = [self._parse_not()]
+        while self._peek() == self._AND:
+            self._next()
+            operands.append(self._parse_not())
+        if len(operands) == 1:
+            return operands[0]
+        return lambda get_value: all(operand(get_value) for operand in operands)
+
+    def _parse_not(self):
+        """not_expression := '_NOT_' not_expression | comparison"""
+        if self._peek() == self._NOT:
+            self._next()
+            operand = self._parse_not()
+            return lambda get_value: not operand(get_value)
+        return self._parse_comparison()
+
+    def _parse_comparison(self):
+        """comparison := operand (compare_operator operand)?"""
+        left = self._parse_operand()
+        if self._peek() != "compare":
+            return left
+        compare = self._COMPARE_OPERATORS[self._next()]
+        right = self._parse_operand()
+        return lambda get_value: compare(left(get_value), right(get_value))
+
+    def _parse_operand(self):
+        """operand := '(' expression ')' | number | TRUE | FALSE | knob name"""
+        kind = self._peek()
+        if kind == "(":
+            self._next()
+            expression = self._parse_or()
+            self._next(")")
+            return expression
+        if kind == "number":
+            number = self._next()
+            return lambda get_value: number
+        name = self._next("name")
+        if name.upper() == self.TRUE:
+            return lambda get_value: True
+        if name.upper() == self.FALSE:
+            return lambda get_value: False
+        return lambda get_value: get_value(name)
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+#################################################################################
+# INTEL CONFIDENTIAL
+# Copyright Intel Corporation All Rights Reserved.
+#
+# The source code contained or described herein and all documents related to
+# the source code ("Material") are owned by Intel Corporation or its suppliers
+# or licensors. Title to the Material remains with Intel Corporation or its
+# suppliers and licensors. The Material may contain trade secrets and proprietary
+# and confidential information of Intel Corporation and its suppliers and
+# licensors, and is protected by worldwide copyright and trade secret laws and
+# treaty provisions. No part of the Material may be used, copied, reproduced,
+# modified, published, uploaded, posted, transmitted, distributed, or disclosed
+# in any way without Intel's prior express written permission.
+#
+# No license under any patent, copyright, trade secret or other intellectual
+# property right is granted to or conferred upon you by disclosure or delivery
+# of the Materials, either expressly, by implication, inducement, estoppel or
+# otherwise. Any license under such intellectual property rights must be express
+# and approved by Intel in writing.
+#################################################################################
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+import six
+
+if six.PY2:
+    import ConfigParser as config_parser
+if six.PY3:
+    import configparser as config_parser
+
+from src.bios_mapper.bios_mapper import BiosMapper
+
+# Single knob of a bios knob config file, unique_name is None when the knob is not applicable
+# for the product family the knob set was loaded for
+BiosKnobEntry = namedtuple("BiosKnobEntry", ["section", "name", "unique_name", "target"])
+
+
+class BiosKnobSet(object):
+    """
+    Immutable set of knobs parsed from a bios knob config file and resolved through the BiosMapper.
+    """
+    __slots__ = ("_entries", "product_family")
+
+    def __init__(self, entries, product_family=None):
+        object.__setattr__(self, "_entries", tuple(entries))
+        object.__setattr__(self, "product_family", product_family)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("BiosKnobSet is immutable")
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def knob_values(self):
+        """Gets the knob name from the config file to target value mapping"""
+        return OrderedDict((entry.name, entry.target) for entry in self._entries)
+
+    @property
+    def mapped_knob_values(self):
+        """Gets the platform unique knob name to target value mapping of the applicable knobs"""
+        return OrderedDict((entry.unique_name, entry.target) for entry in self._entries
+                           if entry.unique_name is not None)
+
+    @property
+    def applicable_entries(self):
+        """Gets the knobs which are applicable for the product family"""
+        return tuple(entry for entry in self._entries if entry.unique_name is not None)
+
+    @property
+    def not_applicable_names(self):
+        """Gets the knob names which are not applicable for the product family"""
+        return tuple(entry.name for entry in self._entries if entry.unique_name is None)
+
+
+class BiosKnobLoader(object):
+    """
+    Loads bios knob config files into BiosKnobSet objects.
+
+    Parsed knob sets are memoized by the content hash of the file, and their resolved knob sets by the product
+    family, with an LRU bound. The content hash is memoized by the file path, modification time and size. Loading
+    an unchanged file again costs a stat call, no file read, config parsing or BiosMapper lookups.
+
+    The file is parsed with ConfigParser like BiosUtil always did, which raises on duplicate sections or
+    options. The line mode keeps the tolerant Name=/Target= line parsing of the XmlCli knob files, where
+    malformed lines are skipped and the last Target of a duplicated Name wins.
+    """
+    KEY_NAME = 'Name'
+    KEY_TARGET = 'Target'
+    TARGET_STRIP_CHARS = '"\n "'
+    MAX_CACHED_KNOB_SETS = 64
+
+    _knob_sets = OrderedDict()
+    _file_hashes = {}
+    _mappers = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def load(cls, knob_file, product_family=None, bios_mapper=None, line_mode=False):
+        """
+        Loads the bios knob config file.
+
+        :param knob_file: Bios knob config file
+        :param product_family: product family to resolve the knob names for, None to keep the names as is
+        :param bios_mapper: BiosMapper object of the product family, created when not passed
+        :param line_mode: parse the Name= and Target= lines without ConfigParser, skipping malformed lines
+        :return: BiosKnobSet object
+        :raise: KeyError - if any section does not have the Name attribute.
+        :raise: IOError/OSError - if the knob file does not exist.
+        """
+        file_hash, content = cls._get_file_hash(knob_file)
+        cache_key = (file_hash, line_mode)
+        knob_set = cls._get_cached_knob_set(cache_key)
+        if knob_set is None:
+            if content is None:
+                with open(knob_file, "rb") as f:
+                    content = f.read()
+            if line_mode:
+                knob_set = cls._parse_lines(content.decode("utf-8"), None, None)
+            else:
+                knob_set = cls._parse(knob_file, content.decode("utf-8"), None, None)
+            cls._put_cached_knob_set(cache_key, knob_set)
+
+        if product_family is None and bios_mapper is None:
+            return knob_set
+        return cls.resolve(knob_set, product_family, bios_mapper)
+
+    @classmethod
+    def resolve(cls, knob_set, product_family, bios_mapper=None):
+        """
+        Resolves the knob names of a knob set loaded without a product family.
+
+        :param knob_set: BiosKnobSet object loaded without a product family
+        :param product_family: product family to resolve the knob names for
+        :param bios_mapper: BiosMapper object of the product family, created when not passed
+        :return: BiosKnobSet object
+        """
+        # the knob set itself is part of the key, so it is kept alive as long as its resolved knob set is cached
+        cache_key = (knob_set, product_family)
+        resolved_knob_set = cls._get_cached_knob_set(cache_key)
+        if resolved_knob_set is None:
+            resolved_knob_set = BiosKnobSet([entry._replace(
+                unique_name=cls._resolve_name(entry.name, product_family, bios_mapper)) for entry in knob_set],
+                product_family)
+            cls._put_cached_knob_set(cache_key, resolved_knob_set)
+        return resolved_knob_set
+
+    @classmethod
+    def _get_cached_knob_set(cls, cache_key):
+        """Gets the memoized knob set of the key and marks it as the most recently used, None if not memoized"""
+        with cls._lock:
+            knob_set = cls._knob_sets.pop(cache_key, None)
+            if knob_set is not None:
+                cls._knob_sets[cache_key] = knob_set
+            return knob_set
+
+    @classmethod
+    def _put_cached_knob_set(cls, cache_key, knob_set):
+        """Memoizes the knob set, dropping the least recently used knob sets over the LRU bound"""
+        with cls._lock:
+            cls._knob_sets[cache_key] = knob_set
+            while len(cls._knob_sets) > cls.MAX_CACHED_KNOB_SETS:
+                cls._knob_sets.popitem(last=False)
+
+    @classmethod
+    def clear_cache(cls):
+        """Drops all the memoized knob sets and file hashes"""
+        with cls._lock:
+            cls._knob_sets.clear()
+            cls._file_hashes.clear()
+
+    @classmethod
+    def _get_file_hash(cls, knob_file):
+        """
+        Gets the content hash of the knob file, the file is read only when it has changed since the last call.
+
+        :param knob_file: Bios knob config file
+        :return: tuple of content hash and the file content, content is None when the hash was memoized
+        """
+        path = os.path.abspath(knob_file)
+        stat = os.stat(path)
+        file_stamp = (stat.st_mtime, stat.st_size)
+        with cls._lock:
+            memoized = cls._file_hashes.get(path)
+        if memoized and memoized[0] == file_stamp:
+            return memoized[1], None
+
+        with open(path, "rb") as f:
+            content = f.read()
+        file_hash = hashlib.sha1(content).hexdigest()
+        with cls._lock:
+            cls._file_hashes[path] = (file_stamp, file_hash)
+        return file_hash, content
+
+    @classmethod
+    def _get_mapper(cls, product_family):
+        """Gets the shared BiosMapper object of the product family"""
+        with cls._lock:
+            if product_family not in cls._mappers:
+                cls._mappers[product_family] = BiosMapper(product_family)
+            return cls._mappers[product_family]
+
+    @classmethod
+    def _resolve_name(cls, name, product_family, bios_mapper):
+        """Gets the platform unique name of the knob, None when it is not applicable for the product family"""
+        if product_family is not None and bios_mapper is None:
+            bios_mapper = cls._get_mapper(product_family)
+        if bios_mapper is None:
+            return name
+        unique_name = bios_mapper.get_bios_knob_name(name)
+        return None if unique_name == BiosMapper.NOT_APPLICABLE else unique_name
+
+    @classmethod
+    def _parse(cls, knob_file, content, product_family, bios_mapper):
+        """
+        Parses the knob config file content and resolves the knob names.
+
+        :return: BiosKnobSet object
+        """
+        cp = config_parser.ConfigParser()
+        if six.PY2:
+            cp.readfp(io.StringIO(content), knob_file)
+        else:
+            cp.read_string(content, source=knob_file)
+
+        entries = []
+        for section in cp.sections():
+            if not cp.has_option(section, cls.KEY_NAME):
+                raise KeyError("The config file '{}' does not have 'Name' key, please "
+                               "add 'Name' Key..".format(knob_file))
+            name = cp.get(section, cls.KEY_NAME)
+            entries.append(BiosKnobEntry(section, name, cls._resolve_name(name, product_family, bios_mapper),
+                                         cp.get(section, cls.KEY_TARGET)))
+        return BiosKnobSet(entries, product_family)
+
+    @classmethod
+    def _parse_lines(cls, content, product_family, bios_mapper):
+        """
+        Parses the Name= and Target= lines of the knob file content, a Target belongs to the last Name before it.
+        Lines without '=', other keys and a Target before any Name are skipped.
+
+        :return: BiosKnobSet object, section of the entries is the knob name
+        """
+        targets = OrderedDict()
+        name = None
+        for line in content.splitlines():
+            split_line = line.split('=', 1)
+            if len(split_line) != 2:
+                continue
+            key = split_line[0].strip()
+            if key == cls.KEY_NAME:
+                name = split_line[1].strip()
+            elif key == cls.KEY_TARGET and name is not None:
+                targets[name] = split_line[1].strip(cls.TARGET_STRIP_CHARS)
+
+        entries = [BiosKnobEntry(name, name, cls._resolve_name(name, product_family, bios_mapper), target)
+                   for name, target in targets.items()]
+        return BiosKnobSet(entries, product_family)
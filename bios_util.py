@@ -19,30 +19,27 @@
 # otherwise. Any license under such intellectual property rights must be
 # express and approved by Intel in writing.
 ###############################################################################
+import importlib
 import platform
 import re
+import site
 import subprocess
 import sys
+import uuid
+from contextlib import contextmanager
 from zipfile import ZipFile
 import six
 import os
 import time
 from ast import literal_eval
 import xml.etree.ElementTree as ET
-from imp import reload
-from collections import OrderedDict
-from importlib import import_module
+from collections import OrderedDict, namedtuple
 
 if six.PY2:
     from pathlib import Path
 if six.PY3:
     from pathlib2 import Path
 
-if six.PY2:
-    import ConfigParser as config_parser
-if six.PY3:
-    import configparser as config_parser
-
 from dtaf_core.lib.dtaf_constants import OperatingSystems, Framework
 from dtaf_core.lib.os_lib import LinuxDistributions
 from src.lib.bios_constants import BiosSerialPathConstants
@@ -56,6 +53,11 @@ import src.lib.content_exceptions as content_exception
 from src.bios_mapper.bios_mapper import BiosMapper
 from src.lib.dtaf_content_constants import ProviderXmlConfigs
 from src.lib.content_artifactory_utils import ContentArtifactoryUtils
+from src.lib.bios_knob_loader import BiosKnobLoader, BiosKnobSet
+from src.lib.bios_depex import DepexParser
+
+# Result of verifying a single bios knob, actual is None when the knob could not be read
+KnobVerifyResult = namedtuple("KnobVerifyResult", ["name", "expected", "actual", "matched"])
 
 
 class BiosUtil:
@@ -66,6 +68,10 @@ class BiosUtil:
     _bios_obj = None
     _key_target = 'Target'
     _key_name = 'Name'
+    _HEX_VALUE_REGEX = re.compile(r'0x[0-9A-F]+', re.I)
+    PHASE_PARSE = "parse"
+    PHASE_MAP = "map"
+    PHASE_PROVIDER = "provider"
 
     def __init__(self, cfg_opts, bios_config_file=None, bios_obj=None, log=None, common_content_lib=None):
         self.bios_config_file = bios_config_file  # Assigning test config.cfg file to var
@@ -76,44 +82,125 @@ class BiosUtil:
         self._product_family = common_content_lib.get_platform_family()
         self._bios_mapper = BiosMapper(self._product_family)
 
-    def _populate_arguments(self, cp, list_sections):
+    def _load_knob_set(self, bios_config_file, map_names=True):
         """
-        Method to populate arguments for calling set_bios_knobs based on Name attribute.
-        Go through each section, filter by Name attribute and creates the arguments list
-
-        :param cp: config parser object
-        :param list_sections: list of sections in config file
+        Method to load the bios knob config file through the shared knob loader, so repeated loads of an
+        unchanged file do no parsing and no bios mapper lookups.
 
-        :return: list of arguments with Name attribute
-        :raise: RuntimeError - if section data is not correct.
+        :param bios_config_file: Bios configuration file
+        :param map_names: False to keep the knob names of the file, see _map_knob_set
+        :return: BiosKnobSet object resolved for the product family, empty when the file does not exist like
+        ConfigParser.read which ignores missing files
+        :raise: KeyError - if any section does not have the Name attribute.
         """
+        if not os.path.isfile(bios_config_file):
+            self._log.warning("Bios config file '{}' does not exist".format(bios_config_file))
+            return BiosKnobSet((), self._product_family)
         try:
-            list_args = []
-            for section in list_sections:
-                is_key_name_avail = cp.has_option(section, self._key_name)
-
-                if not is_key_name_avail:
-                    raise KeyError("The config file '{}' does not have 'Name' key, please "
-                                   "add 'Name' Key..".format(self.bios_config_file))
-
-                value_to_set = cp.get(section, self._key_target)
-                name = cp.get(section, self._key_name)
-
-                # get platform unique name if one exists
-                unique_name = self._bios_mapper.get_bios_knob_name(name)
-                if unique_name == BiosMapper.NOT_APPLICABLE:
-                    self._log.info("The bios knob name '{}' is not applicable for product "
-                                   "family '{}'".format(name, self._product_family))
-                    continue
-
-                list_args.append('"' + unique_name + '"')
-                list_args.append(str(value_to_set))
-
-            return list_args
+            knob_set = BiosKnobLoader.load(bios_config_file)
         except Exception as ex:
-            log_error = "Exception while reading bios config file '{}'".format(self.bios_config_file)
+            log_error = "Exception while reading bios config file '{}'".format(bios_config_file)
             self._log.error(log_error)
             raise ex
+        if map_names:
+            knob_set = self._map_knob_set(knob_set)
+        return knob_set
+
+    def _map_knob_set(self, knob_set):
+        """
+        Method to resolve the knob names of a loaded knob set to the platform unique names through the bios
+        mapper, the resolved knob set is memoized by the knob loader.
+
+        :param knob_set: BiosKnobSet object loaded without a product family
+        :return: BiosKnobSet object resolved for the product family
+        """
+        knob_set = BiosKnobLoader.resolve(knob_set, self._product_family, self._bios_mapper)
+        for name in knob_set.not_applicable_names:
+            self._log.info("The bios knob name '{}' is not applicable for product "
+                           "family '{}'".format(name, self._product_family))
+        return knob_set
+
+    def _map_knob_names(self, knob_values):
+        """
+        Method to resolve the knob names to the platform unique names through the bios mapper.
+        Knobs which are not applicable for the product family are dropped.
+
+        :param knob_values: mapping of knob name to target value
+        :return: OrderedDict of platform unique knob name to target value
+        """
+        mapped_knob_values = OrderedDict()
+        for name, value in knob_values.items():
+            unique_name = self._bios_mapper.get_bios_knob_name(name)
+            if unique_name == BiosMapper.NOT_APPLICABLE:
+                self._log.info("The bios knob name '{}' is not applicable for product "
+                               "family '{}'".format(name, self._product_family))
+                continue
+            mapped_knob_values[unique_name] = value
+        return mapped_knob_values
+
+    @staticmethod
+    def _convert_knob_value(value):
+        """
+        Converts the config file target text to the value type expected by the bios provider.
+        Numbers and quoted strings are read as python literals, anything else is passed as plain text.
+
+        :param value: target value of the knob
+        :return: int, float or str value of the knob
+        """
+        if not isinstance(value, six.string_types):
+            return value
+        value = value.strip()
+        try:
+            converted_value = literal_eval(value)
+        except (ValueError, SyntaxError):
+            return value
+        if isinstance(converted_value, six.string_types + (int, float)):
+            return converted_value
+        return value
+
+    def set_bios_knob_values(self, knob_values):
+        """
+        Method to set a batch of bios knobs with a single call to the bios provider.
+
+        :param knob_values: mapping of knob name to target value e.g. {"ProcessorHyperThreadingDisable": 0x1}
+        :return: dict with the time in seconds spent in the 'map' and 'provider' phases
+        :raise: RuntimeError - if failed to set the bios knobs.
+        """
+        timings = OrderedDict()
+        start_time = time.time()
+        mapped_knob_values = self._map_knob_names(knob_values)
+        timings[self.PHASE_MAP] = time.time() - start_time
+        timings.update(self._set_mapped_knob_values(mapped_knob_values))
+        return timings
+
+    def _set_mapped_knob_values(self, mapped_knob_values):
+        """
+        Sets the already mapped bios knobs with a single call to the bios provider.
+
+        :param mapped_knob_values: mapping of platform unique knob name to target value
+        :return: dict with the time in seconds spent in the 'provider' phase
+        :raise: RuntimeError - if failed to set the bios knobs.
+        """
+        timings = OrderedDict()
+        if not mapped_knob_values:
+            self._log.warning("BIOS knob list was blank, no BIOS knobs were changed.")
+            return timings
+
+        list_args = []
+        for name, value in mapped_knob_values.items():
+            list_args.extend([name, self._convert_knob_value(value)])
+
+        start_time = time.time()
+        ret_value = self._bios_obj.set_bios_knobs(*list_args, overlap=True)
+        timings[self.PHASE_PROVIDER] = time.time() - start_time
+
+        if not ret_value[0]:
+            error_log = "Failed to set the bios knobs due to error '{}'".format(ret_value[1])
+            self._log.error(error_log)
+            raise RuntimeError(error_log)
+
+        self._log.info("Set {} bios knobs in a single provider call..".format(len(mapped_knob_values)))
+        return timings
 
     def set_bios_knob(self, bios_config_file=None):
         """
@@ -122,127 +209,141 @@ class BiosUtil:
         2. Set the bios knobs according to the cfg file options.
 
         :param bios_config_file: Bios configuration file
-        :return: None
+        :return: dict with the time in seconds spent in the 'parse', 'map' and 'provider' phases
         :raise: RuntimeError - if failed to set the bios knob.
         """
 
         try:
-            cp = config_parser.ConfigParser()
             if not bios_config_file:
                 bios_config_file = self.bios_config_file
-            cp.read(bios_config_file)
-            list_sections = cp.sections()
-            list_args = self._populate_arguments(cp, list_sections)
-
-            if len(list_args) > 0:
-                call_func_set_bios_knobs = "self._bios_obj.set_bios_knobs("
-                for arg in list_args:
-                    call_func_set_bios_knobs = call_func_set_bios_knobs + arg + ", "
-
-                call_func_set_bios_knobs = call_func_set_bios_knobs + "overlap=True)"
+            timings = OrderedDict()
+            start_time = time.time()
+            knob_set = self._load_knob_set(bios_config_file, map_names=False)
+            timings[self.PHASE_PARSE] = time.time() - start_time
 
-                # call set_bios_knobs function now
-                ret_value = eval(call_func_set_bios_knobs)
-
-                if not ret_value[0]:
-                    error_log = "Failed to set the bios knobs due to error '{}'".format(ret_value[1])
-                    self._log.error(error_log)
-                    raise RuntimeError(error_log)
-
-                self._log.info("Bios knobs are set as per test case config..")
-            else:
+            if not len(knob_set):
                 self._log.warning("BIOS knob config file was blank, no BIOS knobs were changed.")
+                return timings
+
+            start_time = time.time()
+            knob_set = self._map_knob_set(knob_set)
+            timings[self.PHASE_MAP] = time.time() - start_time
+            timings.update(self._set_mapped_knob_values(knob_set.mapped_knob_values))
+            self._log.debug("Bios knob set timings in seconds: {}".format(
+                ", ".join("{}={:.3f}".format(phase, seconds) for phase, seconds in timings.items())))
+            self._log.info("Bios knobs are set as per test case config..")
+            return timings
 
         except Exception as ex:
             self._log.error("Failed to set knob due to exception '{}'..".format(ex))
             raise ex
 
-    # def verify_bios_knob(self):
-    #     """
-    #     Method to verify the bios knobs.
-    #     1. Parsing through the cfg file to get the sections and its options for verification.
-    #     2. Verifying the bios knobs against the cfg file option at the 0th index.
-    #
-    #     :return: None
-    #     :raise: RuntimeError - if Failed to read the knob / Knob is not set correctly
-    #     """
-    #     try:
-    #         cp = config_parser.ConfigParser()
-    #         cp.read(self.bios_config_file)
-    #         list_sections = cp.sections()
-    #
-    #         list_args= self._populate_arguments(cp, list_sections)
-    #
-    #         if len(list_args) > 0:
-    #             call_func_read_bios_knobs = "self._bios_obj.read_bios_knobs("
-    #             for arg in list_args:
-    #                 call_func_read_bios_knobs = call_func_read_bios_knobs + arg + ", "
-    #
-    #             call_func_read_bios_knobs = call_func_read_bios_knobs + "hexa=True)"
-    #
-    #             # call set_bios_knobs function now
-    #             eval(call_func_read_bios_knobs)
-    #
-    #     except Exception as ex:
-    #         self._log.error("Error while reading the bios knob with exception = '{}'".format(ex))
-    #         raise RuntimeError("Error while reading the bios knob with exception = '{}'".format(ex))
-
-    def verify_bios_knob(self, bios_config_file=None):
+    @staticmethod
+    def _get_expected_knob_value(target):
+        """
+        Gets the expected knob value from the config file target text, which is the first of the comma
+        separated options.
+
+        :param target: target value of the knob
+        :return: int value expected for the knob
+        """
+        if not isinstance(target, six.string_types):
+            return int(target)
+        expected_knob_value = target.split(',')[0]
+        # remove any quotes if present
+        expected_knob_value = expected_knob_value.replace("\"", "").replace("\'", "").strip()
+        return int(expected_knob_value, 0)
+
+    def _read_knob_values(self, names):
+        """
+        Reads the current value of all the given knobs with a single call to the bios provider.
+
+        :param names: platform unique knob names
+        :return: dict of knob name to its current int value, knobs which could not be read are left out
+        :raise: RuntimeError - if failed to read the knobs.
+        """
+        ret_value = self._bios_obj.read_bios_knobs(*names, hexa=True)
+        if not ret_value[0]:
+            error_log = "Failed to read knobs '{}' value due to '{}'..".format(names, ret_value[1])
+            self._log.error(error_log)
+            raise RuntimeError(error_log)
+
+        output_lines = [str(line) for line in ret_value[1]]
+        current_values = {}
+        for index, name in enumerate(names):
+            name_regex = re.compile(r'\b{}\b'.format(re.escape(name)))
+            knob_lines = [line for line in output_lines if name_regex.search(line)]
+            if not knob_lines and len(output_lines) == len(names):
+                # provider output has one line per knob in the requested order
+                knob_lines = [output_lines[index]]
+            hex_values = self._HEX_VALUE_REGEX.findall(" ".join(knob_lines))
+            if hex_values:
+                current_values[name] = int(hex_values[-1], 0)
+        return current_values
+
+    def verify_bios_knob_values(self, knob_values, platform_config_reader=None):
+        """
+        Method to verify a batch of bios knobs against their expected values with one backend round trip.
+        The current values are read with a single bios provider call, or from the given PlatformConfig.xml
+        snapshot when a reader is passed.
+
+        :param knob_values: mapping of knob name to target value
+        :param platform_config_reader: PlatformConfigReader object of an already saved PlatformConfig.xml
+        :return: OrderedDict of platform unique knob name to KnobVerifyResult
+        :raise: RuntimeError - if failed to read the knobs.
+        """
+        return self._verify_mapped_knob_values(self._map_knob_names(knob_values), platform_config_reader)
+
+    def _verify_mapped_knob_values(self, mapped_knob_values, platform_config_reader=None):
+        """
+        Verifies the already mapped bios knobs against their expected values with one backend round trip.
+
+        :param mapped_knob_values: mapping of platform unique knob name to target value
+        :param platform_config_reader: PlatformConfigReader object of an already saved PlatformConfig.xml
+        :return: OrderedDict of platform unique knob name to KnobVerifyResult
+        """
+        names = list(mapped_knob_values.keys())
+        if not names:
+            return OrderedDict()
+
+        if platform_config_reader:
+            current_values = {name: int(value, 0) for name, value in
+                              platform_config_reader.get_knobs_current_values(names).items()}
+        else:
+            current_values = self._read_knob_values(names)
+
+        verify_results = OrderedDict()
+        for name, target in mapped_knob_values.items():
+            expected_knob_value = self._get_expected_knob_value(target)
+            current_knob_value = current_values.get(name)
+            verify_results[name] = KnobVerifyResult(name, expected_knob_value, current_knob_value,
+                                                    current_knob_value == expected_knob_value)
+        return verify_results
+
+    def verify_bios_knob(self, bios_config_file=None, bulk=True):
         """
         Method to verify the bios knobs.
         1. Parsing through the cfg file to get the sections and its options for verification.
         2. Verifying the bios knobs against the cfg file option at the 0th index.
 
+        All the knobs are read with a single bios provider call, the knobs which the bulk read did not return are
+        read one by one.
+
         :param bios_config_file: Bios configuration file
+        :param bulk: False to read every knob with its own bios provider call
         :return: None
         :raise: RuntimeError - if Failed to read the knob / Knob is not set correctly
         """
-        cp = config_parser.ConfigParser()
         if not bios_config_file:
             bios_config_file = self.bios_config_file
-        cp.read(bios_config_file)
-        list_sections = cp.sections()
+        knob_set = self._load_knob_set(bios_config_file)
 
         try:
             ret_val = True
-            for section in list_sections:
-                name = cp.get(section, self._key_name)
-                # get platform unique name if one exists
-                unique_name = self._bios_mapper.get_bios_knob_name(name)
-                if unique_name == BiosMapper.NOT_APPLICABLE:
-                    self._log.info("The bios knob name '{}' is not applicable for product "
-                                   "family '{}'".format(name, self._product_family))
-                    continue
-
-                ret_value = self._bios_obj.read_bios_knobs(str(unique_name), hexa=True)
-
-                self._log.info("Verifying the knob '{}'..".format(section))
-
-                if not ret_value[0]:
-                    error_log = "Failed to read knob '{}' value due to '{}'..".format(section, ret_value[1])
-                    self._log.error(error_log)
-                    ret_val = False
-                    continue
-
-                list_of_numbers = re.findall(r'0x[0-9A-F]+', (' '.join(map(str, ret_value[1]))), re.I)
-                current_knob_value = ' '.join(map(str, list_of_numbers))
-                current_knob_value = int(current_knob_value,0)
-
-                knob_options = (cp.get(section, self._key_target))
-                list_knob_options = str(knob_options).split(',')
-                expected_knob_value = list_knob_options[0]
-                # remove any quotes if present
-                expected_knob_value = expected_knob_value.replace("\"", "")
-                expected_knob_value = expected_knob_value.replace("\'", "")
-                expected_knob_value = int(expected_knob_value,0)
-
-                if current_knob_value == expected_knob_value:
-                    self._log.info("The knob '{}' has been set with correct "
-                                   "value '{}'".format(section, expected_knob_value))
-                else:
-                    self._log.error("The knob '{}' has not been set with correct "
-                                    "value '{}'".format(section, expected_knob_value))
-                    ret_val = False
+            entries = knob_set.applicable_entries
+            if bulk:
+                entries, ret_val = self._verify_bios_knob_bulk(knob_set)
+            ret_val = self._verify_bios_knob_entries(entries) and ret_val
 
             if not ret_val:
                 log_error = "One or more Bios knob values are not set as per test case specification..."
@@ -253,6 +354,73 @@ class BiosUtil:
             self._log.error("Error while reading the bios knob with exception = '{}'".format(ex))
             raise RuntimeError("Error while reading the bios knob with exception = '{}'".format(ex))
 
+    def _verify_bios_knob_entries(self, entries):
+        """
+        Verifies the knobs of the bios config file with one bios provider read per knob.
+
+        :param entries: applicable entries of the BiosKnobSet
+        :return: True if all the knobs are set correctly else False
+        """
+        ret_val = True
+        for entry in entries:
+            section = entry.section
+            ret_value = self._bios_obj.read_bios_knobs(str(entry.unique_name), hexa=True)
+
+            self._log.info("Verifying the knob '{}'..".format(section))
+
+            if not ret_value[0]:
+                error_log = "Failed to read knob '{}' value due to '{}'..".format(section, ret_value[1])
+                self._log.error(error_log)
+                ret_val = False
+                continue
+
+            list_of_numbers = self._HEX_VALUE_REGEX.findall(' '.join(map(str, ret_value[1])))
+            current_knob_value = ' '.join(map(str, list_of_numbers))
+            current_knob_value = int(current_knob_value,0)
+
+            expected_knob_value = self._get_expected_knob_value(entry.target)
+
+            if current_knob_value == expected_knob_value:
+                self._log.info("The knob '{}' has been set with correct "
+                               "value '{}'".format(section, expected_knob_value))
+            else:
+                self._log.error("The knob '{}' has not been set with correct "
+                                "value '{}'".format(section, expected_knob_value))
+                ret_val = False
+        return ret_val
+
+    def _verify_bios_knob_bulk(self, knob_set):
+        """
+        Verifies the knobs of the bios config file with a single bios provider read.
+
+        :param knob_set: BiosKnobSet of the bios config file
+        :return: tuple of the entries left to read one by one, as the bulk read failed or did not return them,
+        and True if the knobs read are set correctly else False
+        """
+        try:
+            verify_results = self._verify_mapped_knob_values(knob_set.mapped_knob_values)
+        except RuntimeError as ex:
+            self._log.warning("Failed to read the bios knobs in bulk due to '{}', reading them one by one".format(ex))
+            return knob_set.applicable_entries, True
+
+        ret_val = True
+        for result in verify_results.values():
+            if result.actual is None:
+                continue
+            if result.matched:
+                self._log.info("The knob '{}' has been set with correct "
+                               "value '{}'".format(result.name, result.expected))
+            else:
+                self._log.error("The knob '{}' has not been set with correct value '{}', current "
+                                "value is '{}'".format(result.name, result.expected, result.actual))
+                ret_val = False
+        unread_entries = tuple(entry for entry in knob_set.applicable_entries
+                               if verify_results[entry.unique_name].actual is None)
+        if unread_entries:
+            self._log.debug("Knobs not returned by the bulk read: {}".format(
+                ", ".join(entry.unique_name for entry in unread_entries)))
+        return unread_entries, ret_val
+
     def load_bios_defaults(self):
         """
         This function will set the bios to its default settings.
@@ -303,27 +471,102 @@ class BiosUtil:
         return value
 
 
+class PlatformConfigKnob(object):
+    """Compact record of a knob in PlatformConfig.xml"""
+    __slots__ = ("name", "current_value", "depex", "options", "_value")
+
+    def __init__(self, name, current_value, depex="TRUE", options=()):
+        """Constructor of PlatformConfigKnob
+
+        @param name: knob name
+        @param current_value: CurrentVal attribute text of the knob
+        @param depex: depex expression of the knob
+        @param options: tuple of (text, value) pairs of the knob options
+        """
+        self.name = name
+        self.current_value = current_value
+        self.depex = depex
+        self.options = options
+        self._value = None
+
+    @classmethod
+    def from_element(cls, knob):
+        """Creates the record from a knob element
+
+        @param knob: knob element of PlatformConfig.xml
+        @return: PlatformConfigKnob object
+        """
+        options = ()
+        options_node = knob.find("options")
+        if options_node is not None:
+            options = tuple((option.get("text"), option.get("value")) for option in options_node)
+        return cls(knob.get("name").strip(), knob.get("CurrentVal"), knob.get("depex") or "TRUE", options)
+
+    @property
+    def value(self):
+        """Gets the current value evaluated as a python literal"""
+        if self._value is None:
+            self._value = literal_eval(self.current_value)
+        return self._value
+
+    def get_option_value(self, text):
+        """Gets the value of the option with the given text
+
+        @param text: option text
+        @return: option value or empty string if the option does not exist
+        """
+        for option_text, option_value in self.options:
+            if option_text == text:
+                return option_value
+        return ""
+
+
+class _LineCallbackReader(object):
+    """File object for ET.iterparse which hands the file over line by line and passes each line to a callback"""
+
+    def __init__(self, xml_file, callback):
+        """
+        @param xml_file: file object opened in binary mode
+        @param callback: called with each line decoded as text
+        """
+        self._file = xml_file
+        self._callback = callback
+
+    def read(self, size=-1):
+        """Reads the next line, size is ignored"""
+        line = self._file.readline()
+        if line:
+            self._callback(line.decode("utf-8", "replace"))
+        return line
+
+
 class PlatformConfigReader(object):
     """Parser for PlatformConfig.xml"""
     _FRONTPAGE_TAG = "FrontPage"
     _PLATFORM_TAG = "PLATFORM"
     _BIOS_INFO = "BIOS"
-    _TPM_REGEX = "Current TPM Device:\s(.*)"
-    _KNOBS_FILE = os.path.dirname(os.path.abspath(__file__)) + "/" + "knobs.py"
+    _COMMENTED_INFO_SEPARATOR = ":"
+    TPM_DEVICE_KEY = "Current TPM Device"
+    # commented information keys holding a firmware version, e.g. 'BIOS Version' or 'TPM Firmware Version'
+    _VERSION_KEY_REGEX = re.compile(r"\bversion\b", re.IGNORECASE)
+    # compiled patterns of the commented information, shared by all the readers
+    _compiled_patterns = {}
     HIDDEN_KNOB_STATUS = "hidden"
     READONLY_KNOB_STATUS = "readonly"
     ACCESSIBLE_KNOB_STATUS = "accessible"
     MEMORY_FREQUENCY_XPATH = './/knob[@name="DdrFreqLimit"]'
+    MEMORY_FREQUENCY_KNOB = "DdrFreqLimit"
 
-    def __init__(self, xml_file, test_log):
+    def __init__(self, xml_file, test_log, streaming=False):
         """Constructor of PlatformConfigReader
 
         @param xml_file: PlatforConfig.xml path to parse
+        @param streaming: True to load the file in a single streaming pass without keeping the DOM, root is
+        None in this mode
         """
-        self.xml_file = xml_file
         self._log = test_log
-        parser = ET.parse(self.xml_file)
-        self.root = parser.getroot()
+        self._streaming = streaming
+        self.update_xml_file(xml_file)
 
     def update_xml_file(self, xml_file):
         """Reloads the parser
@@ -331,32 +574,112 @@ class PlatformConfigReader(object):
         @param xml_file: PlatforConfig.xml path to parse
         """
         self.xml_file = xml_file
+        self._commented_info = None
+        self._commented_info_map = None
+        if self._streaming:
+            self.__load_streaming()
+            return
         parser = ET.parse(self.xml_file)
         self.root = parser.getroot()
+        self._knobs = self.__build_knob_index()
+        self._node_info = {}
+        for tag in (self._FRONTPAGE_TAG, self._BIOS_INFO, self._PLATFORM_TAG):
+            node = self.root.find(tag)
+            if node is not None:
+                self._node_info[tag] = dict(node.attrib)
+
+    def __build_knob_index(self):
+        """Builds the knob name to PlatformConfigKnob index, first knob wins on duplicate names"""
+        knobs = OrderedDict()
+        for knob in self.root.iter("knob"):
+            record = PlatformConfigKnob.from_element(knob)
+            if record.name not in knobs:
+                knobs[record.name] = record
+        return knobs
+
+    def __load_streaming(self):
+        """Loads the knobs, the FrontPage / BIOS / PLATFORM info and the comments in a single iterparse pass,
+        each knob element is dropped as soon as its record is built. The comments are collected from the lines
+        fed to the parser, so the commented info is the same text as in the DOM mode."""
+        self.root = None
+        self._knobs = OrderedDict()
+        self._node_info = {}
+        commented_info = []
+        elements = []
+        with open(self.xml_file, "rb") as xml_file:
+            line_reader = _LineCallbackReader(xml_file, lambda line: self.__add_comment_line(commented_info, line))
+            for event, element in ET.iterparse(line_reader, events=("start", "end")):
+                self.__handle_streaming_event(event, element, elements)
+        self._commented_info = "\n".join(commented_info)
+
+    def __handle_streaming_event(self, event, element, elements):
+        """Handles an iterparse event of the streaming load
+
+        @param event: 'start' or 'end'
+        @param element: element of the event
+        @param elements: stack of the open elements
+        """
+        if event == "start":
+            if len(elements) == 1 and element.tag in (self._FRONTPAGE_TAG, self._BIOS_INFO, self._PLATFORM_TAG):
+                self._node_info.setdefault(element.tag, dict(element.attrib))
+            elements.append(element)
+        else:
+            elements.pop()
+            if element.tag == "knob":
+                record = PlatformConfigKnob.from_element(element)
+                if record.name not in self._knobs:
+                    self._knobs[record.name] = record
+                element.clear()
+                if elements:
+                    elements[-1].remove(element)
+
+    def diff_knobs(self, other):
+        """Gets the knobs whose current value differs between this and another PlatformConfig.xml
+
+        @param other: PlatformConfigReader object to compare with
+        @return: OrderedDict of knob name to (this value, other value), None for a knob missing on one side
+        """
+        knobs_diff = OrderedDict()
+        for name, knob in self._knobs.items():
+            other_knob = other.get_knob(name)
+            other_value = other_knob.current_value if other_knob else None
+            if knob.current_value != other_value:
+                knobs_diff[name] = (knob.current_value, other_value)
+        for name, other_knob in other._knobs.items():
+            if name not in self._knobs:
+                knobs_diff[name] = (None, other_knob.current_value)
+        return knobs_diff
+
+    def get_knob(self, name):
+        """Gets the knob record
+
+        @param name: Knob name
+        @return: PlatformConfigKnob object or None if the knob does not exist
+        """
+        return self._knobs.get(name)
+
+    def __get_node_info(self, tag):
+        """Gets the attributes of the node captured at load time
+
+        @param tag: node tag
+        @return: dict of the node attributes
+        @raise: AttributeError - if the node does not exist, as reading the attributes of a missing node did
+        """
+        if tag not in self._node_info:
+            raise AttributeError("'{}' does not have a {} node".format(self.xml_file, tag))
+        return dict(self._node_info[tag])
 
     def get_postpage_info(self):
         """Gets the bios post page info"""
-        node = self.root.find(self._FRONTPAGE_TAG)
-        info = {}
-        for key, value in node.attrib.items():
-            info[key] = value
-        return info
+        return self.__get_node_info(self._FRONTPAGE_TAG)
 
     def get_bios_version_info(self):
         """Gets the bios info"""
-        node = self.root.find(self._BIOS_INFO)
-        info = {}
-        for key, value in node.attrib.items():
-            info[key] = value
-        return info
+        return self.__get_node_info(self._BIOS_INFO)
 
     def get_platform_info(self):
         """Gets the platform info"""
-        node = self.root.find(self._PLATFORM_TAG)
-        info = {}
-        for key, value in node.attrib.items():
-            info[key] = value
-        return info
+        return self.__get_node_info(self._PLATFORM_TAG)
 
     def get_hexadecimal_value(self, frequency_option):
         """Gets the hexadecimal value of option text
@@ -364,31 +687,80 @@ class PlatformConfigReader(object):
         @param : frequency option text
         @return : returns the hexadecimal value of option text
         """
-        import lxml.etree as etree
-        root = etree.parse(self.xml_file)
-        memory_frequency_node = root.xpath(self.MEMORY_FREQUENCY_XPATH)
-        options_node = memory_frequency_node[0].getchildren()
-        frequency_option_nodes = options_node[0].getchildren()
-        hexadecimal_of_frequency_option = ""
-        for frequency_option_text in frequency_option_nodes:
-            if frequency_option_text.attrib['text'] == frequency_option:
-                hexadecimal_of_frequency_option = frequency_option_text.attrib['value']
-                break
-        return hexadecimal_of_frequency_option
+        return self._knobs[self.MEMORY_FREQUENCY_KNOB].get_option_value(frequency_option)
 
     def get_post_page_memory_size(self):
         """Gets the post page memory size"""
         return self.get_postpage_info()["MemorySize"]
 
+    @staticmethod
+    def __add_comment_line(commented_info, line):
+        """Adds the line without the comment markers if it starts a comment"""
+        if line.strip().startswith("<!--"):
+            commented_info.append(line.strip().strip("<!--").strip("-->").strip())
+
     def __read_commented_info(self):
         """Gets the readonly information which is in the form of text"""
-        commented_info = []
-        with open(self.xml_file) as f:
-            for line in f:
-                if line.strip().startswith("<!--"):
-                    commented_info.append(
-                        line.strip().strip("<!--").strip("-->").strip())
-        return "\n".join(commented_info)
+        if self._commented_info is None:
+            commented_info = []
+            with open(self.xml_file) as f:
+                for line in f:
+                    self.__add_comment_line(commented_info, line)
+            self._commented_info = "\n".join(commented_info)
+        return self._commented_info
+
+    @classmethod
+    def get_compiled_pattern(cls, pattern):
+        """Gets the compiled regex of the pattern from the shared pattern registry
+
+        @param pattern: regex pattern string or compiled pattern
+        @return: compiled pattern
+        """
+        if not isinstance(pattern, six.string_types):
+            return pattern
+        compiled_pattern = cls._compiled_patterns.get(pattern)
+        if compiled_pattern is None:
+            compiled_pattern = cls._compiled_patterns.setdefault(pattern, re.compile(pattern))
+        return compiled_pattern
+
+    def get_commented_info_map(self):
+        """Gets the commented information as key / value pairs, e.g. 'Current TPM Device' -> 'dTPM 2.0'.
+        The map is built once and kept until update_xml_file is called.
+
+        @return: OrderedDict of commented information key to value, lines without a key are left out.
+        """
+        if self._commented_info_map is None:
+            commented_info_map = OrderedDict()
+            for line in self.__read_commented_info().splitlines():
+                key, separator, value = line.partition(self._COMMENTED_INFO_SEPARATOR)
+                if separator and key.strip() and key.strip() not in commented_info_map:
+                    commented_info_map[key.strip()] = value.strip()
+            self._commented_info_map = commented_info_map
+        return self._commented_info_map
+
+    def get_commented_value(self, key, default=None):
+        """Gets the value of the key from the commented information
+
+        @param key: key of the commented information e.g. 'Current TPM Device'
+        @param default: value to return if the key does not exist
+        @return: value of the key
+        """
+        return self.get_commented_info_map().get(key, default)
+
+    def get_tpm_device(self):
+        """Gets the current TPM device from the commented information
+
+        @return: TPM device e.g. 'dTPM 2.0', None if no TPM device is reported
+        """
+        return self.get_commented_value(self.TPM_DEVICE_KEY)
+
+    def get_firmware_versions(self):
+        """Gets the firmware versions from the commented information
+
+        @return: OrderedDict of the commented information key containing 'Version' to the version
+        """
+        return OrderedDict((key, value) for key, value in self.get_commented_info_map().items()
+                           if self._VERSION_KEY_REGEX.search(key))
 
     def get_commented_info(self):
         """
@@ -404,20 +776,7 @@ class PlatformConfigReader(object):
         @param names: Knob names
         @return: knob current value
         """
-        knobs_values = {}
-        for knob in self.root.iter("knob"):
-            name = knob.get("name")
-            if name in names:
-                knobs_values[name] = knob.get("CurrentVal")
-        return knobs_values
-
-    def __get_all_knobs(self):
-        """Gets the all knobs"""
-        knobs_values = {}
-        for knob in self.root.iter("knob"):
-            name = knob.get("name")
-            knobs_values[name] = literal_eval(knob.get("CurrentVal"))
-        return knobs_values
+        return {name: self._knobs[name].current_value for name in names if name in self._knobs}
 
     def __get_knob_depex(self, name):
         """Gets the knob depex
@@ -425,64 +784,39 @@ class PlatformConfigReader(object):
         @param name: Knob name
         @return: knob depex value
         """
-        depex = "TRUE"
-        for knob in self.root.iter("knob"):
-            if knob.get("name").strip() == name:
-                return knob.get("depex")
-        return depex
-
-    def __convert_to_py_cond(self, condition):
-        """Converts the bios depex to python condition"""
-        self._log.debug("Depex: %s", condition)
-        condition = condition.replace("_EQU_", "==").replace("_OR_", "or").\
-            replace("_NEQ_", "!=").replace("OR", "or").replace("AND", "and").\
-            replace("_EQU_", "==").replace("Sif", "").replace("Gif", "")
-        self._log.debug("PyCondition: %s", condition)
-        return condition
+        knob = self._knobs.get(name)
+        if knob is None:
+            return "TRUE"
+        return knob.depex
+
+    def __get_knob_value(self, name):
+        """Gets the knob current value as int for the depex evaluation
+
+        @param name: Knob name
+        @return: knob current value
+        """
+        knob = self._knobs.get(name)
+        if knob is None:
+            raise KeyError("Knob '{}' used in depex is not present in '{}'".format(name, self.xml_file))
+        return int(knob.value)
 
     def get_knob_status(self, name):
         """Gets the knob status either hidden or readonly or accessible"""
-        values = self.__get_all_knobs()
-        self._log.debug(values)
-        # Writing to a temp file
-        with open(self._KNOBS_FILE, "w") as f:
-            for knob, value in values.items():
-                f.write(knob + "=" + str(value) + "\n")
-        knobs_module = import_module("src.lib.knobs", "*")
-        reload(knobs_module)
-        # Making all the knobs vlaues as globals
-        names = [x for x in knobs_module.__dict__ if not x.startswith("_")]
-        globals().update({k: int(getattr(knobs_module, k)) for k in names})
-        depex = self.__get_knob_depex(name)
-        knob_status = "accessible"
-        if depex.strip() != "TRUE":
-            split_depex = depex.split("_AND_")
-            sifs = [line.strip() for line in split_depex if
-                    line.strip().startswith("Sif(")]
-            gifs = [line.strip() for line in split_depex if
-                    line.strip().startswith("Gif(")]
-            sif_values = []
-            gif_values = []
-            for sif in sifs:
-                sif_values.append(
-                    str(eval(self.__convert_to_py_cond(sif))).capitalize())
-            for gif in gifs:
-                gif_values.append(
-                    str(eval(self.__convert_to_py_cond(gif))).capitalize())
-            self._log.debug("sif values {}".format(sif_values))
-            self._log.debug("gif values {}".format(gif_values))
-            is_suppressed = False
-            if len(sif_values):
-                is_suppressed = eval(" or ".join(sif_values))
-                if is_suppressed:
-                    knob_status = "hidden"
-            if not is_suppressed:
-                if len(gif_values):
-                    if eval(" or ".join(gif_values)):
-                        knob_status = "readonly"
-        if os.path.exists(self._KNOBS_FILE):
-            os.remove(self._KNOBS_FILE)
-        return knob_status
+        depex = DepexParser.compile(self.__get_knob_depex(name))
+        self._log.debug("Depex: %s", depex.depex)
+        if depex.is_suppressed(self.__get_knob_value):
+            return self.HIDDEN_KNOB_STATUS
+        if depex.is_grayed_out(self.__get_knob_value):
+            return self.READONLY_KNOB_STATUS
+        return self.ACCESSIBLE_KNOB_STATUS
+
+    def get_knob_statuses(self, names):
+        """Gets the status of each knob either hidden or readonly or accessible
+
+        @param names: Knob names
+        @return: OrderedDict of knob name to knob status
+        """
+        return OrderedDict((name, self.get_knob_status(name)) for name in names)
 
     def filter_commented_info(self, string_pattern_to_search, commented_info):
         """
@@ -492,7 +826,7 @@ class PlatformConfigReader(object):
         :param commented_info: Gets the comment information from platformconfig.xml
         :return: return the regex search object
         """
-        return re.search(string_pattern_to_search, commented_info)
+        return self.get_compiled_pattern(string_pattern_to_search).search(commented_info)
 
     def get_current_tpm_device(self):
         """
@@ -501,11 +835,11 @@ class PlatformConfigReader(object):
         :return: return the TPM device
         :raise: raises the content_exception.TestFail
         """
-        tpm_device_info = self.filter_commented_info(self._TPM_REGEX, self.__read_commented_info())
-        if not tpm_device_info:
+        tpm_device = self.get_tpm_device()
+        if tpm_device is None:
             raise content_exception.TestFail("Fail to get the TPM Device info form using xmlcli")
-        self._log.debug("{} Device is connected".format(tpm_device_info.group(1)))
-        return tpm_device_info.group(1)
+        self._log.debug("{} Device is connected".format(tpm_device))
+        return tpm_device
 
     def verify_tpm_is_disabled(self):
         """
@@ -514,8 +848,7 @@ class PlatformConfigReader(object):
         :return: return True if else false
         """
         self._log.info("verify the TPM is Disabled")
-        tpm_device_info = self.filter_commented_info(self._TPM_REGEX, self.__read_commented_info())
-        if not tpm_device_info:
+        if self.get_tpm_device() is None:
             self._log.info("TPM is Disabled on the SUT")
             return True
         return False
@@ -612,11 +945,167 @@ class ChooseBoot:
         return ret_val
 
 
+# Single boot option of the BootOrder_0 knob
+BootOption = namedtuple("BootOption", ["text", "value"])
+
+
+class BootOrder(object):
+    """
+    Boot order of the BootOrder_0 knob in PlatformConfig.xml, with O(1) lookup of the boot options by text.
+    """
+
+    def __init__(self, options):
+        """
+        :param options: sequence of (text, value) pairs in the current boot order
+        """
+        self._options = [BootOption(text, value) for text, value in options]
+        self._options_by_text = {}
+        for option in self._options:
+            self._options_by_text.setdefault(str(option.text).lower(), option)
+
+    @classmethod
+    def from_knob(cls, knob):
+        """Creates the boot order from the BootOrder_0 PlatformConfigKnob"""
+        return cls(knob.options)
+
+    def __iter__(self):
+        return iter(self._options)
+
+    def __len__(self):
+        return len(self._options)
+
+    def __eq__(self, other):
+        return isinstance(other, BootOrder) and self._options == other._options
+
+    def __ne__(self, other):
+        return not self == other
+
+    def copy(self):
+        """Gets a copy of the boot order which can be edited independently"""
+        return BootOrder(self._options)
+
+    def find(self, name):
+        """
+        Finds the boot option by its text, the exact text (ignoring case) is looked up first and then the first
+        option containing the name.
+
+        :param name: boot option name e.g. 'UEFI Internal Shell'
+        :return: BootOption or None if there is no such boot option
+        """
+        name = str(name).lower()
+        option = self._options_by_text.get(name)
+        if option is not None:
+            return option
+        for option in self._options:
+            if name in str(option.text).lower():
+                return option
+        return None
+
+    def __get_option(self, name):
+        """Gets the boot option by name, raises TestNAError if there is no such boot option"""
+        option = self.find(name)
+        if option is None:
+            raise content_exception.TestNAError("Did not find the boot option for specified "
+                                                "environment '{}".format(name))
+        return option
+
+    def move_to_front(self, name):
+        """
+        Moves the boot option to the first position.
+
+        :param name: boot option name
+        :raises: TestNAError - if there is no such boot option
+        :return: None
+        """
+        self.reorder([name])
+
+    def reorder(self, names):
+        """
+        Puts the given boot options first in the given order, the other options keep their relative order.
+
+        :param names: boot option names
+        :raises: TestNAError - if any of the boot options does not exist
+        :return: None
+        """
+        first_options = []
+        for name in names:
+            option = self.__get_option(name)
+            if option not in first_options:
+                first_options.append(option)
+        self._options = first_options + [option for option in self._options if option not in first_options]
+
+    def to_string(self):
+        """
+        Renders the boot order string used by SetBootOrder.
+
+        :return: boot order string e.g. "01-04-03"
+        """
+        return "-".join("%02s" % option.value for option in self._options).replace("0x", "0")
+
+    def __str__(self):
+        return self.to_string()
+
+
+class BootOrderTransaction(object):
+    """
+    Collects boot order edits and knob changes and applies them with a single SetBootOrder call and a single
+    CvProgKnobs call. Used as a context manager the changes are committed when the block exits without error.
+    """
+
+    def __init__(self, itp_xmlcli):
+        """
+        :param itp_xmlcli: ItpXmlCli object
+        """
+        self._itp_xmlcli = itp_xmlcli
+        self._initial_boot_order = itp_xmlcli.get_boot_order()
+        self.boot_order = self._initial_boot_order.copy()
+        self._knobs = OrderedDict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        return False
+
+    def move_to_front(self, name):
+        """Moves the boot option to the first position"""
+        self.boot_order.move_to_front(name)
+        return self
+
+    def reorder(self, names):
+        """Puts the given boot options first in the given order"""
+        self.boot_order.reorder(names)
+        return self
+
+    def set_knob(self, name, value):
+        """Adds a knob change to the transaction"""
+        self._knobs[name] = value
+        return self
+
+    def commit(self):
+        """
+        Applies the boot order and knob changes, calls are skipped when there is nothing to change.
+
+        :raises: TestFail - if fails to set the boot order
+        :raises: RuntimeError - if fails to set the knobs
+        :return: None
+        """
+        if self.boot_order != self._initial_boot_order:
+            self._itp_xmlcli.set_boot_order(self.boot_order.to_string())
+        if self._knobs:
+            self._itp_xmlcli.program_knobs(self._knobs)
+        self._initial_boot_order = self.boot_order.copy()
+        self._knobs = OrderedDict()
+
+
 class ItpXmlCli(object):
     """
     This class provides few out of band xmlcli API's to directly call from ITP host system.
     """
     PLATFORM_CONFIG_FILE = "PlatformConfig.xml"
+    BOOT_ORDER_KNOB = "BootOrder_0"
     SUPPORTED_BOOT_OPTION_VALUE = [BootOptions.WINDOWS, LinuxDistributions.Fedora, LinuxDistributions.RHEL,
                                    LinuxDistributions.ClearLinux, LinuxDistributions.SLES,
                                    LinuxDistributions.Ubuntu, BootOptions.ESXI, BootOptions.UEFI,
@@ -626,15 +1115,33 @@ class ItpXmlCli(object):
     itp_xmlcli_constants = {"XMLCLI_ZIP_FILE": None, "XMLCLI_FOLDER_NAME": None}
 
     COLLATERAL_DIR_NAME = 'collateral'
-
-    def __init__(self, log, cfg_opts=None):
+    XMLCLI_SITE_FOLDER_NAME = "itp_xmlcli_site"
+    XMLCLI_INSTALL_MARKER = "itp_xmlcli.installed"
+    XMLCLI_INSTALL_LOCK_FILE = "itp_xmlcli_install.lock"
+    XMLCLI_INSTALL_TIMEOUT_SEC = 600
+    XMLCLI_DOWNLOAD_TIMEOUT_SEC = 240
+    # longer than the download and the install together, so the lock of a live install never looks stale
+    XMLCLI_INSTALL_LOCK_TIMEOUT_SEC = 900
+    # xmlcli version installed and imported by this process
+    _installed_xmlcli_version = None
+
+    def __init__(self, log, cfg_opts=None, reuse_platform_config=False):
+        """
+        :param reuse_platform_config: True to reuse the PlatformConfig.xml snapshot until a change done through
+        this class, the caller must then call invalidate_platform_config after any reset, AC cycle, bootscript
+        run or BIOS change done outside of this class. By default every request saves a new snapshot.
+        """
         self._log = log
         self._log_dir = self.get_log_file_dir()
         self.cfg_opts = cfg_opts
+        self.reuse_platform_config = reuse_platform_config
         self._content_config = ContentConfiguration(self._log)
         self.install_itp_xmlcli()
         self._platform_config_file = None
         self._boot_order_xpath = './/knob[@name="BootOrder_0"]'
+        self._platform_config = None
+        self.previous_platform_config = None
+        self._is_platform_config_stale = True
         self._sdp = None
 
         if self.cfg_opts:
@@ -658,11 +1165,13 @@ class ItpXmlCli(object):
 
     def install_itp_xmlcli(self):
         """
-        Copies the xmlcli package to use with itp interface to automation folder.
+        Installs the xmlcli package to use with itp interface into a versioned site folder under the automation
+        folder. The install is shared by all ItpXmlCli objects of the process through a class level flag, and by
+        all processes on the host through a marker file written after a verified install and a lock file held
+        while installing.
         :return: itp_xmlcli install path.
         :raises: RuntimeError - if any runtime error during copy to automation folder..
         """
-        self._log.info("Installing ITP xmllci on host..")
         exec_os = platform.system()
         try:
             automation_folder = Framework.CFG_BASE[exec_os]
@@ -673,55 +1182,224 @@ class ItpXmlCli(object):
 
         self.itp_xmlcli_constants["XMLCLI_ZIP_FILE"] = self._content_config.get_xmlcli_tools_name()
         self.itp_xmlcli_constants["XMLCLI_FOLDER_NAME"] = self._content_config.get_xmlcli_tools_name().split(".")[0]
-        self._log.debug("Checking and downloading itp xmlcli version-{}  from Artifactory".format(
-            self.itp_xmlcli_constants["XMLCLI_FOLDER_NAME"]))
-        xmlcli_path = os.path.join(automation_folder, self.itp_xmlcli_constants["XMLCLI_FOLDER_NAME"])
-        if not os.path.exists(xmlcli_path):
-            artifactory_obj = ContentArtifactoryUtils(self._log, cfg_opts=self.cfg_opts)
-
-            xmlcli_collateral_path = artifactory_obj.download_tool_to_automation_tool_folder(
-                self.itp_xmlcli_constants["XMLCLI_ZIP_FILE"], exec_env="Uefi")
-            self.extract_zip_file_on_host(xmlcli_collateral_path, automation_folder)
+        xmlcli_version = self.itp_xmlcli_constants["XMLCLI_FOLDER_NAME"]
+        xmlcli_path = os.path.join(automation_folder, xmlcli_version)
+        site_dir = os.path.join(automation_folder, self.XMLCLI_SITE_FOLDER_NAME, xmlcli_version)
+        if ItpXmlCli._installed_xmlcli_version == xmlcli_version:
+            return site_dir
+
+        self._log.info("Installing ITP xmllci on host..")
+        if self.__is_xmlcli_installed(site_dir, xmlcli_version):
+            ItpXmlCli._installed_xmlcli_version = xmlcli_version
+            return site_dir
+
+        self._log.warning("Itp xmlcli is not installed, installing it")
+        with self.__xmlcli_install_lock(automation_folder):
+            # another process may have completed the install while waiting for the lock
+            if not self.__is_xmlcli_installed(site_dir, xmlcli_version):
+                self._log.debug("Checking and downloading itp xmlcli version-{}  from Artifactory".format(
+                    xmlcli_version))
+                if not os.path.exists(xmlcli_path):
+                    artifactory_obj = ContentArtifactoryUtils(self._log, cfg_opts=self.cfg_opts)
+
+                    xmlcli_collateral_path = artifactory_obj.download_tool_to_automation_tool_folder(
+                        self.itp_xmlcli_constants["XMLCLI_ZIP_FILE"], exec_env="Uefi",
+                        timeout=self.XMLCLI_DOWNLOAD_TIMEOUT_SEC)
+                    self.extract_zip_file_on_host(xmlcli_collateral_path, automation_folder)
+                self._execute_setup_file_for_xmlcli_host(xmlcli_path, site_dir)
+                self.__add_xmlcli_site_dir(site_dir)
+                if not self.__import_xmlcli(xmlcli_version):
+                    raise RuntimeError("Exception occurred while installing itp xmlcli on HOST, the installed "
+                                       "package '{}' can not be imported or another xmlcli version was already "
+                                       "imported by the process".format(site_dir))
+                with open(os.path.join(site_dir, self.XMLCLI_INSTALL_MARKER), "w") as marker_file:
+                    marker_file.write(xmlcli_version)
+
+        if not self.__is_xmlcli_installed(site_dir, xmlcli_version):
+            raise RuntimeError("Exception occurred while installing itp xmlcli on HOST in '{}'".format(site_dir))
+        ItpXmlCli._installed_xmlcli_version = xmlcli_version
+        return site_dir
+
+    def __is_xmlcli_installed(self, site_dir, xmlcli_version):
+        """
+        Checks if the xmlcli version can be imported, from the site folder once its install marker is written, or
+        from the python environment e.g. PythonSV.
+
+        :param site_dir: site folder of the xmlcli version
+        :param xmlcli_version: xmlcli version
+        :return: True if the version can be imported else False
+        """
+        marker_file_path = os.path.join(site_dir, self.XMLCLI_INSTALL_MARKER)
+        if os.path.isfile(marker_file_path):
+            with open(marker_file_path) as marker_file:
+                if marker_file.read().strip() == xmlcli_version:
+                    self.__add_xmlcli_site_dir(site_dir)
+        return self.__import_xmlcli(xmlcli_version)
+
+    @staticmethod
+    def __add_xmlcli_site_dir(site_dir):
+        """
+        Puts the site folder first on the import path, so older xmlcli installs do not shadow it on the first
+        import of the package. Modules already imported are left as they are.
+
+        :param site_dir: site folder of the xmlcli version
+        """
+        if sys.path[:1] == [site_dir]:
+            return
+        if site_dir in sys.path:
+            sys.path.remove(site_dir)
+        # addsitedir also processes the .pth files of the folder, it appends the folder to the end of sys.path
+        site.addsitedir(site_dir)
+        if site_dir in sys.path:
+            sys.path.remove(site_dir)
+        sys.path.insert(0, site_dir)
+
+    @staticmethod
+    def __is_xmlcli_version(module_version, xmlcli_version):
+        """
+        Compares the version numbers of the imported xmlcli package and of the xmlcli tools name.
+
+        :param module_version: version of the imported package e.g. 2.0.3
+        :param xmlcli_version: xmlcli version from the tools name e.g. xmlcli_2_0_3
+        :return: True if the version numbers match else False
+        """
+        module_numbers = ".".join(re.findall(r"\d+", str(module_version)))
+        xmlcli_numbers = ".".join(re.findall(r"\d+", xmlcli_version))
+        return bool(module_numbers) and (xmlcli_numbers == module_numbers or
+                                         xmlcli_numbers.endswith("." + module_numbers))
+
+    def __import_xmlcli(self, xmlcli_version):
+        """
+        Imports the xmlcli package. A package without version information is accepted as is.
+
+        :param xmlcli_version: xmlcli version the package must match
+        :return: True if the package was imported and is of the xmlcli version else False
+        """
+        if six.PY3:
+            # folders created by the install after the start of the process are not in the finder caches yet
+            importlib.invalidate_caches()
         try:
             import pysvtools.xmlcli.XmlCli as cli
-            self._log.info("ITP xmllci installed on host and able to import it successfully..")
-            self._log.info("Setting AuthenticateXmlCliApis to True...")
-            cli.clb.AuthenticateXmlCliApis = True
-        except Exception as ex:
-            self._log.warning("Itp xmlcli is not installed, installing it")
+        except ImportError as ex:
+            self._log.debug("Failed to import itp xmlcli due to exception '{}'".format(ex))
+            return False
+        module_version = getattr(cli, "__version__", None) or getattr(sys.modules.get("pysvtools.xmlcli"),
+                                                                      "__version__", None)
+        if module_version and not self.__is_xmlcli_version(module_version, xmlcli_version):
+            self._log.debug("Itp xmlcli version '{}' was imported from '{}' instead of '{}'".format(
+                module_version, cli.__file__, xmlcli_version))
+            return False
+        self._log.info("ITP xmllci installed on host and able to import it successfully..")
+        self._log.info("Setting AuthenticateXmlCliApis to True...")
+        cli.clb.AuthenticateXmlCliApis = True
+        return True
+
+    @contextmanager
+    def __xmlcli_install_lock(self, automation_folder):
+        """
+        Holds the host wide xmlcli install lock. The lock file holds a token of the holder, a lock file older than
+        the lock timeout is considered stale, and the lock is only removed by the holder whose token it holds.
+
+        :param automation_folder: automation folder to create the lock file in
+        :raises: RuntimeError - if the lock could not be taken within the lock timeout
+        """
+        lock_file_path = os.path.join(automation_folder, self.XMLCLI_INSTALL_LOCK_FILE)
+        lock_token = "{}:{}".format(os.getpid(), uuid.uuid4().hex)
+        time_end = time.time() + self.XMLCLI_INSTALL_LOCK_TIMEOUT_SEC
+        while True:
             try:
-                import threading
-                start_thread = threading.Thread(target=self._execute_setup_file_for_xmlcli_host, args=(xmlcli_path,),
-                                                daemon=True)
-                start_thread.start()
-                self._log.info("Threading has started for installing ITP-Xmlcli package.")
-                # waiting for the installation process to complete
-                time.sleep(15)
-                import pysvtools.xmlcli.XmlCli as cli
-                self._log.info("ITP xmllci installed on host and able to import it successfully..")
-                self._log.info("Setting AuthenticateXmlCliApis to True...")
-                cli.clb.AuthenticateXmlCliApis = True
-            except Exception as ex:
-                raise ("Exception occurred while installing itp xmlcli on HOST due to {}".format(ex))
+                lock_fd = os.open(lock_file_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except OSError:
+                if self.__remove_stale_xmlcli_install_lock(lock_file_path):
+                    continue
+                if time.time() > time_end:
+                    raise RuntimeError("Timed out waiting for the itp xmlcli install lock '{}'".format(lock_file_path))
+                self._log.debug("Waiting for the itp xmlcli install of another process to complete..")
+                time.sleep(1)
+        try:
+            try:
+                os.write(lock_fd, lock_token.encode())
+            finally:
+                os.close(lock_fd)
+            yield
+        finally:
+            if self.__read_xmlcli_install_lock(lock_file_path) == lock_token:
+                try:
+                    os.remove(lock_file_path)
+                except OSError as ex:
+                    self._log.debug("Failed to remove the itp xmlcli install lock due to exception '{}'".format(ex))
+            else:
+                self._log.warning("The itp xmlcli install lock '{}' was taken over by another process".format(
+                    lock_file_path))
+
+    @staticmethod
+    def __read_xmlcli_install_lock(lock_file_path):
+        """
+        Reads the token of the xmlcli install lock holder.
+
+        :param lock_file_path: lock file path
+        :return: token, None if the lock file does not exist
+        """
+        try:
+            with open(lock_file_path) as lock_file:
+                return lock_file.read()
+        except (IOError, OSError):
+            return None
+
+    def __remove_stale_xmlcli_install_lock(self, lock_file_path):
+        """
+        Removes the xmlcli install lock if it is older than the lock timeout. The token is read again right before
+        the removal, so a lock taken over by another waiter in the meantime is left alone.
+
+        :param lock_file_path: lock file path
+        :return: True if the lock is gone or changed hands and can be tried again, else False
+        """
+        lock_token = self.__read_xmlcli_install_lock(lock_file_path)
+        try:
+            lock_age = time.time() - os.path.getmtime(lock_file_path)
+        except OSError:
+            return True
+        if lock_age <= self.XMLCLI_INSTALL_LOCK_TIMEOUT_SEC:
+            return False
+        if self.__read_xmlcli_install_lock(lock_file_path) != lock_token:
+            return True
+        self._log.warning("Removing stale itp xmlcli install lock '{}' of '{}'".format(lock_file_path, lock_token))
+        try:
+            os.remove(lock_file_path)
+        except OSError:
+            pass
+        return True
 
-    def _execute_setup_file_for_xmlcli_host(self, xmlcli_path):
+    def _execute_setup_file_for_xmlcli_host(self, xmlcli_path, site_dir=None):
         """
         This method is to install itp xmlcli python package on host
 
         :param xmlcli_path: folder path of the xmlcli pkg on HOST,
+        :param site_dir: isolated site folder to install the package into, the python site-packages if None
         :raise: RuntimeError
         """
-        py_path = str(sys.executable)
-        setup_path = os.path.join(xmlcli_path, "setup.py")
-        command_line = py_path + " " + setup_path + " install"
-        self._log.info("cmd {}".format(command_line))
-        process_obj = subprocess.Popen(command_line, cwd=xmlcli_path, shell=True)
-        process_obj.communicate()
+        if site_dir:
+            command_line = [sys.executable, "-m", "pip", "install", "--upgrade", "--target", site_dir, xmlcli_path]
+        else:
+            command_line = [sys.executable, os.path.join(xmlcli_path, "setup.py"), "install"]
+        self._log.info("cmd {}".format(" ".join(command_line)))
+        process_obj = subprocess.Popen(command_line, cwd=xmlcli_path)
+        # the output is not piped, so polling can not block on a full pipe
+        time_end = time.time() + self.XMLCLI_INSTALL_TIMEOUT_SEC
+        while process_obj.poll() is None and time.time() < time_end:
+            time.sleep(1)
+        if process_obj.poll() is None:
+            process_obj.kill()
+            process_obj.wait()
+            log_error = "The command '{}' did not complete in {} seconds...".format(
+                " ".join(command_line), self.XMLCLI_INSTALL_TIMEOUT_SEC)
+            self._log.error(log_error)
+            raise RuntimeError(log_error)
         if process_obj.returncode != 0:
-            log_error = "The command '{}' failed...".format(command_line)
+            log_error = "The command '{}' failed...".format(" ".join(command_line))
             self._log.error(log_error)
             raise RuntimeError(log_error)
-        process_obj.kill()
 
     def extract_zip_file_on_host(self, zip_file_path, dest_path):
         """
@@ -763,14 +1441,33 @@ class ItpXmlCli(object):
             if str(type(handler)) == "<class 'logging.FileHandler'>":
                 return os.path.split(handler.baseFilename)[0]
 
-    def get_platform_config_file_path(self):
+    def invalidate_platform_config(self):
         """
-        This function saves the platform config file in test_log_file folder and returns the path to XML file
+        Marks the last PlatformConfig.xml snapshot as stale, so the next request saves a new one through ITP.
+        This is done by the knob, boot order and clear cmos methods of this class. With reuse_platform_config,
+        it must be called by the caller after any reset or BIOS change done outside of this class.
 
+        :return: None
+        """
+        self._is_platform_config_stale = True
+
+    def get_platform_config_file_path(self, refresh=None):
+        """
+        This function saves the platform config file in test_log_file folder and returns the path to XML file.
+        With reuse_platform_config, the last saved file is reused as long as nothing which could change it was
+        done through this class.
+
+        :param refresh: True to save a new file even if the last snapshot is still valid, False to reuse a valid
+        snapshot, None to save a new file unless reuse_platform_config is set
         :return: returns the PlatformConfig.xml file name along with path.
         """
+        if refresh is None:
+            refresh = not self.reuse_platform_config
         try:
             xml_platform_config_file = os.path.join(self._log_dir, self.PLATFORM_CONFIG_FILE)
+            if not refresh and not self._is_platform_config_stale and os.path.isfile(xml_platform_config_file):
+                self._log.info("Reusing the platform config file saved at '{}'".format(xml_platform_config_file))
+                return xml_platform_config_file
             if os.path.exists(xml_platform_config_file):
                 self._log.info("Removing the existing platform config file")
                 os.remove(xml_platform_config_file)
@@ -778,69 +1475,66 @@ class ItpXmlCli(object):
             if not os.path.isfile(xml_platform_config_file):
                 raise RuntimeError("Failed to get platform config XML file through ITP interface. "
                                    "Please check your PythonSV and CScript installation...")
+            self._is_platform_config_stale = False
+            if self._platform_config is not None:
+                self.previous_platform_config = self._platform_config
+                self._platform_config = None
             return xml_platform_config_file
         except Exception as ex:
             log_error = "Failed to get platform config file path due to exception '{}'".format(ex)
             self._log.error(log_error)
             raise RuntimeError(log_error)
 
-    def __get_current_boot_order(self):
+    def get_platform_config(self, refresh=None):
         """
-        This function parses the platform config file and gets the current boot order
+        This function gets the parsed model of the PlatformConfig.xml snapshot. The model of the last snapshot
+        is returned as long as it is still valid, see get_platform_config_file_path.
 
-        :return: returns the current boot order dictionary.
+        :param refresh: see get_platform_config_file_path
+        :return: PlatformConfigReader object
         """
-        import lxml.etree as etree
-        current_boot_order = {}
-        self._platform_config_file = self.get_platform_config_file_path()
-        root = etree.parse(self._platform_config_file)
-        boot_order_node = root.xpath(self._boot_order_xpath)
-        options_node = boot_order_node[0].getchildren()
-        boot_option_nodes = options_node[0].getchildren()
-
-        index = 0
-        for boot_option_node in boot_option_nodes:
-            key = boot_option_node.attrib['text'] + "-" + str(index)
-            value = boot_option_node.attrib['value']
-            current_boot_order[key] = value
-            index += 1
+        self._platform_config_file = self.get_platform_config_file_path(refresh)
+        if self._platform_config is None:
+            self._platform_config = PlatformConfigReader(self._platform_config_file, self._log, streaming=True)
+        return self._platform_config
 
-        return current_boot_order
-
-    def __get_boot_order_string(self, boot_option_value, current_boot_order):
+    def diff_platform_config(self, old_platform_config=None, new_platform_config=None):
         """
-        This function finds if boot_option_value is present in current boot order, if yes
-        creates the new boot order string by putting this as first boot value.
+        This function gets the knobs changed between two PlatformConfig.xml snapshots.
 
-        :param: boot_option_value - boot option to be set as default
-        :param: current_boot_order - current boot order dictionary
-        :raises: TestNAError - if specified boot option value is not supported.
+        :param old_platform_config: PlatformConfigReader object, defaults to the previous snapshot
+        :param new_platform_config: PlatformConfigReader object, defaults to the current snapshot
+        :raises: RuntimeError - if there is no previous snapshot to compare with
+        :return: OrderedDict of knob name to (old value, new value)
+        """
+        if new_platform_config is None:
+            new_platform_config = self.get_platform_config()
+        if old_platform_config is None:
+            old_platform_config = self.previous_platform_config
+        if old_platform_config is None:
+            raise RuntimeError("There is no previous platform config snapshot to compare with")
+        return old_platform_config.diff_knobs(new_platform_config)
+
+    def get_boot_order(self, refresh=None):
+        """
+        This function gets the current boot order from the PlatformConfig.xml snapshot.
 
-        :return: returns the new boot order string.
+        :param refresh: see get_platform_config_file_path
+        :return: BootOrder object
         """
-        # find the key name of boot_option_value to be set as default
-        key_name = None
-        key_value = None
-        for key, value in current_boot_order.items():
-            if str(boot_option_value).lower() in str(key).lower():
-                # we found the boot option
-                key_name = key
-                key_value = value
-                break
+        return BootOrder.from_knob(self.get_platform_config(refresh).get_knob(self.BOOT_ORDER_KNOB))
 
-        if not key_name:
-            log_error = "Did not find the boot option for specified environment '{}".format(boot_option_value)
-            self._log.error(log_error)
-            raise content_exception.TestNAError(log_error)
+    def boot_order_transaction(self):
+        """
+        This function starts a transaction to apply several boot order edits and knob changes at once e.g.
 
-        # form the boot order string
-        boot_order_string = "%02s" % key_value
-        for key, value in current_boot_order.items():
-            if key == key_name:
-                continue
-            boot_order_string = boot_order_string + "-" + "%02s" % value
+            with itp_xmlcli.boot_order_transaction() as transaction:
+                transaction.move_to_front(BootOptions.UEFI)
+                transaction.set_knob("BootMode", "0x1")
 
-        return boot_order_string.replace("0x", "0")
+        :return: BootOrderTransaction object
+        """
+        return BootOrderTransaction(self)
 
     def set_default_boot(self, boot_option_value, boot_flag=True):
         """
@@ -860,11 +1554,17 @@ class ItpXmlCli(object):
                 raise content_exception.TestNAError("The boot option '{}' is not supported. Supported boot option "
                                                     "values are '{}'".format(boot_option_value, self.SUPPORTED_BOOT_OPTION_VALUE))
 
-        current_boot_order = self.__get_current_boot_order()
-        new_boot_order_string = self.__get_boot_order_string(boot_option_value, current_boot_order)
+        boot_order = self.get_boot_order()
+        if boot_order.find(boot_option_value) is None:
+            log_error = "Did not find the boot option for specified environment '{}".format(boot_option_value)
+            self._log.error(log_error)
+            raise content_exception.TestNAError(log_error)
+        boot_order.move_to_front(boot_option_value)
+        new_boot_order_string = boot_order.to_string()
 
         self._log.info("The new boot order string: '{}'".format(new_boot_order_string))
 
+        self.invalidate_platform_config()
         if self._cli.SetBootOrder(new_boot_order_string) != 0:
             log_error = "Setting the new boot order failed with default boot option as '{}' " \
                         "is failed..".format(boot_option_value)
@@ -881,10 +1581,7 @@ class ItpXmlCli(object):
 
         :return: None
         """
-        self._platform_config_file = self.get_platform_config_file_path()
-        current_boot_order = self.__get_current_boot_order()
-        boot_option_value = next(iter(current_boot_order))
-        current_boot_order_string = self.__get_boot_order_string(boot_option_value, current_boot_order)
+        current_boot_order_string = self.get_boot_order().to_string()
         self._log.info("Current boor order string: '{}'".format(current_boot_order_string))
         return current_boot_order_string
 
@@ -897,6 +1594,7 @@ class ItpXmlCli(object):
         :return: None
         """
         self._log.info("Setting the boot order: '{}'".format(boot_order_string))
+        self.invalidate_platform_config()
         if self._cli.SetBootOrder(boot_order_string) != 0:
             log_error = "Set boot order with value '{}' failed...".format(boot_order_string)
             self._log.error(log_error)
@@ -914,6 +1612,7 @@ class ItpXmlCli(object):
         :return: None
         """
         self._log.info("Performing clear cmos")
+        self.invalidate_platform_config()
         try:
             self._log.info("Halting CPU")
             sdp.halt()
@@ -933,19 +1632,8 @@ class ItpXmlCli(object):
         Function takes in a BIOS knob file in format for XmlCli use in OS and converts to a dict structure.
         :param knob_file: Input file for XmlCli through OS.
         :return: dict in format BIOS knob name from Platform_Configuration.xml file as key and setting as value."""
-        knob_dict = {}
-        with open(knob_file) as f:
-            for line in f:
-                if line != "":
-                    split_line = line.split('=', 1)
-                    if split_line[0].strip() == "Name":
-                        key = split_line[1].strip()
-                    elif split_line[0].strip() == "Target":
-                        try:
-                            knob_dict[key] = split_line[1].strip('"\n "')
-                        except KeyError:
-                            pass
-        return knob_dict
+        knob_set = BiosKnobLoader.load(knob_file, line_mode=True)
+        return dict(knob_set.knob_values)
 
     def set_bios_knobs(self, knob_file, restore_modify=False):
         """
@@ -955,11 +1643,17 @@ class ItpXmlCli(object):
         :param knob_file: Input file for XmlCli through OS.
         :param restore_modify: Reset BIOS knobs to default before applying BIOS knob changes.
         :raise RuntimeError: If BIOS knobs fail to set with XmlCli."""
-        cleaned_knob_file = self._convert_bios_knob_file(knob_file)
-        knob_string = ""
-        for knob in cleaned_knob_file.keys():
-            knob_string = knob_string + "{}={},".format(knob, cleaned_knob_file[knob])
-        knob_string = knob_string[:-1]  # cleave off last comma
+        self.program_knobs(self._convert_bios_knob_file(knob_file), restore_modify)
+
+    def program_knobs(self, knobs, restore_modify=False):
+        """
+        type: (dict, bool) -> None
+        Function sets the BIOS knobs with a single XmlCli call.
+        :param knobs: dict of BIOS knob name from Platform_Configuration.xml file to setting.
+        :param restore_modify: Reset BIOS knobs to default before applying BIOS knob changes.
+        :raise RuntimeError: If BIOS knobs fail to set with XmlCli."""
+        knob_string = ",".join("{}={}".format(knob, value) for knob, value in knobs.items())
+        self.invalidate_platform_config()
         if restore_modify:
             self._log.debug("Restoring BIOS knobs to default. then applying BIOS knob changes.")
             if self._cli.CvRestoreModifyKnobs(knob_string) != 0:
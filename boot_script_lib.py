@@ -20,9 +20,15 @@
 # and approved by Intel in writing.
 #################################################################################
 
+import hashlib
+import io
+import json
 import os
-import time
+import platform
+import re
 import threading
+import time
+from collections import namedtuple
 from xml.etree import ElementTree
 import six
 if six.PY2:
@@ -30,18 +36,43 @@ if six.PY2:
 if six.PY3:
     from pathlib2 import Path
 
+from dtaf_core.lib.dtaf_constants import Framework
 from dtaf_core.providers.provider_factory import ProviderFactory
 
 from src.lib.dtaf_content_constants import BootScriptConstants
 from src.lib.dtaf_content_constants import ProviderXmlConfigs
+from src.lib.log_tailer import LogTriggerEngine
+
+
+# Verdict of a boot script run, run_time is None when the log was not produced by run_boot_script
+BootScriptResult = namedtuple("BootScriptResult", ["passed", "score", "bucket", "error_lines", "run_time",
+                                                   "parse_time"])
 
 
 class BootScript(object):
     """
     Runs the boot script command from PythonSv
+
+    The bootscript decision is cached per SUT in the process and in a JSON lines file of the host automation
+    folder. Each update is appended as one line and the last line of a key wins, so concurrent processes do not
+    lose each other's updates. The IFWI version, when given, is an extra part of the key. A decision persisted
+    before a CPU swap is dropped with invalidate_boot_script_cache.
     """
+    # SiliconRegProvider objects shared by all BootScript objects, by (cpu family, pch family). A provider logs to
+    # the log of the BootScript object which created it.
+    _sv_providers = {}
+    # bootscript decisions of this process, by cache key
+    _decisions = {}
+    _lock = threading.Lock()
 
-    def __init__(self, log, sdp, ac, common_content_lib, cfg_opts):
+    def __init__(self, log, sdp, ac, common_content_lib, cfg_opts, sut_id=None, ifwi_version=None):
+        """
+        :param sut_id: id of the SUT for the bootscript decision cache e.g. its platform serial number, by default
+        a hash of the system configuration of the SUT. The SUT OS can not be probed as it may not boot without the
+        bootscript, and the host name is shared by all the SUTs driven from the host. Without either, the decision
+        is not cached.
+        :param ifwi_version: IFWI version programmed on the SUT, an optional part of the cache key
+        """
         self._log = log
         self._sdp = sdp
         self._ac = ac
@@ -49,86 +80,252 @@ class BootScript(object):
         self._cfg = cfg_opts
         self._cpu = self._common_content_lib.get_platform_family()
         self._pch = self._common_content_lib.get_pch_family()
-
-        sv_cfg = ElementTree.fromstring(ProviderXmlConfigs.PYTHON_SV_XML_CONFIG.format(self._cpu, self._pch))
-        self._sv = ProviderFactory.create(sv_cfg, self._log)  # type: SiliconRegProvider
+        self._sut_id = sut_id or self.__get_system_config_id(cfg_opts)
+        self._ifwi_version = ifwi_version
 
         self._log_path = self._common_content_lib.get_log_file_dir()
         self._bootscript_file_path = os.path.join(self._log_path, BootScriptConstants.BOOTSCRIPT_LOG_FILE_NAME)
+        self.last_result = None
         Path(self._bootscript_file_path).touch()
         # start the boot script logs
         self._sdp.start_log(self._bootscript_file_path)
 
+    @property
+    def _sv(self):
+        """SiliconRegProvider of the platform, created on first use and shared with the other BootScript objects"""
+        key = (self._cpu, self._pch)
+        with BootScript._lock:
+            if key not in BootScript._sv_providers:
+                sv_cfg = ElementTree.fromstring(ProviderXmlConfigs.PYTHON_SV_XML_CONFIG.format(self._cpu, self._pch))
+                BootScript._sv_providers[key] = ProviderFactory.create(sv_cfg, self._log)  # type: SiliconRegProvider
+            return BootScript._sv_providers[key]
+
+    def __power_off_sut(self, pattern, line):
+        """Trigger action to AC power off the SUT"""
+        self._log.info("Got the trigger for SUT power off and powering off the SUT...")
+        ret_val = self._ac.ac_power_off(5)
+        self._log.info("AC power off ret val='{}'".format(ret_val))
+
+    def __power_on_sut(self, pattern, line):
+        """Trigger action to AC power on the SUT"""
+        self._log.info("Got the trigger for SUT power on and powering on the SUT...")
+        ret_val = self._ac.ac_power_on(5)
+        self._log.info("AC power on ret val='{}'".format(ret_val))
+
+    def get_trigger_engine(self, bs_log_file_path=None, power_cycle=True):
+        """
+        This function creates the trigger engine for the boot script log. More rules can be added to it
+        e.g. engine.add_rule(pattern, action, timeout) before passing it to run_boot_script.
+
+        :param bs_log_file_path: boot script log file, the log file of this object by default
+        :param power_cycle: True to add the AC power off and AC power on rules
+        :return: LogTriggerEngine object
+        """
+        trigger_engine = LogTriggerEngine(bs_log_file_path or self._bootscript_file_path, self._log)
+        if power_cycle:
+            trigger_engine.add_rule(BootScriptConstants.POWER_OFF_PATTERN, self.__power_off_sut,
+                                    BootScriptConstants.POWER_OFF_ON_TRIGGER_WAIT_TIME, name="SUT power off")
+            trigger_engine.add_rule(BootScriptConstants.POWER_ON_PATTERN, self.__power_on_sut,
+                                    BootScriptConstants.POWER_OFF_ON_TRIGGER_WAIT_TIME, name="SUT power on")
+        return trigger_engine
+
     def parse_boot_script_log(self, bs_log_file_path):
         """
         This function parses the boot scrip log, power-off and power-on SUT.
 
         :return: None.
         """
-        obj_log_file = open(bs_log_file_path, 'r')
-
-        time_end = time.time() + BootScriptConstants.POWER_OFF_ON_TRIGGER_WAIT_TIME
-        bs_log = ""
-        power_off_trigger = False
-        while time.time() < time_end:
-            # search for power_off pattern
-            bs_log = bs_log + str(obj_log_file.readlines())
-            if BootScriptConstants.POWER_OFF_PATTERN in str(bs_log):
-                power_off_trigger = True
-                break
-            time.sleep(0.2)
-
-        if power_off_trigger:
-            self._log.info("Got the trigger for SUT power off and powering off the SUT...")
-            ret_val = self._ac.ac_power_off(5)
-            self._log.info("AC power off ret val='{}'".format(ret_val))
-        else:
-            self._log.error("Did not get the trigget for SUT power off...")
-
-        power_on_trigger = False
-        time_end = time.time() + BootScriptConstants.POWER_OFF_ON_TRIGGER_WAIT_TIME
-        while time.time() < time_end:
-            # search for power_off pattern
-            bs_log = bs_log + str(obj_log_file.readlines())
-            if BootScriptConstants.POWER_ON_PATTERN in str(bs_log):
-                power_on_trigger = True
-                break
-            time.sleep(0.2)
-
-        if power_on_trigger:
-            self._log.info("Got the trigger for SUT power on and powering on the SUT...")
-            ret_val = self._ac.ac_power_on(5)
-            self._log.info("AC power on ret val='{}'".format(ret_val))
-        else:
-            self._log.error("Did not get the trigget for SUT power off...")
+        self.get_trigger_engine(bs_log_file_path).run()
+
+    @staticmethod
+    def extract_boot_script_result(bs_log_file_path):
+        """
+        This function streams the boot script log in fixed size chunks to get the verdict, so the log is never
+        loaded into memory as a whole.
+
+        :param bs_log_file_path: boot script log file
+        :return: BootScriptResult with the pass marker, the last score and bucket and the first error lines
+        """
+        start_time = time.time()
+        score_regex = re.compile(BootScriptConstants.BOOT_SCRIPT_SCORE_REGEX)
+        error_regex = re.compile(BootScriptConstants.BOOT_SCRIPT_ERROR_REGEX)
+        passed = False
+        score = None
+        bucket = None
+        error_lines = []
+        remainder = ""
+        with io.open(bs_log_file_path, "r", errors="replace") as bs_log_file:
+            while True:
+                chunk = bs_log_file.read(BootScriptConstants.BOOT_SCRIPT_LOG_READ_SIZE)
+                lines = (remainder + chunk).split("\n")
+                # the last line may continue in the next chunk
+                remainder = lines.pop() if chunk else ""
+                if len(remainder) > BootScriptConstants.BOOT_SCRIPT_MAX_LINE_LENGTH:
+                    # scan an overlong line now instead of growing the buffer without a limit
+                    lines.append(remainder)
+                    remainder = remainder[-BootScriptConstants.BOOT_SCRIPT_LINE_OVERLAP:]
+                for line in lines:
+                    if BootScriptConstants.BOOT_SCRIPT_PASSED in line:
+                        passed = True
+                    score_match = score_regex.search(line)
+                    if score_match:
+                        score = int(score_match.group(1))
+                        bucket = score_match.group(2)
+                    if error_regex.search(line) and \
+                            len(error_lines) < BootScriptConstants.BOOT_SCRIPT_MAX_ERROR_LINES:
+                        error_lines.append(line.strip())
+                if not chunk:
+                    break
+        return BootScriptResult(passed, score, bucket, error_lines, None, time.time() - start_time)
+
+    @staticmethod
+    def __get_system_config_id(cfg_opts):
+        """
+        Gets an id of the SUT from its system configuration, which holds the SUT specific ITP, BMC and power
+        control settings.
+
+        :param cfg_opts: system configuration element
+        :return: hash of the system configuration, None without a configuration
+        """
+        if cfg_opts is None:
+            return None
+        return hashlib.sha1(ElementTree.tostring(cfg_opts)).hexdigest()
+
+    @staticmethod
+    def __get_cache_file_path():
+        """Gets the path of the bootscript decision cache file in the automation folder of the host"""
+        return os.path.join(Framework.CFG_BASE[platform.system()], BootScriptConstants.BOOT_SCRIPT_CACHE_FILE_NAME)
+
+    def __get_cache_key(self):
+        """Gets the cache key of the SUT, IFWI version if given and platform"""
+        return "{}|{}|{}".format(self._sut_id, self._ifwi_version or "-", self._cpu)
+
+    def __read_cache_file(self):
+        """
+        Reads the bootscript decision cache file, the last line of a key wins and a None entry removes the key.
+        Lines which can not be parsed e.g. a line being appended are skipped.
+
+        :return: dict of the cache entries, empty if the file does not exist or can not be read
+        """
+        cache = {}
+        try:
+            with open(self.__get_cache_file_path()) as cache_file:
+                for line in cache_file:
+                    try:
+                        record = json.loads(line)
+                        key, entry = record["key"], record["entry"]
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    if entry is None:
+                        cache.pop(key, None)
+                    else:
+                        cache[key] = entry
+        except (IOError, OSError, KeyError) as ex:
+            self._log.debug("Bootscript decision cache is not available due to '{}'".format(ex))
+        return cache
+
+    def __write_cache_entry(self, key, entry):
+        """
+        Appends the entry to the bootscript decision cache file as a single line written in one call, so
+        concurrent processes neither lose updates nor see a partial entry.
+
+        :param key: cache key
+        :param entry: dict with the stepping and the decision, None to remove the key
+        """
+        line = json.dumps({"key": key, "entry": entry}, sort_keys=True) + "\n"
+        try:
+            with open(self.__get_cache_file_path(), "a") as cache_file:
+                cache_file.write(line)
+        except (IOError, OSError, KeyError) as ex:
+            self._log.debug("Failed to update the bootscript decision cache due to '{}'".format(ex))
+
+    def __get_cached_decision(self):
+        """
+        Gets the bootscript decision of the SUT from the process cache, then from the cache file.
+
+        :return: dict with the stepping and the decision else None
+        """
+        if self._sut_id is None:
+            return None
+        key = self.__get_cache_key()
+        with BootScript._lock:
+            entry = BootScript._decisions.get(key)
+        if entry is None:
+            entry = self.__read_cache_file().get(key)
+            if entry is not None:
+                with BootScript._lock:
+                    BootScript._decisions[key] = entry
+        return entry
+
+    def invalidate_boot_script_cache(self):
+        """
+        This function drops the cached bootscript decision of the SUT, e.g. after a CPU swap.
+
+        :return: None
+        """
+        key = self.__get_cache_key()
+        with BootScript._lock:
+            BootScript._decisions.pop(key, None)
+        self.__write_cache_entry(key, None)
+
+    def get_stepping(self):
+        """
+        This function gets the stepping of the target, from the cache when the SUT was already checked.
+
+        :return: stepping string
+        :raise: Exception from PythonSV if the stepping can not be read
+        """
+        entry = self.__get_cached_decision()
+        if entry is not None:
+            return entry["stepping"]
+        return self.__read_stepping()
+
+    def __read_stepping(self):
+        """Reads the stepping of the target from PythonSV"""
+        self._sv.refresh()
+        sockets = self._sv.get_sockets()
+        return str(sockets[0].uncore.target_info.stepping)
 
     def is_booscript_required(self):
         """
-        This function checks if bootscript is required to boot the system
+        This function checks if bootscript is required to boot the system. The decision only depends on the
+        platform and stepping, so it is cached per SUT and the PythonSV refresh is skipped for the SUTs which
+        were already checked.
 
         :return: str - True if bootscript required else False
         """
+        entry = self.__get_cached_decision()
+        if entry is not None:
+            self._log.info("Platform='{}' and stepping='{}' (cached)".format(self._cpu, entry["stepping"]))
+            return entry["required"]
         try:
-            list_stepping = BootScriptConstants.SILICON_REQUIRES_BOOTSCRIPT[self._cpu]
+            list_stepping = BootScriptConstants.SILICON_REQUIRES_BOOTSCRIPT.get(self._cpu, [])
             # get the target stepping info
-            self._sv.refresh()
-            sockets = self._sv.get_sockets()
-            stepping = sockets[0].uncore.target_info.stepping
+            stepping = self.__read_stepping()
             self._log.info("Platform='{}' and stepping='{}'".format(self._cpu, stepping))
-            if stepping and str(stepping).upper() in str(list_stepping).upper():
-                self._log.info("The bootscript is required for this target..")
-                return True
-            self._log.info("The bootscript is not required for this target..")
-            return False
+            required = bool(stepping) and stepping.upper() in str(list_stepping).upper()
         except Exception as ex:
-            stepping = None
             self._log.error("Failed to get stepping info due to exception '{}'".format(ex))
-        return False
+            return False
+
+        if self._sut_id is not None:
+            entry = {"stepping": stepping, "required": required}
+            key = self.__get_cache_key()
+            with BootScript._lock:
+                BootScript._decisions[key] = entry
+            self.__write_cache_entry(key, entry)
+        if required:
+            self._log.info("The bootscript is required for this target..")
+        else:
+            self._log.info("The bootscript is not required for this target..")
+        return required
 
-    def run_boot_script(self):
+    def run_boot_script(self, trigger_engine=None):
         """
         This function will run the boot script go from PythonSV.
 
+        :param trigger_engine: LogTriggerEngine to run against the boot script log, the AC power off / on
+        engine of get_trigger_engine by default
         :return: boolean - True if boot script is passed else False.
         """
         # first check if we need to run boot script
@@ -139,21 +336,36 @@ class BootScript(object):
         # get the boot script object
         bs = self._sv.get_bootscript_obj()
 
-        sut_power_cycle_thread = threading.Thread(target=self.parse_boot_script_log,
-                                                  args=(self._bootscript_file_path,))
-        # start the thread to ac power off and on by parsing boot script log file
-        sut_power_cycle_thread.start()
+        if trigger_engine is None:
+            trigger_engine = self.get_trigger_engine()
+        # start the trigger engine to ac power off and on by parsing boot script log file
+        trigger_engine.start()
 
         self._log.info("Starting boot script...")
+        start_time = time.time()
         bs.go(warm_reset_timeout=200)  # with log level > normal, need additional timeout for warm_reset
+        run_time = time.time() - start_time
         self._sdp.stop_log()
+        # the rules not fired yet e.g. the AC power on still run, bounded by their timeouts
+        if not trigger_engine.wait(BootScriptConstants.TRIGGER_ACTION_TIMEOUT):
+            self._log.warning("Trigger engine did not complete after the boot script, stopping it...")
+            trigger_engine.stop()
+        trigger_results = trigger_engine.join(BootScriptConstants.TRIGGER_ACTION_TIMEOUT)
+        if trigger_engine.is_alive():
+            self._log.error("Trigger action is still running {} seconds after stopping the trigger engine, not "
+                            "waiting for it...".format(BootScriptConstants.TRIGGER_ACTION_TIMEOUT))
+        for result in list(trigger_results.values()):
+            self._log.debug("Trigger '{}' fired={} latency={}".format(result.name, result.fired, result.latency))
         self._log.info("Boot script execution complete and refer to log file '{}' for more "
                   "details.".format(self._bootscript_file_path))
 
         # read boot script log
-        obj_log_file = open(self._bootscript_file_path, 'r')
-        bs_log = str(obj_log_file.readlines())
-        if BootScriptConstants.BOOT_SCRIPT_PASSED not in bs_log:
+        self.last_result = self.extract_boot_script_result(self._bootscript_file_path)._replace(run_time=run_time)
+        self._log.info("Boot script score='{}' bucket='{}' run time={:.1f}s".format(
+            self.last_result.score, self.last_result.bucket, run_time))
+        if not self.last_result.passed:
+            for error_line in self.last_result.error_lines:
+                self._log.error(error_line)
             self._log.error("Boot script failed...")
             return False
 
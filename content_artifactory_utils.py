@@ -23,6 +23,7 @@
 import re
 import os
 import subprocess
+import threading
 
 import requests
 import six
@@ -57,19 +58,21 @@ class ContentArtifactoryUtils(object):
         self._cfg = cfg_opts
         pass
 
-    def artifactory_download_tool_to_host(self, artifactory_tool_path, host_tool_path, host_tool_folder_path):
+    def artifactory_download_tool_to_host(self, artifactory_tool_path, host_tool_path, host_tool_folder_path,
+                                          timeout=None):
         """
         Helper methods that performs the artifactory tool download to the host
 
         :param artifactory_tool_path
         :param host_tool_path
         :param host_tool_folder_path
+        :param timeout: seconds to wait for the download, no limit if None
         """
         self._log.info("Downloading the Tools from Artifactory...")
         full_command = Artifactory.DOWNLOADING_CMD.format(artifactory_tool_path, host_tool_path)
         self._log.info("Curl Command to copy Tools to Host- {}".format(full_command))
         try:
-            std_out = self._execute_cmd_on_host(cmd_line=full_command)
+            std_out = self._execute_cmd_on_host(cmd_line=full_command, timeout=timeout)
         except Exception as exception:
             if self.FILE_NOT_FOUND_ERROR in str(exception):
                 log_error = "Please Upload the Tools in Artifactory Under Path- '{}'".format(artifactory_tool_path)
@@ -81,12 +84,13 @@ class ContentArtifactoryUtils(object):
         self._log.info("Downloading output - {}".format(std_out))
         self._log.info("Tools got Downloaded from Artifactory to the Host path- {}".format(host_tool_folder_path))
 
-    def download_tool_to_automation_tool_folder(self, tool_name, exec_env=None):
+    def download_tool_to_automation_tool_folder(self, tool_name, exec_env=None, timeout=None):
         """
         This method is to Download the tools from artifactory to C:\Automation\Tool
 
         :param tool_name
         :param exec_env
+        :param timeout: seconds to wait for the download, no limit if None
         :return tool path
         """
         exec_os = platform.system()
@@ -137,20 +141,23 @@ class ContentArtifactoryUtils(object):
         self._log.info("Host Tools Path to Copy {} Tools at {}".format(tool_name, host_tool_path))
 
         if not os.path.isfile(host_tool_path):
-            self.artifactory_download_tool_to_host(artifactory_tool_path, host_tool_path, host_tool_folder_path)
+            self.artifactory_download_tool_to_host(artifactory_tool_path, host_tool_path, host_tool_folder_path,
+                                                   timeout)
         else:
             if self._common_content_configuration.artifactory_tool_overwrite():
-                self.artifactory_download_tool_to_host(artifactory_tool_path, host_tool_path, host_tool_folder_path)
+                self.artifactory_download_tool_to_host(artifactory_tool_path, host_tool_path, host_tool_folder_path,
+                                                       timeout)
             else:
                 self._log.info("Tools Already available under the Host Folder- {}".format(host_tool_folder_path))
         self._log.info(host_tool_path)
         return host_tool_path.strip()
 
-    def _execute_cmd_on_host(self, cmd_line, cwd=None):
+    def _execute_cmd_on_host(self, cmd_line, cwd=None, timeout=None):
         """
         This function executes command line on HOST and returns the stdout.
 
         :param cmd_line: command line to execute
+        :param timeout: seconds to wait for the command, no limit if None
 
         :raises RunTimeError: if command line failed to execute or returns error
         :return: returns stdout of the command
@@ -160,7 +167,29 @@ class ContentArtifactoryUtils(object):
         else:
             process_obj = subprocess.Popen(cmd_line, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
                                            shell=True)
-        stdout, stderr = process_obj.communicate()
+        # communicate has no timeout on Python 2, a timer kills the command and communicate returns on its exit
+        timed_out = threading.Event()
+
+        def kill_process():
+            timed_out.set()
+            try:
+                process_obj.kill()
+            except OSError:
+                pass
+
+        timer = threading.Timer(timeout, kill_process) if timeout else None
+        if timer:
+            timer.daemon = True
+            timer.start()
+        try:
+            stdout, stderr = process_obj.communicate()
+        finally:
+            if timer:
+                timer.cancel()
+        if timed_out.is_set() and process_obj.returncode != 0:
+            log_error = "The command '{}' did not complete in {} seconds...".format(cmd_line, timeout)
+            self._log.error(log_error)
+            raise RuntimeError(log_error)
 
         if process_obj.returncode != 0:
             log_error = "The command '{}' failed with error '{}' ...".format(cmd_line, stderr)
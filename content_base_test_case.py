@@ -48,6 +48,7 @@ from src.lib.dtaf_content_constants import PhysicalProviderConstants
 from src.lib.dtaf_content_constants import PlatformType
 from src.lib.dtaf_content_constants import PlatformEnvironment
 from src.lib.grub_util import GrubUtil
+from src.lib.sut_identity import SutIdentityProbe
 from src.lib.dtaf_content_constants import ProviderXmlConfigs
 from src.lib.content_artifactory_utils import ContentArtifactoryUtils
 
@@ -214,6 +215,7 @@ class ContentBaseTestCase(BaseTestCase):
         """Performs graceful shutdown"""
         self._log.info("Performs shutdown and boot the SUT")
         self._common_content_lib.perform_graceful_ac_off_on(self.ac_power)
+        SutIdentityProbe.invalidate_sut(self._common_content_lib)
         self._common_content_lib.wait_for_os(self.reboot_timeout)
         time.sleep(self.WAIT_TIME)
 
@@ -271,6 +273,7 @@ class ContentBaseTestCase(BaseTestCase):
                         self.bios_util.set_bios_knob()
                     if self._platform_environment == PlatformEnvironment.SIMICS:
                         self._common_content_lib.perform_os_reboot(self.reboot_timeout)
+                        SutIdentityProbe.invalidate_sut(self._common_content_lib)
                     else:
                         self.perform_graceful_g3()
 
@@ -313,6 +316,7 @@ class ContentBaseTestCase(BaseTestCase):
                     pass
             self._log.info("AC On")
             self.ac_power.ac_power_on(self.AC_TIMEOUT)
+            SutIdentityProbe.invalidate_sut(self._common_content_lib)
             self._log.info("Waiting for OS")
             if self._common_content_lib.is_bootscript_required():
                 self._common_content_lib.execute_boot_script()
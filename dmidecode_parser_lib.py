@@ -21,10 +21,11 @@
 #################################################################################
 import os
 
-from dmidecode import DMIParse
+from dtaf_core.lib.dtaf_constants import OperatingSystems
 
 from content_configuration import ContentConfiguration
 from common_content_lib import CommonContentLib
+from src.lib.smbios_decoder import SmbiosTableDecoder
 
 
 class DmiDecodeParser(object):
@@ -35,6 +36,10 @@ class DmiDecodeParser(object):
     """
 
     dmi_output = None
+    DMI_TEXT_FILE_NAME = "dmi.txt"
+    DMI_BINARY_FILE_NAME = "dmi.bin"
+    SUT_DMI_BINARY_PATH = "/tmp/dmi.bin"
+    DUMP_BIN_CMD = "dmidecode --dump-bin {}"
 
     def __init__(self, log, os_obj):
         self._log = log
@@ -44,26 +49,79 @@ class DmiDecodeParser(object):
         self._common_content_configuration = ContentConfiguration(self._log)
         self._command_timeout = self._common_content_configuration.get_command_timeout()
 
-    def dmidecode_parser(self, log_path_to_parse):
+    def dmidecode_parser(self, log_path_to_parse, dmi_file_name=None):
         """
-        Function to fetch the attribute values from the xml configuration file.
+        Function to convert the dmidecode output in the log folder to a dict, the SMBIOS table binary (dmi.bin) is
+        decoded natively, the dmidecode text output (dmi.txt) is parsed with DMIParse. When both files exist, the
+        most recently modified one is used, so a stale file of a previous collection is not parsed.
 
+        :param log_path_to_parse: folder of dmi.bin or dmi.txt
+        :param dmi_file_name: DMI_BINARY_FILE_NAME or DMI_TEXT_FILE_NAME to parse this file only, the newest file
+        by default
         :return: dmidecode output as dict.
+        :raise IOError: if none of the files exists
         """
-        dmi_path = os.path.join(log_path_to_parse, "dmi.txt")
-        if os.path.isfile(dmi_path):
-            with open(dmi_path, "r") as dmi_file:
-                self.dmi_output = dmi_file.read()
-            verify_dmi = ""
-
-            instance_dmiparse = DMIParse(verify_dmi)
-            dmi_decode_from_cmd_line = instance_dmiparse.dmidecode_parse((self.dmi_output.replace("<", ""))
-                                                                         .replace(">", ""))
-            self._log.info("OS provided SMBIOS dmidecode informaton.. \n {}".format(dmi_decode_from_cmd_line))
-
-            return dmi_decode_from_cmd_line
-        else:
+        dmi_file_names = [dmi_file_name] if dmi_file_name else [self.DMI_BINARY_FILE_NAME, self.DMI_TEXT_FILE_NAME]
+        dmi_paths = [os.path.join(log_path_to_parse, file_name) for file_name in dmi_file_names]
+        dmi_paths = [path for path in dmi_paths if os.path.isfile(path)]
+        dmi_path = max(dmi_paths, key=os.path.getmtime) if dmi_paths else \
+            os.path.join(log_path_to_parse, dmi_file_names[-1])
+        if not os.path.isfile(dmi_path):
             err_log = "Dmi decode file '{}' does not exists, please populate the file and " \
                       "run test again..".format(dmi_path)
             self._log.error(err_log)
             raise IOError(err_log)
+
+        if os.path.basename(dmi_path) == self.DMI_BINARY_FILE_NAME:
+            return self.dmidecode_binary_parser(dmi_path)
+
+        from dmidecode import DMIParse
+
+        with open(dmi_path, "r") as dmi_file:
+            self.dmi_output = dmi_file.read()
+        verify_dmi = ""
+
+        instance_dmiparse = DMIParse(verify_dmi)
+        # DMIParse does not expect the <> around the dmidecode values like <OUT OF SPEC>
+        dmi_decode_from_cmd_line = instance_dmiparse.dmidecode_parse(
+            self.dmi_output.replace("<", "").replace(">", ""))
+        self._log.info("OS provided SMBIOS dmidecode information has {} structures"
+                       .format(len(dmi_decode_from_cmd_line)))
+        self._log.debug("OS provided SMBIOS dmidecode information.. \n {}".format(dmi_decode_from_cmd_line))
+
+        return dmi_decode_from_cmd_line
+
+    def dmidecode_binary_parser(self, dmi_bin_path):
+        """
+        Function to decode the SMBIOS table binary written by 'dmidecode --dump-bin' or copied from
+        /sys/firmware/dmi/tables/DMI to the same dict as the dmidecode text output.
+
+        :param dmi_bin_path: path of the SMBIOS table binary
+        :return: dmidecode output as dict.
+        """
+        decoder = SmbiosTableDecoder.load(dmi_bin_path)
+        dmi_decode_from_table = decoder.to_dmidecode_dict()
+        self._log.info("Decoded {} SMBIOS {}.{} structures from '{}'".format(
+            len(dmi_decode_from_table), decoder.version[0], decoder.version[1], dmi_bin_path))
+        self._log.debug("OS provided SMBIOS dmidecode information.. \n {}".format(dmi_decode_from_table))
+
+        return dmi_decode_from_table
+
+    def collect_smbios_table(self, log_path_to_save):
+        """
+        Function to dump the SMBIOS table binary on the Linux SUT and copy it to the log folder as dmi.bin, which
+        is much smaller than the dmidecode text output and is decoded by dmidecode_parser.
+
+        :param log_path_to_save: log folder on the host
+        :return: path of dmi.bin on the host
+        :raise NotImplementedError: if the SUT is not Linux
+        """
+        if self._os.os_type != OperatingSystems.LINUX:
+            raise NotImplementedError("Dumping the SMBIOS table binary is not implemented for {}".format(
+                self._os.os_type))
+        self._common_content_lib.execute_sut_cmd(self.DUMP_BIN_CMD.format(self.SUT_DMI_BINARY_PATH),
+                                                 "Dump the SMBIOS table binary", self._command_timeout)
+        dmi_bin_path = os.path.join(log_path_to_save, self.DMI_BINARY_FILE_NAME)
+        self._os.copy_file_from_sut_to_local(self.SUT_DMI_BINARY_PATH, dmi_bin_path)
+        self._log.info("SMBIOS table binary has been copied to '{}'".format(dmi_bin_path))
+        return dmi_bin_path
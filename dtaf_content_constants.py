@@ -103,10 +103,20 @@ class BootScriptConstants:
     POWER_ON_PATTERN = "Waiting up to 15.00 seconds to reach break: power_on"
     BOOTSCRIPT_LOG_FILE_NAME = "boot_script.log"
     POWER_OFF_ON_TRIGGER_WAIT_TIME = 100
+    # time in seconds a trigger action e.g. AC power on is given to complete after its rule timeouts
+    TRIGGER_ACTION_TIMEOUT = 60
     BOOT_SCRIPT_PASS_SCORE_1800 = "BOOTSCRIPT SCORE IS: 1800 (Bucket: WARM_CPU_RESET_BREAK)"
     BOOT_SCRIPT_PASS_SCORE_2200 = "BOOTSCRIPT SCORE IS: 2200 (Bucket: BREAKS_DONE)"
     BOOT_SCRIPT_PASSED = "BOOTSCRIPT PASSED: THERE WERE NO ERRORS IN BOOTSCRIPT EXECUTION"
     BOOT_SCRIPT_NOT_REQUIRED = "Bootscript not required for this target."
+    BOOT_SCRIPT_SCORE_REGEX = r"BOOTSCRIPT SCORE IS:\s*(\d+)\s*\(Bucket:\s*(\w+)\)"
+    BOOT_SCRIPT_ERROR_REGEX = r"\b(ERROR|FAILED|FAILURE)\b"
+    BOOT_SCRIPT_LOG_READ_SIZE = 1024 * 1024
+    BOOT_SCRIPT_MAX_ERROR_LINES = 100
+    # a line longer than this is scanned in pieces, the overlap keeps a marker cut in two in the next piece
+    BOOT_SCRIPT_MAX_LINE_LENGTH = 64 * 1024
+    BOOT_SCRIPT_LINE_OVERLAP = 256
+    BOOT_SCRIPT_CACHE_FILE_NAME = "boot_script_cache.jsonl"
 
 
 class ProviderXmlConfigs:
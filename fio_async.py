@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+#################################################################################
+# INTEL CONFIDENTIAL
+# Copyright Intel Corporation All Rights Reserved.
+#
+# The source code contained or described herein and all documents related to
+# the source code ("Material") are owned by Intel Corporation or its suppliers
+# or licensors. Title to the Material remains with Intel Corporation or its
+# suppliers and licensors. The Material may contain trade secrets and proprietary
+# and confidential information of Intel Corporation and its suppliers and
+# licensors, and is protected by worldwide copyright and trade secret laws and
+# treaty provisions. No part of the Material may be used, copied, reproduced,
+# modified, published, uploaded, posted, transmitted, distributed, or disclosed
+# in any way without Intel's prior express written permission.
+#
+# No license under any patent, copyright, trade secret or other intellectual
+# property right is granted to or conferred upon you by disclosure or delivery
+# of the Materials, either expressly, by implication, inducement, estoppel or
+# otherwise. Any license under such intellectual property rights must be express
+# and approved by Intel in writing.
+#################################################################################
+import time
+from collections import deque
+
+from src.lib import content_exceptions
+from src.lib.fio_results import FioResultParser
+
+
+class FioAsyncJob(object):
+    """
+    Handle of a fio run started in the background with --status-interval.
+
+    Each poll reads only the part of the output file written since the previous poll, decodes the new status
+    reports into a rolling series of FioSample and checks the abort rules, so a run which breaks a rule is stopped
+    at the next poll instead of at the end of its runtime.
+
+    The run writes its pid file just before fio starts, see get_start_command. Until the pid file exists the run is
+    starting, and the output file is read only if it is not older than the pid file, so the output of a previous
+    run is never decoded.
+    """
+    MAX_SAMPLES = 8640
+    START_CMD = "echo $$ > {0}; exec {1}"
+    POLL_CMD = "size=0; [ -f {3} ] && [ ! {0} -ot {3} ] && size=$(stat -c %s {0} 2>/dev/null || echo 0); " \
+               "echo $size; if [ ! -f {3} ]; then echo starting; " \
+               "elif kill -0 $(cat {3}) 2>/dev/null; then echo running; else echo stopped; fi; " \
+               "[ $size -gt {1} ] && tail -c +{2} {0} | head -c $(($size - {1})); true"
+    STOP_CMD = "[ -f {0} ] && kill -INT $(cat {0}) 2>/dev/null || true"
+
+    def __init__(self, log, common_content_lib, output_path, pid_path, status_interval, command_timeout,
+                 abort_rules=None, max_samples=MAX_SAMPLES):
+        """
+        :param log: log object
+        :param common_content_lib: common content lib object to execute the SUT commands
+        :param output_path: absolute path of the fio output file on the SUT
+        :param pid_path: absolute path of the pid file of the run on the SUT, removed before the run is started
+        :param status_interval: fio --status-interval in seconds, the default poll interval
+        :param command_timeout: timeout of the SUT commands in seconds
+        :param abort_rules: list of FioAbortRule
+        :param max_samples: number of samples kept
+        """
+        self._log = log
+        self._common_content_lib = common_content_lib
+        self.output_path = output_path
+        self.pid_path = pid_path
+        self.status_interval = status_interval
+        self._command_timeout = command_timeout
+        self.abort_rules = list(abort_rules or [])
+        self.samples = deque(maxlen=max_samples)
+        self.last_report = None
+        self.abort_reason = None
+        self._offset = 0
+        self._buffer = ""
+        self._running = True
+        self._breach_start_ms = {}
+
+    @property
+    def is_running(self):
+        """False once a poll found the fio process gone"""
+        return self._running
+
+    @classmethod
+    def get_start_command(cls, fio_cmd, pid_path):
+        """
+        Gets the command which writes the pid file of the run and replaces itself with fio.
+
+        :param fio_cmd: fio command
+        :param pid_path: absolute path of the pid file on the SUT
+        :return: command to start with execute_async
+        """
+        return cls.START_CMD.format(pid_path, fio_cmd)
+
+    def poll(self):
+        """
+        Reads the new status reports of the run.
+
+        :return: list of the new FioSample
+        """
+        output = self._common_content_lib.execute_sut_cmd(
+            self.POLL_CMD.format(self.output_path, self._offset, self._offset + 1, self.pid_path), "poll fio status",
+            self._command_timeout)
+        lines = output.split("\n", 2)
+        size = int(lines[0].strip()) if lines[0].strip().isdigit() else self._offset
+        self._running = len(lines) > 1 and lines[1].strip() in ("starting", "running")
+        if size > self._offset:
+            self._buffer += lines[2] if len(lines) > 2 else ""
+            self._offset = size
+        reports, consumed = FioResultParser.decode_reports(self._buffer)
+        self._buffer = self._buffer[consumed:]
+
+        new_samples = []
+        for report in reports:
+            report = FioResultParser.parse_report(report)
+            sample = FioResultParser.get_sample(self.last_report, report)
+            self.last_report = report
+            if sample is None:
+                continue
+            self.samples.append(sample)
+            new_samples.append(sample)
+            if self.abort_reason is None:
+                self.__check_abort_rules(sample)
+        return new_samples
+
+    def __check_abort_rules(self, sample):
+        """Stops the run if a rule has been broken for its duration up to the sample"""
+        for index, rule in enumerate(self.abort_rules):
+            value = getattr(sample, rule.metric)[rule.direction]
+            if value is None or ((rule.min_value is None or value >= rule.min_value) and
+                                 (rule.max_value is None or value <= rule.max_value)):
+                self._breach_start_ms.pop(index, None)
+                continue
+            start_ms = self._breach_start_ms.setdefault(index, sample.timestamp_ms - sample.interval_ms)
+            if sample.timestamp_ms - start_ms >= rule.duration_sec * 1000:
+                self.abort_reason = "fio {} {}={} out of [{}, {}] for {} seconds".format(
+                    rule.direction, rule.metric, value, rule.min_value, rule.max_value, rule.duration_sec)
+                self._log.error("Stopping {}".format(self.abort_reason))
+                self.stop()
+                return
+
+    def stop(self):
+        """
+        Stops the run, fio writes its final report when interrupted.
+
+        :return: None
+        """
+        self._common_content_lib.execute_sut_cmd(self.STOP_CMD.format(self.pid_path), "stop fio",
+                                                 self._command_timeout)
+
+    def wait(self, timeout, poll_interval=None):
+        """
+        Polls the run until fio has started and exited.
+
+        :param timeout: timeout in seconds
+        :param poll_interval: seconds between two polls, the status interval by default
+        :return: final FioReport of the run
+        :raise: content_exceptions.TestFail if an abort rule was broken, the run did not finish in time or has
+        no report
+        """
+        end_time = time.time() + timeout
+        while True:
+            self.poll()
+            if not self._running:
+                break
+            if time.time() > end_time:
+                self.stop()
+                raise content_exceptions.TestFail("fio did not finish in {} seconds".format(timeout))
+            time.sleep(self.status_interval if poll_interval is None else poll_interval)
+        # the final report may be written after the last size check
+        self.poll()
+        if self.abort_reason:
+            raise content_exceptions.TestFail("fio was stopped early: {}".format(self.abort_reason))
+        if self.last_report is None:
+            raise content_exceptions.TestFail("fio has no JSON report in '{}'".format(self.output_path))
+        return self.last_report
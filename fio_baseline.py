@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+#################################################################################
+# INTEL CONFIDENTIAL
+# Copyright Intel Corporation All Rights Reserved.
+#
+# The source code contained or described herein and all documents related to
+# the source code ("Material") are owned by Intel Corporation or its suppliers
+# or licensors. Title to the Material remains with Intel Corporation or its
+# suppliers and licensors. The Material may contain trade secrets and proprietary
+# and confidential information of Intel Corporation and its suppliers and
+# licensors, and is protected by worldwide copyright and trade secret laws and
+# treaty provisions. No part of the Material may be used, copied, reproduced,
+# modified, published, uploaded, posted, transmitted, distributed, or disclosed
+# in any way without Intel's prior express written permission.
+#
+# No license under any patent, copyright, trade secret or other intellectual
+# property right is granted to or conferred upon you by disclosure or delivery
+# of the Materials, either expressly, by implication, inducement, estoppel or
+# otherwise. Any license under such intellectual property rights must be express
+# and approved by Intel in writing.
+#################################################################################
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from src.lib.fio_results import FIO_DIRECTIONS
+
+# Key of the results compared with each other, workload is the fio rw value with the direction, e.g. randrw:read
+FioBaselineKey = namedtuple("FioBaselineKey", ["platform", "drive_model", "workload", "block_size"])
+# One stored result, metrics is a dict of the metric name to its value, label is e.g. the IFWI version
+FioBaselineRecord = namedtuple("FioBaselineRecord", ["key", "metrics", "timestamp", "label"])
+# Comparison of one metric with its history. score is the robust z-score (0.6745 * deviation / MAD), positive
+# when the value is worse than the median.
+FioRegression = namedtuple("FioRegression", ["key", "metric", "value", "median", "mad", "score", "samples",
+                                             "regressed"])
+# Median of the metrics of one label in a trend report
+FioTrendPoint = namedtuple("FioTrendPoint", ["label", "samples", "metrics"])
+
+
+def median(values):
+    """Gets the median of a non empty list of numbers"""
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2.0
+
+
+class FioBaselineStore(object):
+    """
+    History of fio results in a JSON lines file, one result per line, to find the results which are significantly
+    worse than the previous results of the same platform, drive model, workload and block size.
+
+    A result regresses when it is worse than the median of the history by more than MIN_RELATIVE_CHANGE and its
+    robust z-score, which ignores the outliers of the history, is above REGRESSION_SCORE. The relative change
+    keeps a very stable history (small or zero MAD) from flagging run to run noise. Lines are only appended, so
+    several hosts can share the file, and the records are read again only when the file changed.
+    """
+    METRICS = ("bw_bytes", "iops", "lat_mean_ns", "clat_p99_ns")
+    # metrics for which a higher value is better
+    HIGHER_IS_BETTER = ("bw_bytes", "iops")
+    REGRESSION_SCORE = 3.5
+    MIN_RELATIVE_CHANGE = 0.05
+    MIN_SAMPLES = 5
+    MAD_SCALE = 0.6745
+
+    def __init__(self, store_path):
+        """
+        :param store_path: JSON lines file, created by the first add
+        """
+        self.store_path = store_path
+        self._lock = threading.Lock()
+        self._file_state = None
+        self._records = OrderedDict()
+
+    def __load(self):
+        """Reads the records again if the file changed since the last read"""
+        try:
+            stat = os.stat(self.store_path)
+        except OSError:
+            self._file_state = None
+            self._records = OrderedDict()
+            return
+        file_state = (stat.st_mtime, stat.st_size)
+        if file_state == self._file_state:
+            return
+        records = OrderedDict()
+        with open(self.store_path, "r") as store_file:
+            for line in store_file:
+                try:
+                    record = self.__from_dict(json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    # a line being written by another host
+                    continue
+                records.setdefault(record.key, []).append(record)
+        self._records = records
+        self._file_state = file_state
+
+    @staticmethod
+    def __from_dict(values):
+        """Creates a record from its JSON dict"""
+        return FioBaselineRecord(FioBaselineKey(*values["key"]), values["metrics"], values["timestamp"],
+                                 values.get("label"))
+
+    def add(self, record):
+        """
+        Appends a record to the store.
+
+        :param record: FioBaselineRecord
+        :return: None
+        """
+        line = json.dumps({"key": list(record.key), "metrics": record.metrics, "timestamp": record.timestamp,
+                           "label": record.label}, sort_keys=True)
+        with self._lock:
+            with open(self.store_path, "a") as store_file:
+                store_file.write(line + "\n")
+
+    def get_records(self, key):
+        """
+        Gets the stored records of a key.
+
+        :param key: FioBaselineKey
+        :return: list of FioBaselineRecord in insertion order
+        """
+        with self._lock:
+            self.__load()
+            return list(self._records.get(key, []))
+
+    def get_keys(self, platform=None):
+        """
+        Gets the stored keys.
+
+        :param platform: platform family to filter the keys, all platforms by default
+        :return: list of FioBaselineKey
+        """
+        with self._lock:
+            self.__load()
+            return [key for key in self._records if platform is None or key.platform == platform]
+
+    @classmethod
+    def get_report_records(cls, report, platform, drive_model, label=None, timestamp=None):
+        """
+        Gets the records of the jobs of a fio report, one per job and direction with IOs.
+
+        :param report: FioReport
+        :param platform: platform family
+        :param drive_model: model of the drive under test
+        :param label: e.g. IFWI version of the SUT
+        :param timestamp: time of the results, the report timestamp by default
+        :return: list of FioBaselineRecord
+        """
+        records = []
+        for job in report.jobs:
+            workload = job.options.get("rw", job.name)
+            block_size = job.options.get("bs", "")
+            for direction in FIO_DIRECTIONS:
+                stats = getattr(job, direction)
+                if stats is None or not stats.io_bytes:
+                    continue
+                metrics = {"bw_bytes": stats.bw_bytes, "iops": stats.iops, "lat_mean_ns": stats.lat_mean_ns,
+                           "clat_p99_ns": stats.clat_percentiles.get(99.0)}
+                key = FioBaselineKey(platform, drive_model, "{}:{}".format(workload, direction), block_size)
+                records.append(FioBaselineRecord(key, metrics, timestamp or report.timestamp or time.time(), label))
+        return records
+
+    def check(self, record, min_samples=MIN_SAMPLES):
+        """
+        Compares the metrics of a record with the history of its key, the record itself is not stored.
+
+        :param record: FioBaselineRecord
+        :param min_samples: minimum number of stored values of a metric to compare it
+        :return: list of FioRegression, one per metric with enough history
+        """
+        history = self.get_records(record.key)
+        results = []
+        for metric in self.METRICS:
+            value = record.metrics.get(metric)
+            values = [past.metrics[metric] for past in history if past.metrics.get(metric) is not None]
+            if value is None or len(values) < min_samples:
+                continue
+            center = median(values)
+            mad = median([abs(past_value - center) for past_value in values])
+            # deviation in the worse direction of the metric
+            deviation = center - value if metric in self.HIGHER_IS_BETTER else value - center
+            if mad:
+                score = self.MAD_SCALE * deviation / mad
+            else:
+                score = float("inf") if deviation > 0 else 0.0
+            regressed = score > self.REGRESSION_SCORE and deviation > self.MIN_RELATIVE_CHANGE * abs(center)
+            results.append(FioRegression(record.key, metric, value, center, mad, score, len(values), regressed))
+        return results
+
+    def get_trend_report(self, platform):
+        """
+        Gets the median of each metric by label (e.g. IFWI version) for the keys of a platform, labels in the order
+        of their first record.
+
+        :param platform: platform family
+        :return: OrderedDict of FioBaselineKey to the list of FioTrendPoint
+        """
+        report = OrderedDict()
+        for key in self.get_keys(platform):
+            by_label = OrderedDict()
+            for record in self.get_records(key):
+                by_label.setdefault(record.label, []).append(record)
+            points = []
+            for label, records in by_label.items():
+                metrics = {}
+                for metric in self.METRICS:
+                    values = [record.metrics[metric] for record in records if record.metrics.get(metric) is not None]
+                    metrics[metric] = median(values) if values else None
+                points.append(FioTrendPoint(label, len(records), metrics))
+            report[key] = points
+        return report
+
+    def format_trend_report(self, platform):
+        """
+        Renders the trend report of a platform as text, one line per key and label.
+
+        :param platform: platform family
+        :return: report text
+        """
+        lines = ["{:<24} {:<28} {:<8} {:<24} {:>4} {:>14} {:>12} {:>12}".format(
+            "drive", "workload", "bs", "label", "n", "bw MB/s", "iops", "p99 us")]
+        for key, points in self.get_trend_report(platform).items():
+            for point in points:
+                p99 = point.metrics["clat_p99_ns"]
+                lines.append("{:<24} {:<28} {:<8} {:<24} {:>4} {:>14.1f} {:>12.0f} {:>12}".format(
+                    key.drive_model, key.workload, key.block_size, str(point.label), point.samples,
+                    point.metrics["bw_bytes"] / 1e6, point.metrics["iops"],
+                    "-" if p99 is None else "{:.1f}".format(p99 / 1e3)))
+        return "\n".join(lines)
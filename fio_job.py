@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+#################################################################################
+# INTEL CONFIDENTIAL
+# Copyright Intel Corporation All Rights Reserved.
+#
+# The source code contained or described herein and all documents related to
+# the source code ("Material") are owned by Intel Corporation or its suppliers
+# or licensors. Title to the Material remains with Intel Corporation or its
+# suppliers and licensors. The Material may contain trade secrets and proprietary
+# and confidential information of Intel Corporation and its suppliers and
+# licensors, and is protected by worldwide copyright and trade secret laws and
+# treaty provisions. No part of the Material may be used, copied, reproduced,
+# modified, published, uploaded, posted, transmitted, distributed, or disclosed
+# in any way without Intel's prior express written permission.
+#
+# No license under any patent, copyright, trade secret or other intellectual
+# property right is granted to or conferred upon you by disclosure or delivery
+# of the Materials, either expressly, by implication, inducement, estoppel or
+# otherwise. Any license under such intellectual property rights must be express
+# and approved by Intel in writing.
+#################################################################################
+import os
+import re
+import tempfile
+from collections import OrderedDict
+
+
+class FioJob(object):
+    """
+    One job of a fio job file. Options are rendered in insertion order, True renders a flag option (e.g.
+    time_based), None or False leaves the option out.
+    """
+    _DURATION_REGEX = re.compile(r"^\s*(\d+)\s*([smh]?)\s*$", re.IGNORECASE)
+    _DURATION_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600}
+
+    def __init__(self, name, **options):
+        """
+        :param name: job name, also the section name in the job file
+        :param options: fio options of the job
+        """
+        self.name = name
+        self.options = OrderedDict(options)
+
+    def set(self, **options):
+        """
+        Sets options of the job.
+
+        :param options: fio options
+        :return: the job, to chain the calls
+        """
+        self.options.update(options)
+        return self
+
+    @staticmethod
+    def render_option(key, value, prefix=""):
+        """
+        Renders one option, key=value or key for a flag.
+
+        :param key: option name
+        :param value: option value
+        :param prefix: "--" for the command line
+        :return: rendered option, None if the option is left out
+        """
+        if value is None or value is False:
+            return None
+        if value is True:
+            return "{}{}".format(prefix, key)
+        return "{}{}={}".format(prefix, key, value)
+
+    @classmethod
+    def render_options(cls, options, prefix=""):
+        """Renders the options which are not left out"""
+        rendered = (cls.render_option(key, value, prefix) for key, value in options.items())
+        return [option for option in rendered if option is not None]
+
+    def render(self):
+        """
+        Renders the job section.
+
+        :return: job file section text
+        """
+        return "\n".join(["[{}]".format(self.name)] + self.render_options(self.options)) + "\n"
+
+    def to_args(self):
+        """
+        Renders the job as command line arguments, --name starts a new job on the fio command line.
+
+        :return: list of arguments
+        """
+        return ["--name={}".format(self.name)] + self.render_options(self.options, "--")
+
+    @classmethod
+    def parse_duration(cls, value):
+        """
+        Parses a fio duration option.
+
+        :param value: e.g. 60, "60s", "5m"
+        :return: duration in seconds, 0 if the value is not a duration
+        """
+        match = cls._DURATION_REGEX.match(str(value))
+        if not match:
+            return 0
+        return int(match.group(1)) * cls._DURATION_UNITS[match.group(2).lower()]
+
+
+class FioJobSet(object):
+    """
+    Jobs run by one fio invocation, with the options of the global section shared by all jobs.
+
+    Jobs run concurrently unless a job has the stonewall option, which waits for the previous jobs to finish.
+    add_matrix uses it to run the jobs of each pattern and block size combination on all the drives at once, one
+    combination after the other.
+    """
+
+    def __init__(self, **global_options):
+        """
+        :param global_options: fio options of the global section
+        """
+        self.global_options = OrderedDict(global_options)
+        self.jobs = []
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def add_job(self, job):
+        """
+        Adds a job.
+
+        :param job: FioJob
+        :return: the job
+        """
+        self.jobs.append(job)
+        return job
+
+    def add_matrix(self, filenames, patterns, block_sizes, stonewall=True, **options):
+        """
+        Adds one job per drive, pattern and block size.
+
+        :param filenames: target drives or files
+        :param patterns: fio rw values, e.g. ["read", "randwrite"]
+        :param block_sizes: fio bs values, e.g. ["4k", "128k"]
+        :param stonewall: True to run the pattern and block size combinations one after the other, with one
+        reporting group each
+        :param options: fio options of every job of the matrix
+        :return: list of the added FioJob
+        """
+        jobs = []
+        for pattern in patterns:
+            for block_size in block_sizes:
+                for index, filename in enumerate(filenames):
+                    job = FioJob("{}_{}_{}".format(pattern, block_size, index), rw=pattern, bs=block_size,
+                                 filename=filename, **options)
+                    if stonewall and index == 0 and self.jobs:
+                        job.set(stonewall=True, new_group=True)
+                    jobs.append(self.add_job(job))
+        return jobs
+
+    def render(self):
+        """
+        Renders the job file.
+
+        :return: job file text
+        """
+        sections = []
+        if self.global_options:
+            sections.append("\n".join(["[global]"] + FioJob.render_options(self.global_options)) + "\n")
+        sections.extend(job.render() for job in self.jobs)
+        return "\n".join(sections)
+
+    def to_args(self):
+        """
+        Renders the job set as command line arguments, the global options come before the first job.
+
+        :return: list of arguments
+        """
+        args = FioJob.render_options(self.global_options, "--")
+        for job in self.jobs:
+            args.extend(job.to_args())
+        return args
+
+    def copy_to_sut(self, sut_os, sut_job_file):
+        """
+        Renders the job file on the host and copies it to the SUT.
+
+        :param sut_os: sut os object
+        :param sut_job_file: job file path on the SUT
+        :return: None
+        """
+        host_job_file, host_job_file_path = tempfile.mkstemp(suffix=".fio")
+        try:
+            with os.fdopen(host_job_file, "w") as job_file:
+                job_file.write(self.render())
+            sut_os.copy_local_file_to_sut(host_job_file_path, sut_job_file)
+        finally:
+            os.remove(host_job_file_path)
+
+    def get_estimated_runtime(self):
+        """
+        Estimates the run time from the runtime and ramp_time options, the jobs between two stonewalls run
+        concurrently.
+
+        :return: estimated run time in seconds, 0 if the jobs have no runtime
+        """
+        total = 0
+        group_runtime = 0
+        for job in self.jobs:
+            if job.options.get("stonewall"):
+                total += group_runtime
+                group_runtime = 0
+            options = OrderedDict(self.global_options)
+            options.update(job.options)
+            runtime = FioJob.parse_duration(options.get("runtime", 0)) + \
+                FioJob.parse_duration(options.get("ramp_time", 0))
+            group_runtime = max(group_runtime, runtime)
+        return total + group_runtime
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+#################################################################################
+# INTEL CONFIDENTIAL
+# Copyright Intel Corporation All Rights Reserved.
+#
+# The source code contained or described herein and all documents related to
+# the source code ("Material") are owned by Intel Corporation or its suppliers
+# or licensors. Title to the Material remains with Intel Corporation or its
+# suppliers and licensors. The Material may contain trade secrets and proprietary
+# and confidential information of Intel Corporation and its suppliers and
+# licensors, and is protected by worldwide copyright and trade secret laws and
+# treaty provisions. No part of the Material may be used, copied, reproduced,
+# modified, published, uploaded, posted, transmitted, distributed, or disclosed
+# in any way without Intel's prior express written permission.
+#
+# No license under any patent, copyright, trade secret or other intellectual
+# property right is granted to or conferred upon you by disclosure or delivery
+# of the Materials, either expressly, by implication, inducement, estoppel or
+# otherwise. Any license under such intellectual property rights must be express
+# and approved by Intel in writing.
+#################################################################################
+import re
+import time
+from collections import OrderedDict
+
+from dtaf_core.lib.dtaf_constants import OperatingSystems
+
+from src.lib import content_exceptions
+from src.lib.fio_job import FioJobSet
+from src.lib.fio_results import FioResultParser
+from src.lib.fio_tool import FioToolResolver
+
+
+class FioNumaRunner(object):
+    """
+    Runs one fio per NUMA node of the drives at the same time, each pinned to the CPUs and memory of its node.
+
+    The runs are started with execute_async, each one writes its exit code to a .done file when it ends, and the
+    .done files are polled until all the runs have finished.
+    """
+    ROOT = "/root"
+    FIO_OUTPUT_FORMAT = "--output-format=json+"
+    FIO_NUMA_FILE_PREFIX = "fio_numa_node"
+    FIO_NUMA_POLL_INTERVAL_SEC = 10
+    # walks up the sysfs device path of each block device to the first numa_node file, -1 if there is none
+    DRIVE_NUMA_NODE_CMD = "for drive in {}; do path=$(readlink -f /sys/class/block/$(basename $drive)); " \
+                          "while [ \"$path\" != \"/\" ] && [ ! -f \"$path/numa_node\" ]; do " \
+                          "path=$(dirname \"$path\"); done; echo \"$drive $(cat \"$path/numa_node\" 2>/dev/null " \
+                          "|| echo -1)\"; done"
+
+    def __init__(self, log, sut_os, common_content_lib, command_timeout, tool_resolver=None):
+        """
+        :param log: log object
+        :param sut_os: sut os object
+        :param common_content_lib: common content lib object to execute the SUT commands
+        :param command_timeout: timeout of the SUT commands in seconds
+        :param tool_resolver: FioToolResolver of the SUT, created by default
+        """
+        self._log = log
+        self._os = sut_os
+        self._common_content_lib = common_content_lib
+        self._command_timeout = command_timeout
+        self._tool_resolver = tool_resolver or FioToolResolver(log, sut_os, common_content_lib, command_timeout)
+
+    def get_drive_numa_nodes(self, drives):
+        """
+        Gets the NUMA node of the PCIe device of each drive, with one SUT command for all the drives.
+
+        :param drives: block devices, e.g. /dev/nvme0n1
+        :return: OrderedDict of the drive to its NUMA node, -1 if the drive has no NUMA locality
+        :raise: content_exceptions.TestFail if the node of a drive is not found
+        """
+        output = self._common_content_lib.execute_sut_cmd(self.DRIVE_NUMA_NODE_CMD.format(" ".join(drives)),
+                                                          "get drive NUMA nodes", self._command_timeout)
+        nodes = {}
+        for line in output.splitlines():
+            fields = line.split()
+            if len(fields) == 2 and re.match(r"^-?\d+$", fields[1]):
+                nodes[fields[0]] = int(fields[1])
+        missing = [drive for drive in drives if drive not in nodes]
+        if missing:
+            raise content_exceptions.TestFail("Unable to get the NUMA node of the drives {}".format(missing))
+        self._log.debug("NUMA node of the drives: {}".format(nodes))
+        return OrderedDict((drive, nodes[drive]) for drive in drives)
+
+    def run(self, job_sets, timeout=None):
+        """
+        Runs the job set of each NUMA node and waits for all of them.
+
+        :param job_sets: dict of the NUMA node to the FioJobSet of its drives, node -1 runs without numactl
+        :param timeout: timeout in seconds, the command timeout plus the longest estimated run time by default
+        :return: FioMergedReport with the report of each node and the totals of all nodes
+        :raise: content_exceptions.TestNotImplementedError if the SUT is not Linux
+        :raise: content_exceptions.TestFail if a run does not finish in time, exits with an error or has no JSON
+        report
+        """
+        if self._os.os_type != OperatingSystems.LINUX:
+            raise content_exceptions.TestNotImplementedError(
+                "NUMA fio orchestration is not implemented for OS '{}'".format(self._os))
+        if timeout is None:
+            timeout = int(self._command_timeout) + max(job_set.get_estimated_runtime()
+                                                       for job_set in job_sets.values())
+        prefix = "{}/{}".format(self.ROOT, self.FIO_NUMA_FILE_PREFIX)
+        fio_executable = FioToolResolver.get_executable(self._tool_resolver.get_fio_tool())
+        self._common_content_lib.execute_sut_cmd("rm -f {}*".format(prefix), "remove fio NUMA files",
+                                                 self._command_timeout)
+        for node, job_set in job_sets.items():
+            sut_job_file = "{}{}.fio".format(prefix, node)
+            job_set.copy_to_sut(self._os, sut_job_file)
+            numactl = "" if node < 0 else "numactl --cpunodebind={0} --membind={0} ".format(node)
+            fio_cmd = "{}{} --output={}{}.json {} {}; echo $? > {}{}.done".format(
+                numactl, fio_executable, prefix, node, self.FIO_OUTPUT_FORMAT, sut_job_file, prefix, node)
+            self._os.execute_async(fio_cmd, cwd=self.ROOT)
+            self._log.info("FIO on NUMA node {} has started with {} job(s)".format(node, len(job_set)))
+
+        exit_codes = self.__wait_exit_codes(prefix, len(job_sets), timeout)
+        failed_nodes = {node: code for node, code in exit_codes.items() if code != 0}
+        if failed_nodes:
+            raise content_exceptions.TestFail("FIO failed on NUMA node(s) with exit code(s) {}".format(failed_nodes))
+
+        reports = OrderedDict()
+        for node in job_sets:
+            output = self._common_content_lib.execute_sut_cmd("cat {}{}.json".format(prefix, node),
+                                                              "get fio NUMA node {} result".format(node),
+                                                              self._command_timeout)
+            report = None
+            for report in FioResultParser.iter_parsed_reports(output):
+                pass
+            if report is None:
+                raise content_exceptions.TestFail("FIO on NUMA node {} has no JSON report".format(node))
+            reports[node] = report
+        merged_report = FioResultParser.merge_reports(reports)
+        for direction, totals in merged_report.totals.items():
+            if totals.io_bytes:
+                self._log.info("FIO {} total bandwidth={} bytes/s iops={}".format(direction, totals.bw_bytes,
+                                                                                 totals.iops))
+        return merged_report
+
+    def __wait_exit_codes(self, prefix, run_count, timeout):
+        """Polls the .done files until all the runs have finished, stops the runs on timeout"""
+        end_time = time.time() + timeout
+        # one "<prefix><node>.done:<exit code>" line per finished run
+        done_cmd = "grep -H . {}*.done 2>/dev/null; true".format(prefix)
+        while True:
+            output = self._common_content_lib.execute_sut_cmd(done_cmd, "get finished fio NUMA runs",
+                                                              self._command_timeout)
+            exit_codes = {}
+            for line in output.splitlines():
+                match = re.match(r"^{}(-?\d+)\.done:(\d+)\s*$".format(re.escape(prefix)), line.strip())
+                if match:
+                    exit_codes[int(match.group(1))] = int(match.group(2))
+            self._log.debug("FIO NUMA runs finished: {}/{}".format(len(exit_codes), run_count))
+            if len(exit_codes) >= run_count:
+                return exit_codes
+            if time.time() > end_time:
+                # the [f] keeps pkill from matching the shell which runs it
+                self._common_content_lib.execute_sut_cmd("pkill -f '[{}]{}' || true".format(
+                    self.FIO_NUMA_FILE_PREFIX[0], self.FIO_NUMA_FILE_PREFIX[1:]), "stop fio NUMA runs",
+                    self._command_timeout)
+                raise content_exceptions.TestFail("FIO NUMA runs did not finish in {} seconds".format(timeout))
+            time.sleep(self.FIO_NUMA_POLL_INTERVAL_SEC)
+
+    def run_matrix(self, drives, patterns, block_sizes, global_options=None, timeout=None, **options):
+        """
+        Runs a drive x pattern x block size matrix with one fio per NUMA node of the drives.
+
+        :param drives: block devices
+        :param patterns: fio rw values
+        :param block_sizes: fio bs values
+        :param global_options: dict of the fio options of the global sections
+        :param timeout: timeout in seconds, see run
+        :param options: fio options of every job
+        :return: FioMergedReport
+        """
+        drives_by_node = OrderedDict()
+        for drive, node in self.get_drive_numa_nodes(drives).items():
+            drives_by_node.setdefault(node, []).append(drive)
+        job_sets = OrderedDict()
+        for node, node_drives in drives_by_node.items():
+            job_sets[node] = FioJobSet(**(global_options or {}))
+            job_sets[node].add_matrix(node_drives, patterns, block_sizes, **options)
+        return self.run(job_sets, timeout)
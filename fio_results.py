@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+#################################################################################
+# INTEL CONFIDENTIAL
+# Copyright Intel Corporation All Rights Reserved.
+#
+# The source code contained or described herein and all documents related to
+# the source code ("Material") are owned by Intel Corporation or its suppliers
+# or licensors. Title to the Material remains with Intel Corporation or its
+# suppliers and licensors. The Material may contain trade secrets and proprietary
+# and confidential information of Intel Corporation and its suppliers and
+# licensors, and is protected by worldwide copyright and trade secret laws and
+# treaty provisions. No part of the Material may be used, copied, reproduced,
+# modified, published, uploaded, posted, transmitted, distributed, or disclosed
+# in any way without Intel's prior express written permission.
+#
+# No license under any patent, copyright, trade secret or other intellectual
+# property right is granted to or conferred upon you by disclosure or delivery
+# of the Materials, either expressly, by implication, inducement, estoppel or
+# otherwise. Any license under such intellectual property rights must be express
+# and approved by Intel in writing.
+#################################################################################
+import json
+from collections import namedtuple
+
+# Statistics of one data direction (read, write or trim) of a fio job. Bandwidth is in bytes/s, latencies in ns,
+# clat_percentiles maps the percentile (e.g. 99.9) to the completion latency.
+FioIoStats = namedtuple("FioIoStats", ["io_bytes", "bw_bytes", "iops", "runtime_ms", "bw_min", "bw_max",
+                                       "bw_mean", "lat_min_ns", "lat_mean_ns", "lat_max_ns", "clat_percentiles"])
+# Result of one fio job, read, write and trim are FioIoStats
+FioJobResult = namedtuple("FioJobResult", ["name", "error", "read", "write", "trim", "usr_cpu", "sys_cpu", "ctx",
+                                           "options"])
+# One fio JSON report, jobs is a list of FioJobResult
+FioReport = namedtuple("FioReport", ["fio_version", "timestamp", "timestamp_ms", "jobs", "disk_util"])
+# Threshold on a metric of the jobs, see FioResultParser.check_thresholds. direction is read, write, trim or None
+# for the job level metrics usr_cpu, sys_cpu and ctx.
+FioThreshold = namedtuple("FioThreshold", ["metric", "direction", "min_value", "max_value"])
+FioThresholdViolation = namedtuple("FioThresholdViolation", ["job", "threshold", "value"])
+# Sum of one data direction over the jobs of several concurrent fio runs
+FioIoTotals = namedtuple("FioIoTotals", ["io_bytes", "bw_bytes", "iops"])
+# Reports of concurrent fio runs, by run key (e.g. NUMA node), with the jobs of all runs and the totals by direction
+FioMergedReport = namedtuple("FioMergedReport", ["reports", "jobs", "totals"])
+# Rates of all the jobs between two --status-interval reports, by direction. bw_bytes and iops are dicts of the
+# direction to the rate, lat_mean_ns to the mean latency of the IOs completed in the interval (None without IOs).
+FioSample = namedtuple("FioSample", ["timestamp_ms", "interval_ms", "bw_bytes", "iops", "lat_mean_ns"])
+# Stops a running fio when a FioSample metric (bw_bytes, iops or lat_mean_ns) of the direction is out of
+# [min_value, max_value] for duration_sec
+FioAbortRule = namedtuple("FioAbortRule", ["metric", "direction", "min_value", "max_value", "duration_sec"])
+
+FIO_DIRECTIONS = ("read", "write", "trim")
+
+
+class FioResultParser(object):
+    """
+    Parses the JSON reports of fio --output-format=json or json+ into typed records.
+
+    fio prints one report at the end of the run and one more every --status-interval, the reports are decoded one
+    after the other from the text so a partial or noisy output (e.g. warnings before the report) is not an error.
+    """
+    CLAT_PERCENTILE_PREFIX = "clat_p"
+    _decoder = json.JSONDecoder()
+
+    @classmethod
+    def decode_reports(cls, text):
+        """
+        Decodes the complete reports of a growing fio output.
+
+        :param text: fio output
+        :return: list of the report dicts and the position of the text after the last complete report, the text
+        from this position is the start of a report not written yet
+        """
+        reports = []
+        consumed = 0
+        for report, end in cls.__iter_decoded(text):
+            reports.append(report)
+            consumed = end
+        return reports, consumed
+
+    @classmethod
+    def __iter_decoded(cls, text):
+        """Yields the report dicts of a fio output with the position after each of them"""
+        position = text.find("{")
+        while position != -1:
+            try:
+                report, position = cls._decoder.raw_decode(text, position)
+            except ValueError:
+                # incomplete report at the end or text which is not JSON, try the next object
+                position = text.find("{", position + 1)
+                continue
+            if isinstance(report, dict) and "jobs" in report:
+                yield report, position
+            position = text.find("{", position)
+
+    @classmethod
+    def iter_reports(cls, text):
+        """
+        Yields the JSON reports of a fio output.
+
+        :param text: fio output
+        :return: generator of dicts, one per complete report
+        """
+        for report, _ in cls.__iter_decoded(text):
+            yield report
+
+    @classmethod
+    def parse_io_stats(cls, stats):
+        """
+        Parses the statistics of one data direction of a job.
+
+        :param stats: read, write or trim dict of a job
+        :return: FioIoStats
+        """
+        bw_bytes = stats.get("bw_bytes", stats.get("bw", 0) * 1024)
+        if "clat_ns" in stats:
+            clat, clat_scale = stats["clat_ns"], 1
+        else:
+            clat, clat_scale = stats.get("clat", {}), 1000
+        if "lat_ns" in stats:
+            lat, lat_scale = stats["lat_ns"], 1
+        else:
+            lat, lat_scale = stats.get("lat", {}), 1000
+        percentiles = {float(percentile): value * clat_scale
+                       for percentile, value in clat.get("percentile", {}).items()}
+        return FioIoStats(stats.get("io_bytes", 0), bw_bytes, stats.get("iops", 0.0), stats.get("runtime", 0),
+                          stats.get("bw_min", 0) * 1024, stats.get("bw_max", 0) * 1024,
+                          stats.get("bw_mean", 0.0) * 1024, lat.get("min", 0) * lat_scale,
+                          lat.get("mean", 0.0) * lat_scale, lat.get("max", 0) * lat_scale, percentiles)
+
+    @classmethod
+    def parse_job(cls, job):
+        """
+        Parses one job of a report.
+
+        :param job: job dict
+        :return: FioJobResult
+        """
+        stats = [cls.parse_io_stats(job[direction]) if direction in job else None for direction in FIO_DIRECTIONS]
+        return FioJobResult(job.get("jobname"), job.get("error", 0), stats[0], stats[1], stats[2],
+                            job.get("usr_cpu", 0.0), job.get("sys_cpu", 0.0), job.get("ctx", 0),
+                            job.get("job options", {}))
+
+    @classmethod
+    def parse_report(cls, report):
+        """
+        Parses a report dict.
+
+        :param report: report dict
+        :return: FioReport
+        """
+        timestamp = report.get("timestamp")
+        timestamp_ms = report.get("timestamp_ms", timestamp * 1000 if timestamp is not None else None)
+        return FioReport(report.get("fio version"), timestamp, timestamp_ms,
+                         [cls.parse_job(job) for job in report.get("jobs", [])], report.get("disk_util", []))
+
+    @classmethod
+    def iter_parsed_reports(cls, text):
+        """
+        Yields the parsed reports of a fio output.
+
+        :param text: fio output
+        :return: generator of FioReport
+        """
+        for report in cls.iter_reports(text):
+            yield cls.parse_report(report)
+
+    @classmethod
+    def load(cls, log_path):
+        """
+        Parses the final report of a fio JSON output file.
+
+        :param log_path: fio output file
+        :return: FioReport of the last report in the file, None if the file has no JSON report
+        """
+        with open(log_path, "r") as fp:
+            text = fp.read()
+        report = None
+        for report in cls.iter_reports(text):
+            pass
+        return None if report is None else cls.parse_report(report)
+
+    @staticmethod
+    def merge_reports(reports):
+        """
+        Merges the reports of fio runs which ran at the same time, the bandwidth and IOPS of the runs add up.
+
+        :param reports: OrderedDict of the run key to its FioReport
+        :return: FioMergedReport, the job names are prefixed by the run key
+        """
+        jobs = []
+        totals = {}
+        for key, report in reports.items():
+            jobs.extend(job._replace(name="{}:{}".format(key, job.name)) for job in report.jobs)
+        for direction in FIO_DIRECTIONS:
+            stats = [getattr(job, direction) for job in jobs if getattr(job, direction) is not None]
+            totals[direction] = FioIoTotals(sum(stat.io_bytes for stat in stats),
+                                            sum(stat.bw_bytes for stat in stats), sum(stat.iops for stat in stats))
+        return FioMergedReport(reports, jobs, totals)
+
+    @staticmethod
+    def get_sample(previous_report, report):
+        """
+        Gets the rates between two reports of the same run, fio reports the totals since the start of the run.
+
+        :param previous_report: FioReport, None for the first report of the run
+        :param report: FioReport
+        :return: FioSample, None if the reports have no timestamps or the same timestamp
+        """
+        previous_ms = previous_report.timestamp_ms if previous_report is not None else None
+        if report.timestamp_ms is None:
+            return None
+        runtime_ms = max([stats.runtime_ms for job in report.jobs for stats in (job.read, job.write, job.trim)
+                          if stats is not None] or [0])
+        interval_ms = report.timestamp_ms - previous_ms if previous_ms is not None else runtime_ms
+        if interval_ms <= 0:
+            return None
+
+        def totals(fio_report, direction):
+            """Gets the bytes, IOs and summed latency of a direction since the start of the run"""
+            io_bytes = ios = latency = 0.0
+            for job in (fio_report.jobs if fio_report is not None else []):
+                stats = getattr(job, direction)
+                if stats is not None:
+                    job_ios = stats.iops * stats.runtime_ms / 1000
+                    io_bytes += stats.io_bytes
+                    ios += job_ios
+                    latency += stats.lat_mean_ns * job_ios
+            return io_bytes, ios, latency
+
+        bw_bytes, iops, lat_mean_ns = {}, {}, {}
+        for direction in FIO_DIRECTIONS:
+            io_bytes, ios, latency = totals(report, direction)
+            previous_io_bytes, previous_ios, previous_latency = totals(previous_report, direction)
+            delta_ios = ios - previous_ios
+            bw_bytes[direction] = (io_bytes - previous_io_bytes) * 1000 / interval_ms
+            iops[direction] = delta_ios * 1000 / interval_ms
+            lat_mean_ns[direction] = (latency - previous_latency) / delta_ios if delta_ios > 0 else None
+        return FioSample(report.timestamp_ms, interval_ms, bw_bytes, iops, lat_mean_ns)
+
+    @classmethod
+    def get_metric(cls, job, metric, direction=None):
+        """
+        Gets a metric of a job.
+
+        :param job: FioJobResult
+        :param metric: FioIoStats field, clat_p<percentile> (e.g. clat_p99.9) or usr_cpu, sys_cpu and ctx
+        :param direction: read, write or trim for the FioIoStats metrics
+        :return: metric value, None if the job has no such direction or percentile
+        :raise: ValueError if the metric is unknown
+        """
+        if direction is None:
+            if metric not in ("usr_cpu", "sys_cpu", "ctx"):
+                raise ValueError("Metric '{}' needs a direction".format(metric))
+            return getattr(job, metric)
+        stats = getattr(job, direction)
+        if stats is None:
+            return None
+        if metric.startswith(cls.CLAT_PERCENTILE_PREFIX):
+            return stats.clat_percentiles.get(float(metric[len(cls.CLAT_PERCENTILE_PREFIX):]))
+        if metric not in FioIoStats._fields or metric == "clat_percentiles":
+            raise ValueError("Unknown fio metric '{}'".format(metric))
+        return getattr(stats, metric)
+
+    @classmethod
+    def check_thresholds(cls, jobs, thresholds):
+        """
+        Checks the metrics of the jobs against the thresholds.
+
+        :param jobs: list of FioJobResult
+        :param thresholds: list of FioThreshold, min_value and max_value are inclusive and None for no limit
+        :return: list of FioThresholdViolation, empty if all the jobs are within the thresholds
+        """
+        violations = []
+        for job in jobs:
+            for threshold in thresholds:
+                value = cls.get_metric(job, threshold.metric, threshold.direction)
+                if value is None:
+                    continue
+                if (threshold.min_value is not None and value < threshold.min_value) or \
+                        (threshold.max_value is not None and value > threshold.max_value):
+                    violations.append(FioThresholdViolation(job.name, threshold, value))
+        return violations
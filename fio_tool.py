@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+#################################################################################
+# INTEL CONFIDENTIAL
+# Copyright Intel Corporation All Rights Reserved.
+#
+# The source code contained or described herein and all documents related to
+# the source code ("Material") are owned by Intel Corporation or its suppliers
+# or licensors. Title to the Material remains with Intel Corporation or its
+# suppliers and licensors. The Material may contain trade secrets and proprietary
+# and confidential information of Intel Corporation and its suppliers and
+# licensors, and is protected by worldwide copyright and trade secret laws and
+# treaty provisions. No part of the Material may be used, copied, reproduced,
+# modified, published, uploaded, posted, transmitted, distributed, or disclosed
+# in any way without Intel's prior express written permission.
+#
+# No license under any patent, copyright, trade secret or other intellectual
+# property right is granted to or conferred upon you by disclosure or delivery
+# of the Materials, either expressly, by implication, inducement, estoppel or
+# otherwise. Any license under such intellectual property rights must be express
+# and approved by Intel in writing.
+#################################################################################
+import threading
+import weakref
+from collections import namedtuple
+
+from dtaf_core.lib.dtaf_constants import OperatingSystems
+
+from src.lib import content_exceptions
+from src.lib.sut_identity import SutIdentityProbe
+
+# fio resolved on a SUT, usable_ioengines are the ioengines of --enghelp which can run on the SUT, boot_id is the
+# boot of the SUT when it was resolved
+FioTool = namedtuple("FioTool", ["path", "version", "ioengines", "usable_ioengines", "boot_id"])
+
+
+class FioToolResolver(object):
+    """
+    Resolves the path, version and ioengines of fio on a SUT with one SUT command.
+
+    The FioTool of a SUT is kept until the SUT reboots and is shared by all the resolvers of the SUT os object.
+    """
+    # ioengines from the fastest, the asynchronous ones of Linux are only used if a short run with them succeeds
+    IOENGINE_PREFERENCE = {
+        OperatingSystems.LINUX: ("io_uring", "libaio", "psync", "sync"),
+        OperatingSystems.WINDOWS: ("windowsaio", "psync", "sync")
+    }
+    CHECKED_IOENGINES = {
+        OperatingSystems.LINUX: ("io_uring", "libaio"),
+        OperatingSystems.WINDOWS: ()
+    }
+    FIO_TOOL_MARKER = "#fio_tool_section#"
+    FIO_TOOL_CMDS = {
+        OperatingSystems.LINUX: "command -v fio; echo {0}; fio --version; echo {0}; fio --enghelp; echo {0}; "
+                                "for engine in {1}; do fio --name=engine_check --ioengine=$engine "
+                                "--filename=/tmp/fio_engine_check --size=4k --bs=4k --rw=read > /dev/null 2>&1 "
+                                "&& echo $engine; done; rm -f /tmp/fio_engine_check",
+        OperatingSystems.WINDOWS: "where fio.exe & echo {0} & fio.exe --version & echo {0} & fio.exe --enghelp & "
+                                  "echo {0}"
+    }
+    # FioTool of each SUT, by SUT os object
+    _fio_tools = weakref.WeakKeyDictionary()
+    _fio_tools_lock = threading.Lock()
+
+    def __init__(self, log, sut_os, common_content_lib, command_timeout):
+        """
+        :param log: log object
+        :param sut_os: sut os object
+        :param common_content_lib: common content lib object to execute the SUT commands
+        :param command_timeout: timeout of the SUT commands in seconds
+        """
+        self._log = log
+        self._os = sut_os
+        self._common_content_lib = common_content_lib
+        self._command_timeout = command_timeout
+
+    def get_fio_tool(self, refresh=False):
+        """
+        Gets fio of the SUT, resolved again after a reboot of the SUT. The boot id is the one of the cached SUT
+        identity, so a resolved fio is returned without any SUT command.
+
+        :param refresh: True to resolve fio again
+        :return: FioTool
+        :raise: content_exceptions.TestNotImplementedError if the OS is not supported
+        :raise: content_exceptions.TestSetupError if fio is not installed on the SUT
+        """
+        if self._os.os_type not in self.FIO_TOOL_CMDS:
+            raise content_exceptions.TestNotImplementedError(
+                "Fio tool resolution is not implemented for OS '{}'".format(self._os))
+        boot_id = SutIdentityProbe.for_sut(self._log, self._common_content_lib, self._os.os_type,
+                                           int(self._command_timeout)).get_identity().boot_id
+        with self._fio_tools_lock:
+            fio_tool = self._fio_tools.get(self._os)
+        if fio_tool is not None and fio_tool.boot_id == boot_id and not refresh:
+            return fio_tool
+
+        fio_tool_cmd = self.FIO_TOOL_CMDS[self._os.os_type].format(
+            self.FIO_TOOL_MARKER, " ".join(self.CHECKED_IOENGINES[self._os.os_type]))
+        output = self._common_content_lib.execute_sut_cmd(fio_tool_cmd, "resolve fio tool", self._command_timeout)
+        sections = [section.strip() for section in output.split(self.FIO_TOOL_MARKER)]
+        if len(sections) < 4 or not sections[0]:
+            raise content_exceptions.TestSetupError("fio is not installed on the SUT: '{}'".format(output))
+        path = sections[0].splitlines()[0].strip()
+        version = sections[1].splitlines()[0].strip() if sections[1] else None
+        # --enghelp prints a header line then one ioengine per line
+        ioengines = [line.strip() for line in sections[2].splitlines()[1:] if line.strip()]
+        checked_ok = set(sections[3].split())
+        usable_ioengines = [engine for engine in ioengines
+                            if engine not in self.CHECKED_IOENGINES[self._os.os_type] or engine in checked_ok]
+        fio_tool = FioTool(path, version, ioengines, usable_ioengines, boot_id)
+        self._log.info("Fio '{}' version '{}' with ioengines {}".format(path, version, usable_ioengines))
+        with self._fio_tools_lock:
+            self._fio_tools[self._os] = fio_tool
+        return fio_tool
+
+    def get_best_ioengine(self, fio_tool=None):
+        """
+        Gets the fastest ioengine which can run on the SUT.
+
+        :param fio_tool: FioTool of the SUT, resolved by default
+        :return: ioengine name
+        :raise: content_exceptions.TestSetupError if none of the preferred ioengines can run
+        """
+        usable_ioengines = (fio_tool or self.get_fio_tool()).usable_ioengines
+        for engine in self.IOENGINE_PREFERENCE[self._os.os_type]:
+            if engine in usable_ioengines:
+                return engine
+        raise content_exceptions.TestSetupError("None of the ioengines {} is supported by fio, supported ioengines "
+                                                "are {}".format(self.IOENGINE_PREFERENCE[self._os.os_type],
+                                                                usable_ioengines))
+
+    @staticmethod
+    def get_executable(fio_tool):
+        """
+        Gets the command of a resolved fio.
+
+        :param fio_tool: FioTool
+        :return: fio path, quoted if it has spaces
+        """
+        return '"{}"'.format(fio_tool.path) if " " in fio_tool.path else fio_tool.path
@@ -28,6 +28,11 @@ from dtaf_core.lib.dtaf_constants import OperatingSystems
 from common_content_lib import CommonContentLib
 from content_configuration import ContentConfiguration
 from src.lib import content_exceptions
+from src.lib.fio_async import FioAsyncJob
+from src.lib.fio_job import FioJob
+from src.lib.fio_numa import FioNumaRunner
+from src.lib.fio_results import FIO_DIRECTIONS, FioResultParser
+from src.lib.fio_tool import FioToolResolver
 
 
 class FIOCommonLib(object):
@@ -37,12 +42,22 @@ class FIOCommonLib(object):
     """
 
     ROOT = "/root"
+    WINDOWS_ROOT = "C:\\"
+    FIO_JOB_FILE_NAME = "fio_job_set.fio"
     FIO_MOUNT_POINT = "/mnt/nvme"
     LOG_FILE = "/root/fio.log"
     FIO_LOG_FILE = "fio.log"
+    FIO_PID_FILE = "fio.pid"
     TOOL_NAME = '/mnt/nvme/fiotest'
+    FIO_OUTPUT_FORMAT = "--output-format=json+"
+    FIO_STATUS_INTERVAL_SEC = 10
+    # options of the fixed workloads, the ioengine is the best one of the SUT unless set, see __get_workload_command
+    WINDOWS_WORKLOAD_OPTIONS = dict(size="10G", bs="64k-2M", numjobs=16, direct=1, time_based=True)
+    ASYNC_WORKLOAD_OPTIONS = dict(ioengine="sync", rw="rw", rwmixread=70, direct=1, bs="256k", iodepth=8,
+                                  numjobs=16, time_based=True, size="10M")
     FIO_COMMAND_RUN  = r"fio --name={} --rw={} --numjobs={} --bs={} --filename={} --size={} " \
-                   r"--ioengine={} --runtime={} --time_based --iodepth={} --group_reporting --output={}"
+                   r"--ioengine={} --runtime={} --time_based --iodepth={} --group_reporting --output={} " \
+                   + FIO_OUTPUT_FORMAT
 
     def __init__(self, log_obj, sut_os_obj):
         """
@@ -55,6 +70,9 @@ class FIOCommonLib(object):
         self._common_content_configuration = ContentConfiguration(self._log)
         self._command_timeout = self._common_content_configuration.get_command_timeout()
         self._fio_runtime = self._common_content_configuration.memory_fio_run_time()
+        self._tool_resolver = FioToolResolver(self._log, self._os, self._common_content_lib, self._command_timeout)
+        self._numa_runner = FioNumaRunner(self._log, self._os, self._common_content_lib, self._command_timeout,
+                                          self._tool_resolver)
 
     def fio_path_finder(self):
         """
@@ -62,11 +80,116 @@ class FIOCommonLib(object):
 
         :return fio_executer_path: parent path of the .exe file.
         """
-        fio_executer_path = self._common_content_lib.execute_sut_cmd("where fio.exe", "find installed path",
-                                                                     self._command_timeout)
-        fio_executer_path = Path(fio_executer_path).parent
+        fio_executer_path = Path(self.get_fio_tool().path).parent
         return fio_executer_path
 
+    def get_fio_tool(self, refresh=False):
+        """
+        Function to get the path, version and ioengines of fio on the SUT, resolved with one SUT command once per
+        boot of the SUT and shared by the FIOCommonLib objects of the SUT.
+
+        :param refresh: True to resolve fio again
+        :return: FioTool
+        :raise: content_exceptions.TestNotImplementedError if the OS is not supported
+        :raise: content_exceptions.TestSetupError if fio is not installed on the SUT
+        """
+        return self._tool_resolver.get_fio_tool(refresh)
+
+    def get_best_ioengine(self):
+        """
+        Function to get the fastest ioengine which can run on the SUT.
+
+        :return: ioengine name
+        :raise: content_exceptions.TestSetupError if none of the preferred ioengines can run
+        """
+        return self._tool_resolver.get_best_ioengine()
+
+    def __get_workload_command(self, job, output):
+        """
+        Function to render the command line of a single job workload with the resolved fio, the job runs with the
+        best ioengine of the SUT unless it has its own.
+
+        :param job: FioJob
+        :param output: output file of the job
+        :return: fio command
+        """
+        fio_tool = self.get_fio_tool()
+        if "ioengine" not in job.options:
+            job.set(ioengine=self._tool_resolver.get_best_ioengine(fio_tool))
+        return " ".join([FioToolResolver.get_executable(fio_tool)] + job.to_args() +
+                        ["--output={}".format(output), self.FIO_OUTPUT_FORMAT])
+
+    def run_fio_job_set(self, job_set, timeout=None):
+        """
+        Function to run all the jobs of a job set, e.g. a drive x pattern x block size matrix, in one fio
+        invocation. The job file is rendered on the host and copied to the SUT.
+
+        :param job_set: FioJobSet
+        :param timeout: command timeout in seconds, the command timeout plus the estimated run time by default
+        :return: FioReport of the run
+        :raise: content_exceptions.TestFail if fio has no JSON report
+        """
+        if self._os.os_type == OperatingSystems.WINDOWS:
+            sut_job_file, cwd = self.WINDOWS_ROOT + self.FIO_JOB_FILE_NAME, None
+        elif self._os.os_type == OperatingSystems.LINUX:
+            sut_job_file, cwd = self.ROOT + "/" + self.FIO_JOB_FILE_NAME, self.ROOT
+        else:
+            raise content_exceptions.TestNotImplementedError(
+                "Fio job set is not implemented for OS '{}'".format(self._os))
+        if timeout is None:
+            timeout = int(self._command_timeout) + job_set.get_estimated_runtime()
+
+        fio_executable = FioToolResolver.get_executable(self.get_fio_tool())
+        job_set.copy_to_sut(self._os, sut_job_file)
+        self._log.info("FIO job set with {} job(s) has started".format(len(job_set)))
+        fio_cmd = "{} {} {}".format(fio_executable, self.FIO_OUTPUT_FORMAT, sut_job_file)
+        output = self._common_content_lib.execute_sut_cmd(fio_cmd, "FIO job set", timeout, cwd)
+        report = None
+        for report in FioResultParser.iter_parsed_reports(output):
+            pass
+        if report is None:
+            raise content_exceptions.TestFail("FIO job set has no JSON report in the output '{}'".format(output))
+        self._log.info("FIO job set has completed with {} job result(s)".format(len(report.jobs)))
+        return report
+
+    def get_drive_numa_nodes(self, drives):
+        """
+        Function to get the NUMA node of the PCIe device of each drive, with one SUT command for all the drives.
+
+        :param drives: block devices, e.g. /dev/nvme0n1
+        :return: OrderedDict of the drive to its NUMA node, -1 if the drive has no NUMA locality
+        :raise: content_exceptions.TestFail if the node of a drive is not found
+        """
+        return self._numa_runner.get_drive_numa_nodes(drives)
+
+    def run_fio_numa(self, job_sets, timeout=None):
+        """
+        Function to run one fio per NUMA node at the same time, each pinned to the CPUs and memory of its node,
+        see FioNumaRunner.
+
+        :param job_sets: dict of the NUMA node to the FioJobSet of its drives, node -1 runs without numactl
+        :param timeout: timeout in seconds, the command timeout plus the longest estimated run time by default
+        :return: FioMergedReport with the report of each node and the totals of all nodes
+        :raise: content_exceptions.TestNotImplementedError if the SUT is not Linux
+        :raise: content_exceptions.TestFail if a run does not finish in time, exits with an error or has no JSON
+        report
+        """
+        return self._numa_runner.run(job_sets, timeout)
+
+    def run_fio_numa_matrix(self, drives, patterns, block_sizes, global_options=None, timeout=None, **options):
+        """
+        Function to run a drive x pattern x block size matrix with one fio per NUMA node of the drives.
+
+        :param drives: block devices
+        :param patterns: fio rw values
+        :param block_sizes: fio bs values
+        :param global_options: dict of the fio options of the global sections
+        :param timeout: timeout in seconds, see run_fio_numa
+        :param options: fio options of every job
+        :return: FioMergedReport
+        """
+        return self._numa_runner.run_matrix(drives, patterns, block_sizes, global_options, timeout, **options)
+
     def fio_sequential_write(self, fio_test_points, cmd_run=None):
         """
         Function to run the Sequential write command of fio executer.
@@ -79,9 +202,10 @@ class FIOCommonLib(object):
         if self._os.os_type == OperatingSystems.WINDOWS:
             fio_drive = fio_test_points
 
-            cmd_run = "fio.exe --name=seqwrite --ioengine=psync --size=10G --rw=write --bs=64k-2M " \
-                      "--numjobs=16 --direct=1 --time_based --runtime={} --output=win_fio_seq_write.log --filename={}" \
-                .format(self._fio_runtime, fio_drive)
+            cmd_run = self.__get_workload_command(FioJob(
+                "seqwrite", rw="write", runtime=self._fio_runtime, filename=fio_drive,
+                **self.WINDOWS_WORKLOAD_OPTIONS),
+                "win_fio_seq_write.log")
 
             self._log.info("FIO Sequential write has started on the pmem disk(s).")
             self._common_content_lib.execute_sut_cmd(cmd_run, "FIO Sequential write", self._command_timeout)
@@ -110,9 +234,10 @@ class FIOCommonLib(object):
         if self._os.os_type == OperatingSystems.WINDOWS:
             fio_drive = fio_test_points
 
-            cmd_run = "fio.exe --name=seqread --ioengine=psync --size=10G --rw=read --bs=64k-2M " \
-                      "--numjobs=16 --direct=1 --time_based --runtime={} --output=win_fio_seq_read.log " \
-                      "--filename={}".format(self._fio_runtime, fio_drive)
+            cmd_run = self.__get_workload_command(FioJob(
+                "seqread", rw="read", runtime=self._fio_runtime, filename=fio_drive,
+                **self.WINDOWS_WORKLOAD_OPTIONS),
+                "win_fio_seq_read.log")
 
             self._log.info("FIO Sequential read has started on the pmem disk(s).")
             self._common_content_lib.execute_sut_cmd(cmd_run, "FIO Sequential write", self._command_timeout)
@@ -140,9 +265,10 @@ class FIOCommonLib(object):
         if self._os.os_type == OperatingSystems.WINDOWS:
             fio_drive = fio_test_drives
 
-            cmd_run = "fio.exe --name=seqrw --ioengine=psync --size=10G --rw=rw --bs=64k-2M " \
-                      "--numjobs=16 --direct=1 --time_based --runtime={} --output=win_fio_mixed_rw.log " \
-                      "--filename='{}'".format(self._fio_runtime, fio_drive)
+            cmd_run = self.__get_workload_command(FioJob(
+                "seqrw", rw="rw", runtime=self._fio_runtime, filename=fio_drive,
+                **self.WINDOWS_WORKLOAD_OPTIONS),
+                "win_fio_mixed_rw.log")
 
             self._log.info("FIO Mixed read and write has started on the pmem disk(s).")
             self._common_content_lib.execute_sut_cmd(cmd_run, "FIO Mixed read write", self._command_timeout)
@@ -152,19 +278,29 @@ class FIOCommonLib(object):
             self._log.error(log_error)
             raise NotImplementedError(log_error)
 
-    def fio_execute_async(self, fio_drive):
+    def fio_execute_async(self, fio_drive, status_interval=FIO_STATUS_INTERVAL_SEC, abort_rules=None):
         """
         Function to run the read write command of fio executer in async mode.
 
         :param fio_drive: pmem drives
-        :return: None
+        :param status_interval: seconds between two status reports of fio
+        :param abort_rules: list of FioAbortRule to stop the run early, e.g. FioAbortRule("bw_bytes", "read",
+        0.5 * baseline, None, 30)
+        :return: FioAsyncJob to follow the run
         """
         if self._os.os_type == OperatingSystems.LINUX:
-            linux_fio_cmd = r'fio --name=readwrite --ioengine=sync --rw=rw --rwmixread=70 --direct=1 --bs=256k ' \
-                            '--iodepth=8 --numjobs=16  --runtime={} --time_based --size=10M --output={} ' \
-                            '--filename={}'.format(self._fio_runtime, self.FIO_LOG_FILE, fio_drive)
-            self._os.execute_async(linux_fio_cmd, cwd=self.ROOT)
+            output_path = "{}/{}".format(self.ROOT, self.FIO_LOG_FILE)
+            pid_path = "{}/{}".format(self.ROOT, self.FIO_PID_FILE)
+            # the pid file marks the start of this run, see FioAsyncJob
+            self._common_content_lib.execute_sut_cmd("rm -f {}".format(pid_path), "remove fio pid file",
+                                                     self._command_timeout)
+            linux_fio_cmd = self.__get_workload_command(FioJob(
+                "readwrite", runtime=self._fio_runtime, filename=fio_drive, **self.ASYNC_WORKLOAD_OPTIONS),
+                output_path) + " --status-interval={}".format(status_interval)
+            self._os.execute_async(FioAsyncJob.get_start_command(linux_fio_cmd, pid_path), cwd=self.ROOT)
             self._log.info("FIO async execution has started on the pmem disk(s).")
+            return FioAsyncJob(self._log, self._common_content_lib, output_path, pid_path, status_interval,
+                               self._command_timeout, abort_rules)
         else:
             log_error = "async execution is not implemented for OS '{}'".format(self._os)
             raise content_exceptions.TestNotImplementedError(log_error)
@@ -180,9 +316,10 @@ class FIOCommonLib(object):
         if self._os.os_type == OperatingSystems.WINDOWS:
             fio_drive = fio_test_drives
 
-            cmd_run = "fio.exe --name=ranwrite --ioengine=psync --size=10G --rw=randwrite --bs=64k-2M " \
-                      "--numjobs=16 --direct=1 --time_based --runtime={} --output=win_fio_ran_write.log " \
-                      "--filename='{}'".format(self._fio_runtime, fio_drive)
+            cmd_run = self.__get_workload_command(FioJob(
+                "ranwrite", rw="randwrite", runtime=self._fio_runtime, filename=fio_drive,
+                **self.WINDOWS_WORKLOAD_OPTIONS),
+                "win_fio_ran_write.log")
 
             self._log.info("FIO random write has started on the pmem disk(s).")
             self._common_content_lib.execute_sut_cmd(cmd_run, "FIO random write", self._command_timeout)
@@ -203,9 +340,10 @@ class FIOCommonLib(object):
         if self._os.os_type == OperatingSystems.WINDOWS:
             fio_drive = fio_test_drives
 
-            cmd_run = "fio.exe --name=ranread --ioengine=psync --size=10G --rw=randread --bs=64k-2M " \
-                      "--numjobs=16 --direct=1 --time_based --runtime={} --output=win_fio_ran_read.log " \
-                      "--filename='{}'".format(self._fio_runtime, fio_drive)
+            cmd_run = self.__get_workload_command(FioJob(
+                "ranread", rw="randread", runtime=self._fio_runtime, filename=fio_drive,
+                **self.WINDOWS_WORKLOAD_OPTIONS),
+                "win_fio_ran_read.log")
 
             self._log.info("FIO random read has started on the pmem disk(s).")
             self._common_content_lib.execute_sut_cmd(cmd_run, "FIO random read", self._command_timeout)
@@ -215,21 +353,114 @@ class FIOCommonLib(object):
             self._log.error(log_error)
             raise NotImplementedError(log_error)
 
-    def fio_log_parsing(self, log_path, pattern):
+    def get_fio_report(self, log_path):
+        """
+        Function to parse the final JSON report of a fio output file.
+
+        :param log_path: fio output file written with --output-format=json or json+
+        :return: FioReport, None if the file has no JSON report
+        """
+        return FioResultParser.load(log_path)
+
+    def assert_fio_thresholds(self, log_path, thresholds):
+        """
+        Function to check the jobs of a fio JSON output file against thresholds.
+
+        :param log_path: fio output file written with --output-format=json or json+
+        :param thresholds: list of FioThreshold
+        :return: FioReport
+        :raise: content_exceptions.TestFail if the file has no report, a job failed or a threshold is violated
+        """
+        report = self.get_fio_report(log_path)
+        if report is None:
+            raise content_exceptions.TestFail("Fio log file '{}' has no JSON report".format(log_path))
+        failed_jobs = [job.name for job in report.jobs if job.error]
+        if failed_jobs:
+            raise content_exceptions.TestFail("Fio jobs {} failed in '{}'".format(failed_jobs, log_path))
+        violations = FioResultParser.check_thresholds(report.jobs, thresholds)
+        for violation in violations:
+            self._log.error("Fio job '{}' {} {}={} is out of [{}, {}]".format(
+                violation.job, violation.threshold.direction, violation.threshold.metric, violation.value,
+                violation.threshold.min_value, violation.threshold.max_value))
+        if violations:
+            raise content_exceptions.TestFail("{} fio threshold violation(s) in '{}'".format(len(violations),
+                                                                                           log_path))
+        self._log.info("The '{}' is within the {} threshold(s)".format(log_path, len(thresholds)))
+        return report
+
+    def check_fio_baseline(self, report, baseline_store, platform, drive_model, label=None):
+        """
+        Function to compare the results of a fio report with their history and add them to the history.
+
+        :param report: FioReport
+        :param baseline_store: FioBaselineStore
+        :param platform: platform family of the SUT
+        :param drive_model: model of the drive under test
+        :param label: e.g. IFWI version of the SUT, to follow the results across IFWI drops
+        :return: list of FioRegression of all the compared metrics
+        :raise: content_exceptions.TestFail if a metric regressed significantly
+        """
+        results = []
+        for record in baseline_store.get_report_records(report, platform, drive_model, label):
+            record_results = baseline_store.check(record)
+            for result in record_results:
+                log = self._log.error if result.regressed else self._log.debug
+                log("Fio {} {} {}={} median={} MAD={} score={:.2f} over {} results".format(
+                    result.key.workload, result.key.block_size, result.metric, result.value, result.median,
+                    result.mad, result.score, result.samples))
+            results.extend(record_results)
+            baseline_store.add(record)
+        regressions = [result for result in results if result.regressed]
+        if regressions:
+            raise content_exceptions.TestFail("Fio results regressed for {}".format(
+                ["{} {} {}".format(result.key.workload, result.key.block_size, result.metric)
+                 for result in regressions]))
+        return results
+
+    @staticmethod
+    def __get_pattern_directions(pattern):
+        """Gets the data directions named in a text log pattern (e.g. "READ: bw"), all directions if none is"""
+        directions = [direction for direction in FIO_DIRECTIONS if direction in pattern.lower()]
+        return directions or list(FIO_DIRECTIONS)
+
+    def __iter_report_bandwidths(self, report, pattern):
+        """Yields the job name, direction and FioIoStats of the report for the directions named in the pattern"""
+        for job in report.jobs:
+            for direction in self.__get_pattern_directions(pattern):
+                stats = getattr(job, direction)
+                if stats is not None and stats.io_bytes:
+                    yield job.name, direction, stats
+
+    def fio_log_parsing(self, log_path, pattern, min_mean_ratio=None):
         """
         Function to check the bandwidth measurements reported by FIO appear normal for a storage target.
+        A JSON output is only checked against min_mean_ratio, use assert_fio_thresholds for other limits.
 
         :param log_path: where the log has generated.
-        :param pattern: regex pattern to search the log files
+        :param pattern: regex pattern to search the log files, the direction (read / write) for a JSON output
+        :param min_mean_ratio: for a JSON output, minimum ratio of the mean bandwidth to the maximum bandwidth of
+        each job, e.g. 0.5, None to not check it
         :return ret_val: false if error else true
         """
         ret_val = True
         with open(log_path, "r") as fp:
-            if len(fp.readlines()) == 0:
-                self._log.error("Fio log file %s was empty" % log_path)
-                ret_val = False
-                return ret_val
-            for line in fp.readlines():
+            lines = fp.readlines()
+        if len(lines) == 0:
+            self._log.error("Fio log file %s was empty" % log_path)
+            ret_val = False
+            return ret_val
+        report = None
+        for report in FioResultParser.iter_parsed_reports("".join(lines)):
+            pass
+        if report is not None:
+            if min_mean_ratio is not None:
+                for job_name, direction, stats in self.__iter_report_bandwidths(report, pattern):
+                    if stats.bw_mean < min_mean_ratio * stats.bw_max:
+                        self._log.error("Fio job '{}' {} mean bandwidth {} is less than {} of {}".format(
+                            job_name, direction, stats.bw_mean, min_mean_ratio, stats.bw_max))
+                        ret_val = False
+        else:
+            for line in lines:
                 if re.search("{}".format(pattern), line):
                     mylist = ' '.join(line.split(",")[0].split(":")[1].split(" ")).split()
                     no_string = list(map(lambda sub: int(''.join([ele for ele in sub if ele.isnumeric()])), mylist))
@@ -244,14 +475,30 @@ class FIOCommonLib(object):
                 log_path, pattern))
         return ret_val
 
-    def verify_fio_log_pattern(self, log_path, pattern):
+    def verify_fio_log_pattern(self, log_path, pattern, min_bw_ratio=None):
         """
         Function to check the bandwidth measurements reported by FIO appear normal for a storage target.
+        A JSON output is only checked against min_bw_ratio, use assert_fio_thresholds for other limits.
         :param log_path: where the log has generated.
-        :param pattern: regex pattern to search the log files
-        :return ret_val: false if error else true
+        :param pattern: regex pattern to search the log files, the direction (read / write) for a JSON output
+        :param min_bw_ratio: for a JSON output, minimum ratio of the minimum bandwidth to the maximum bandwidth of
+        each job, e.g. 0.8, None to not check it
+        :return ret_val: true if a bandwidth of the pattern was found, None otherwise
         """
-        ret_val = True
+        ret_val = None
+        report = self.get_fio_report(log_path)
+        if report is not None:
+            for job_name, direction, stats in self.__iter_report_bandwidths(report, pattern):
+                self._log.info("Fio job '{}' {} bandwidth min={} mean={} max={} bytes/s".format(
+                    job_name, direction, stats.bw_min, stats.bw_mean, stats.bw_max))
+                if min_bw_ratio is not None and stats.bw_min < min_bw_ratio * stats.bw_max:
+                    self._log.error("Found bandwidth issue while checking the '{}' during {} operation!".format(
+                        log_path, pattern))
+                    raise content_exceptions.TestFail("Fio job '{}' minimum bandwidth: {} is less than {} of "
+                                                      "{}".format(job_name, stats.bw_min, min_bw_ratio,
+                                                                  stats.bw_max))
+                ret_val = True
+            return ret_val
         with open(log_path, "r") as fp:
             for line in fp.readlines():
                 if re.search("{}".format(pattern), line):
@@ -320,8 +567,8 @@ class FIOCommonLib(object):
         self._log.info("Starting FIO execution")
         linux_fio_cmd = r"numactl --cpunodebind={} --membind={} fio --name={} --rw={} " \
                         r"--filename={} --iodepth={} --bs={} --size={} --numjobs={} --group_reporting --time_based " \
-                        r"--runtime={} --output={}".format(cpunodebind, membind, name, rw, filename,
-                          iodepth, bs, size, numjobs, runtime, output)
+                        r"--runtime={} --output={} {}".format(cpunodebind, membind, name, rw, filename,
+                          iodepth, bs, size, numjobs, runtime, output, self.FIO_OUTPUT_FORMAT)
         self._common_content_lib.execute_sut_cmd(linux_fio_cmd.format(cpunodebind, membind, name, rw, filename, iodepth,bs,size,numjobs,
                                                       runtime, output), "Executing FIO Command- for {}".format(name),
                                                  self._command_timeout)
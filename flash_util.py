@@ -19,26 +19,17 @@
 # otherwise. Any license under such intellectual property rights must be express
 # and approved by Intel in writing.
 #################################################################################
-import re
 import os
 
-from dtaf_core.lib.dtaf_constants import OperatingSystems
 from dtaf_core.lib.flash import FlashDevices
 
+from src.lib.sut_identity import SutIdentityProbe
+
 
 class FlashUtil(object):
     """
     Flashes Firmware to the Sut and verifies newer version of Bios ID after Flashing the firmware to sut.
     """
-    os_cmd_strings = {
-        OperatingSystems.LINUX: 'dmidecode -s bios-version',
-        OperatingSystems.WINDOWS: 'wmic bios get smbiosbiosversion'
-    }
-
-    cmd_parse_strings = {
-        OperatingSystems.WINDOWS: r"SMBIOSBIOSVersion\s+(.+)$"
-    }
-
     def __init__(self, log, os_obj, emulator_obj, common_content_lib_obj, common_content_config_obj):
         self._emulator_obj = emulator_obj
         self._os_obj = os_obj
@@ -46,6 +37,7 @@ class FlashUtil(object):
         self._common_content_conf_obj = common_content_config_obj
         self._common_content_lib_obj = common_content_lib_obj
         self._command_timeout = int(self._common_content_conf_obj.get_command_timeout())
+        self._identity_probe = None
 
     def flash_binary(self, image):
         """
@@ -57,6 +49,7 @@ class FlashUtil(object):
 
         self._log.info("Flashing Binary image")
         self._emulator_obj.flash_image(image, FlashDevices.PCH)
+        self.__invalidate_identity()
 
     def flash_ifwi_image(self, image):
         """
@@ -68,6 +61,19 @@ class FlashUtil(object):
         bin_file = os.path.basename(image)
         self._log.info("Flashing Binary image {}".format(bin_file))
         self._emulator_obj.flash_image(img_path+"\\", bin_file)
+        self.__invalidate_identity()
+
+    def __get_identity_probe(self):
+        """Gets the identity probe shared with the other utilities of the SUT"""
+        if self._identity_probe is None:
+            self._identity_probe = SutIdentityProbe.for_sut(self._log, self._common_content_lib_obj,
+                                                            self._os_obj.os_type, self._command_timeout)
+        return self._identity_probe
+
+    def __invalidate_identity(self):
+        """Drops the cached SUT identity, the BIOS version changes with the flashed image"""
+        if self._identity_probe is not None:
+            self._identity_probe.invalidate()
 
     def get_bios_version(self):
         """
@@ -76,14 +82,9 @@ class FlashUtil(object):
         :return: String with the version of the BIOS else None
         :raise: runtimeerror: if bios id is not availble.
         """
-        # Get the BIOS ID from the OS
+        # Get the BIOS ID from the OS, collected with the other identity information of the SUT once per boot
         try:
-            bios_id = self._common_content_lib_obj.execute_sut_cmd(
-                self.os_cmd_strings[self._os_obj.os_type], "Bios version", self._command_timeout)
-            if self._os_obj.os_type == OperatingSystems.WINDOWS:
-                bios_id = bios_id.strip()
-                bios_id = re.match(self.cmd_parse_strings[self._os_obj.os_type], bios_id)
-                bios_id = bios_id.group(1)
+            bios_id = self.__get_identity_probe().get_identity().bios_version
             if bios_id is None:
                 raise RuntimeError("Could not find BIOS ID in the OS output!")
             else:
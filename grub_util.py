@@ -22,30 +22,165 @@
 
 
 import re
-from typing import Dict, List, Match, Pattern, Union
+import shlex
+import sys
+import time
+from collections import namedtuple
+from typing import Dict, Iterable, Iterator, List, Optional, Pattern, Tuple, Union
 
+from dtaf_core.lib.dtaf_constants import OperatingSystems
 from dtaf_core.lib.os_lib import LinuxDistributions
 
 from content_configuration import ContentConfiguration
 from src.lib import content_exceptions
 from src.lib.cbnt_constants import RedhatVersion
+from src.lib.sut_identity import SutIdentityProbe
 from common_content_lib import CommonContentLib
 
-# Submenu entries may start with whitespace followed by the keyword submenu. The name is contained in either
-# single or double quotes which can consist of letters, numbers, slashes, dashes and dots.
-# It ends with the opening token {
-submenu_re: str = r"(\s*submenu\s*('|\")(?P<submenu>[.\s\d\w_,/\\-]+)('|\")\s*{)"
-# Menu entries may start with whitespace followed by the keyword menuentry. The name is contained in either
-# single or double quotes which can consist of letters, numbers, slashes, dashes and dots. It may be followed
-# by options in the format --<option> <value>.
-# It ends with the opening token {
-menuentry_re: str = r"(\s*menuentry\s*('|\")(?P<menuentry>[.\s\d\w_,/\\-]+)('|\").*{)"
-# Joining the patterns this way means we only have to search a line once
-entry_re: Pattern = re.compile("|".join([submenu_re, menuentry_re]))
-# This the token that starts a block
-open_token: Pattern = re.compile(r"{")
-# This the token that ends a block
-close_token: Pattern = re.compile(r"}")
+# Single pass grub.cfg scanner. A word is made of quoted strings, ${} variables, escaped characters and plain
+# characters, so braces inside quotes or variables are not block tokens. A comment starts with # at the
+# start of a word.
+grub_token_re: Pattern = re.compile(r"""
+    (?P<comment>(?<![^\s;{}])\#[^\n]*)
+    |(?P<newline>\n)
+    |(?P<separator>;)
+    |(?P<open>{)
+    |(?P<close>})
+    |(?P<word>(?:'[^']*'|"(?:\\.|[^"\\])*"|\$\{[^}]*\}|\\.|[^\s;{}'"\\])+)
+    |(?P<space>[^\S\n]+)
+    """, re.VERBOSE)
+# Quoted strings and escaped characters of a word
+grub_quote_re: Pattern = re.compile(r"""'([^']*)'|"((?:\\.|[^"\\])*)"|\\(.)""")
+grub_escape_re: Pattern = re.compile(r"\\(.)")
+
+# Menu entry or submenu of a grub.cfg file, submenus is the tuple of the names of the parent submenus
+GrubEntry = namedtuple("GrubEntry", ["kind", "name", "submenus", "line_number"])
+
+
+# Kernel entry of grubby --info=ALL. info has the raw grubby key=value pairs, values of quoted keys keep their quotes
+GrubKernel = namedtuple("GrubKernel", ["index", "kernel", "version", "args", "title", "info"])
+
+
+class GrubInventory(object):
+    """
+    Snapshot of the grub configuration and identity of the SUT, collected by one combined remote command
+    """
+    KERNEL_PATH_PREFIX = "/boot/vmlinuz-"
+    DEFAULT_INDEX_MARKER = "#grub_inventory_default_index#"
+    CURRENT_KERNEL_MARKER = "#grub_inventory_current_kernel#"
+    OS_RELEASE_MARKER = "#grub_inventory_os_release#"
+    COLLECT_CMD = "; ".join(["grubby --info=ALL", "echo '{}'".format(DEFAULT_INDEX_MARKER), "grubby --default-index",
+                             "echo '{}'".format(CURRENT_KERNEL_MARKER), "uname -r",
+                             "echo '{}'".format(OS_RELEASE_MARKER), "cat /etc/os-release"])
+
+    def __init__(self, kernels: List[GrubKernel], default_index: Optional[int], current_kernel: str,
+                 os_release: Dict[str, str]):
+        """
+        Create an instance of GrubInventory
+
+        :param kernels: kernel entries in index order
+        :param default_index: default boot index, None if unknown
+        :param current_kernel: output of uname -r
+        :param os_release: key value pairs of /etc/os-release
+        """
+        self.kernels = kernels
+        self.default_index = default_index
+        self.current_kernel = current_kernel
+        self.os_release = os_release
+        self._by_index: Dict[int, GrubKernel] = {kernel.index: kernel for kernel in kernels}
+        self._by_path: Dict[str, GrubKernel] = dict()
+        for kernel in kernels:
+            self._by_path.setdefault(kernel.kernel, kernel)
+
+    @classmethod
+    def from_output(cls, output: str) -> "GrubInventory":
+        """
+        Parse the output of COLLECT_CMD
+
+        :param output: command output
+        :return: GrubInventory object
+        :raise: content_exceptions.TestFail if the output has no grubby section markers
+        """
+        markers = [cls.DEFAULT_INDEX_MARKER, cls.CURRENT_KERNEL_MARKER, cls.OS_RELEASE_MARKER]
+        sections: List[str] = list()
+        remainder: str = output
+        for marker in markers:
+            if marker not in remainder:
+                raise content_exceptions.TestFail(f"Unable to get the grub inventory, '{marker}' is missing "
+                                                  f"in the command output")
+            section, remainder = remainder.split(marker, 1)
+            sections.append(section)
+        sections.append(remainder)
+        grubby_info, default_index, current_kernel, os_release = sections
+        default_index = default_index.strip()
+        return cls(cls.parse_grubby_info(grubby_info), int(default_index) if default_index.isdigit() else None,
+                   current_kernel.strip(), cls.parse_os_release(os_release))
+
+    @classmethod
+    def parse_grubby_info(cls, output: str) -> List[GrubKernel]:
+        """
+        Parse the output of grubby --info into kernel entries, the entries without a kernel are skipped
+
+        :param output: grubby --info output
+        :return: list of GrubKernel
+        """
+        entries: List[Dict[str, str]] = list()
+        for line in output.splitlines():
+            if "=" not in line:
+                continue
+            key, value = line.strip().split("=", 1)
+            if key == "index" or not entries:
+                entries.append(dict())
+            entries[-1][key] = value
+        kernels: List[GrubKernel] = list()
+        for info in entries:
+            if "kernel" not in info or not info.get("index", "").isdigit():
+                continue
+            kernel_path = info["kernel"].strip('"')
+            version = kernel_path.split(cls.KERNEL_PATH_PREFIX, 1)[-1]
+            kernels.append(GrubKernel(int(info["index"]), kernel_path, version, info.get("args", "").strip('"'),
+                                      info.get("title", "").strip('"'), info))
+        return kernels
+
+    @staticmethod
+    def parse_os_release(output: str) -> Dict[str, str]:
+        """
+        Parse the /etc/os-release key value pairs
+
+        :param output: content of /etc/os-release
+        :return: dict of the values without quotes
+        """
+        os_release: Dict[str, str] = dict()
+        for line in output.splitlines():
+            if "=" in line and not line.lstrip().startswith("#"):
+                key, value = line.strip().split("=", 1)
+                os_release[key] = value.strip('"').strip("'")
+        return os_release
+
+    def get_kernel_by_index(self, index: Union[str, int]) -> Optional[GrubKernel]:
+        """Get the kernel entry of the grub index, None if there is no such entry"""
+        return self._by_index.get(int(index))
+
+    def get_kernel_by_path(self, kernel: str) -> Optional[GrubKernel]:
+        """Get the first kernel entry of a kernel version or /boot/vmlinuz path, None if there is no such entry"""
+        if self.KERNEL_PATH_PREFIX not in kernel:
+            kernel = self.KERNEL_PATH_PREFIX + kernel
+        return self._by_path.get(kernel)
+
+    def find_kernels(self, version: str) -> List[GrubKernel]:
+        """Get the kernel entries with the version substring in their kernel path, in index order"""
+        return [kernel for kernel in self.kernels if version in kernel.kernel]
+
+    def find_kernel(self, version: str) -> Optional[GrubKernel]:
+        """Get the first kernel entry with the version substring in its kernel path, None if there is none"""
+        kernels = self.find_kernels(version)
+        return kernels[0] if kernels else None
+
+    @property
+    def default_kernel(self) -> Optional[GrubKernel]:
+        """Kernel entry of the default boot index"""
+        return None if self.default_index is None else self._by_index.get(self.default_index)
+
 
 class GrubUtil(object):
     """
@@ -56,6 +191,7 @@ class GrubUtil(object):
     GRUBBY_GET_DEFAULT_BOOT_KERNEL_CMD = "grubby --default-index"
     GRUBBY_ADD_ARGS_CMD = "grubby --args={} --update-kernel {}"
     GRUBBY_DELETE_ARGS_CMD = "grubby --remove-args={} --update-kernel {}"
+    GRUBBY_UPDATE_ALL_KERNELS = "ALL"
     GET_CURRENT_KERNEL_VERSION_CMD = "uname -r"
     BASE_KERNEL = "x86_64"
     INTEL_NEXT_KERNEL = "intel-next"
@@ -73,6 +209,29 @@ class GrubUtil(object):
         self._common_content_lib = common_content_lib
         self._command_timeout = int(self._common_content_conf.get_command_timeout())
         self._reboot_timeout = int(self._common_content_conf.get_reboot_timeout())
+        self._grub_inventory: Optional[GrubInventory] = None
+        self._identity_probe = SutIdentityProbe.for_sut(self._log, self._common_content_lib, OperatingSystems.LINUX,
+                                                        self._command_timeout)
+
+    def get_grub_inventory(self, refresh: bool = False) -> GrubInventory:
+        """
+        Get the grub inventory of the SUT, collected by one remote command and cached until a grub modifying
+        call of this object or refresh.
+
+        :param refresh: True to collect the inventory again
+        :return: GrubInventory object
+        :raise: content_exception.TestFail if unable to get the grub inventory
+        """
+        if self._grub_inventory is None or refresh:
+            self._log.debug("Collecting grub inventory with command '{}'".format(GrubInventory.COLLECT_CMD))
+            output = self._common_content_lib.execute_sut_cmd(GrubInventory.COLLECT_CMD, "get grub inventory",
+                                                              self._command_timeout)
+            self._grub_inventory = GrubInventory.from_output(output)
+        return self._grub_inventory
+
+    def invalidate_grub_inventory(self) -> None:
+        """Drop the cached grub inventory, the next lookup collects it again"""
+        self._grub_inventory = None
 
     def __set_default_rhel_7(self, boot_option):
         """
@@ -88,16 +247,12 @@ class GrubUtil(object):
         return linux version
         :raise: content_exception.TestFail if unable to get the linux version
         """
-        get_os_info_cmd = "cat /etc/os-release"
-        version_id_re = r'(?<=VERSION_ID=)\s*(.*)'
         self._log.info("Get linux version")
-        output = self._common_content_lib.execute_sut_cmd(get_os_info_cmd, "linux os info cmd", self._command_timeout)
-        self._log.debug("Linux os command output {}".format(output))
-        value = re.search(version_id_re, output)
+        value = self._identity_probe.get_identity().os_version
         if not value:
             raise content_exceptions.TestFail("unable to get the linux version")
-        self._log.debug("Version of the linux os is {} ".format(value.group(0)))
-        return value.group(0)
+        self._log.debug("Version of the linux os is {} ".format(value))
+        return value
 
     def set_grub_boot_index(self, grub_index: Union[str, int]) -> bool:
         """
@@ -109,6 +264,7 @@ class GrubUtil(object):
         grub_set_index_cmd = f'grub2-set-default "{grub_index}"'
         self._log.debug("Set index {} as the first boot order".format(grub_index))
         set_def_out: str = self._common_content_lib.execute_sut_cmd(grub_set_index_cmd, grub_set_index_cmd, self._command_timeout)
+        self.invalidate_grub_inventory()
         if set_def_out.lower().find("error") > 0:
             # grub2-set-default can error out with a zero exit code for some reason
             self._log.error(f"Error found when setting grub boot index:\n{set_def_out}")
@@ -131,21 +287,14 @@ class GrubUtil(object):
 
         :raise: content_exception.TestFail if unable to get the kernel info
         """
-        reg_os_index = r'(?<=index=)\s*(.*)'
-        reg_kernel = r'^index(.+)\n^kernel=\".*{}'.format(kernel)
-        self._log.debug("Running grub configuration command '{}' ".format(self.GRUBBY_KERNEL_CMD))
-        command_result = self._common_content_lib.execute_sut_cmd(
-            self.GRUBBY_KERNEL_CMD, "get menuentry info", self._command_timeout)
-        self._log.debug("Grub command output {}".format(command_result))
-        if not command_result.strip():
+        inventory = self.get_grub_inventory()
+        if not inventory.kernels:
             raise content_exceptions.TestFail("Unable to get the kernel info")
-        kernel_index = re.compile(reg_kernel, re.MULTILINE).search(command_result)
-        if not kernel_index:
+        kernel_entry = inventory.find_kernel(kernel)
+        if not kernel_entry:
             raise content_exceptions.TestFail("Unable to get kernel and index info")
-        index = re.search(reg_os_index, kernel_index.group(0))
-        if not index:
-            raise content_exceptions.TestFail("Unable to get index info")
-        self.set_grub_boot_index(index.group(0))
+        self._log.debug("Kernel '{}' is at grub index {}".format(kernel_entry.kernel, kernel_entry.index))
+        self.set_grub_boot_index(kernel_entry.index)
 
     def set_default_base_kernel(self):
         """
@@ -173,10 +322,9 @@ class GrubUtil(object):
         self._log.info("Linux Flavour is : {}".format(linux_flavour))
         self._log.info("Setting +server kernel if OS is Cent OS ...")
         if linux_flavour.lower() == LinuxDistributions.CentOS.lower():
-            uname_command = "uname -r"
-            kernel_version_in_sut = self._common_content_lib.execute_sut_cmd(uname_command, uname_command,
-                                                                             self._command_timeout).strip()
-            self._log.debug("command {} output is : \n{}".format(uname_command, kernel_version_in_sut))
+            inventory = self.get_grub_inventory()
+            kernel_version_in_sut = inventory.current_kernel
+            self._log.debug("Current kernel is : \n{}".format(kernel_version_in_sut))
             try:
                 desired_kernel_version = self._common_content_conf.get_kernel_version()
             except (KeyError, AttributeError):  # if param is missing from content_configuration.xml
@@ -187,31 +335,17 @@ class GrubUtil(object):
                 self._log.warning(f"Could not find desired kernel information in content_configuration.xml file! "
                                   f"Continuing test with current kernel version: {kernel_version_in_sut}")
                 desired_kernel_version = kernel_version_in_sut
-            # Adding extra backslash to escape from a control char +
-            if "+" in desired_kernel_version:
-                desired_kernel_version = re.sub(r"\+", r"\+", desired_kernel_version)
-            reg_index_kernel = r'^index=\d\nkernel="/boot/vmlinuz-{}'.format(desired_kernel_version)
-            reg_os_index = r'(?<=index=)\s*(.*)'
-            index = None
             self._log.info("Desired Version for kernel is {}".format(desired_kernel_version))
-            server_kernel = re.findall(desired_kernel_version, kernel_version_in_sut)
-            if server_kernel:
-                self._log.info("Server already in desired kernel : {}".format(server_kernel))
+            if desired_kernel_version in kernel_version_in_sut:
+                self._log.info("Server already in desired kernel : {}".format(desired_kernel_version))
             else:
                 self._log.info("Changing the kernel to {} in Cent OS....".format(desired_kernel_version))
-                self._log.info("Running grubby configuration command '{}' ".format(self.GRUBBY_KERNEL_CMD))
-                command_result = self._common_content_lib.execute_sut_cmd(
-                    self.GRUBBY_KERNEL_CMD, "get menu entry info", self._command_timeout)
-                self._log.debug("Command output {} is: \n{}".format(self.GRUBBY_KERNEL_CMD, command_result))
-                try:
-                    kernel_index = re.compile(reg_index_kernel, re.MULTILINE).search(command_result)
-                    if kernel_index:
-                        index = (re.search(reg_os_index, kernel_index.group(0))).group(0)
-                except AttributeError:  # attribute error raised when re results return nothing
+                kernel_entry = inventory.find_kernel(GrubInventory.KERNEL_PATH_PREFIX + desired_kernel_version)
+                if not kernel_entry:
                     raise content_exceptions.TestSetupError("Failed to find desired kernel version"
                                                             "in OS.")
-                self._log.info("Kernel index :{}".format(index))
-                self.set_grub_boot_index(index)
+                self._log.info("Kernel index :{}".format(kernel_entry.index))
+                self.set_grub_boot_index(kernel_entry.index)
         else:
             self._log.info("Kernel change not required for OS : {}".format(linux_flavour))
 
@@ -222,16 +356,12 @@ class GrubUtil(object):
         return linux name
         :raise: content_exception.TestFail if unable to get the linux Name
         """
-        get_os_info_cmd = "cat /etc/os-release"
-        version_id_re = r'(?<=NAME=)\s*(.*)'
         self._log.info("Get linux Name")
-        output = self._common_content_lib.execute_sut_cmd(get_os_info_cmd, "linux os info cmd", self._command_timeout)
-        self._log.debug("Linux os command output {}".format(output))
-        value = re.search(version_id_re, output)
+        value = self._identity_probe.get_identity().os_name
         if not value:
             raise content_exceptions.TestFail("unable to get the linux Name")
-        self._log.debug("Name of the linux os is {} ".format(value.group(0)))
-        return value.group(0)
+        self._log.debug("Name of the linux os is {} ".format(value))
+        return value
 
     def get_kernel_args(self, kernel: str) -> dict:
         """Get specified kernel's boot parameters from grubby.
@@ -241,14 +371,18 @@ class GrubUtil(object):
             kernel_path = f"/boot/vmlinuz-{kernel}"
         else:
             kernel_path = kernel
-        grubby_info_kernel_cmd = self.GRUBBY_INFO_KERNEL_CMD.format(kernel_path)
-        grubby_kernel_data = self._common_content_lib.execute_sut_cmd(grubby_info_kernel_cmd, "get grubby kernel info",
-                                                                      self._command_timeout).strip()
-        grubby_kernel_data = grubby_kernel_data.split("\n")
-        grubby_data = dict()
-        for info in grubby_kernel_data:
-            info = info.split("=", 1)
-            grubby_data[info[0]] = info[1]
+        kernel_entry = self.get_grub_inventory().get_kernel_by_path(kernel_path)
+        if kernel_entry:
+            grubby_data = dict(kernel_entry.info)
+        else:
+            grubby_info_kernel_cmd = self.GRUBBY_INFO_KERNEL_CMD.format(kernel_path)
+            grubby_kernel_data = self._common_content_lib.execute_sut_cmd(
+                grubby_info_kernel_cmd, "get grubby kernel info", self._command_timeout).strip()
+            grubby_kernel_data = grubby_kernel_data.split("\n")
+            grubby_data = dict()
+            for info in grubby_kernel_data:
+                info = info.split("=", 1)
+                grubby_data[info[0]] = info[1]
         self._log.debug(f"Grubby data from OS for kernel {kernel}:")
         for key in grubby_data.keys():
             self._log.debug(f"{key}: {grubby_data[key]}")
@@ -270,24 +404,167 @@ class GrubUtil(object):
             results = self._common_content_lib.execute_sut_cmd(self.GRUBBY_ADD_ARGS_CMD.format(argument, kernel_path),
                                                                "add kernel args with grubby command",
                                                                self._command_timeout).strip()
+            self.invalidate_grub_inventory()
             if results != "":
                 raise content_exceptions.TestError(f"Failed to add param {argument} to args for kernel {kernel}!")
 
+    @staticmethod
+    def _get_kernel_args_diff(current_args: str, add: List[str], remove: List[str]) -> Tuple[Tuple, Tuple]:
+        """Get the arguments to add and to remove to get from the current kernel command line to the requested one.
+        An argument to add is skipped if it is already present with the same value, an argument to remove
+        without a value removes the argument with any value.
+        :param current_args: current kernel command line
+        :param add: arguments to add, key or key=value
+        :param remove: arguments to remove, key or key=value
+        :return: tuple of the arguments to add and tuple of the arguments to remove
+        :raise: content_exception.TestError if the current kernel command line has unbalanced quotes"""
+        try:
+            current: List[str] = shlex.split(current_args)
+        except ValueError as ex:
+            raise content_exceptions.TestError(f"Unable to parse the kernel args '{current_args}': {ex}")
+        current_keys = {arg.split("=", 1)[0] for arg in current}
+        to_add = tuple(arg for arg in add if arg not in current)
+        to_remove = tuple(arg for arg in remove if arg in current or ("=" not in arg and arg in current_keys))
+        return to_add, to_remove
+
+    def _resolve_kernels(self, inventory: GrubInventory, kernels: Iterable[Union[str, int]]) -> List[GrubKernel]:
+        """Get the kernel entries of grub indexes, kernel paths or version substrings.
+        :param inventory: grub inventory
+        :param kernels: grub indexes, kernel paths or version substrings
+        :return: kernel entries in index order without duplicates
+        :raise: content_exception.TestError if a kernel is not in the grub configuration"""
+        resolved: Dict[int, GrubKernel] = dict()
+        for kernel in kernels:
+            if isinstance(kernel, int):
+                entry = inventory.get_kernel_by_index(kernel)
+                entries = [entry] if entry else []
+            else:
+                entry = inventory.get_kernel_by_path(kernel)
+                entries = [entry] if entry else inventory.find_kernels(kernel)
+            if not entries:
+                raise content_exceptions.TestError(f"Kernel {kernel} is not in the grub configuration!")
+            for entry in entries:
+                resolved[entry.index] = entry
+        return [resolved[index] for index in sorted(resolved)]
+
+    def apply_kernel_args(self, add: Optional[List[str]] = None, remove: Optional[List[str]] = None,
+                          kernels: Optional[List[Union[str, int]]] = None) -> Dict[str, Tuple[Tuple, Tuple]]:
+        """Add and remove kernel args of several kernels in one remote command.
+        The changes are computed against the cached grub inventory, so arguments which are already in the
+        requested state are not sent, and the kernels which need the same change share one grubby call
+        with a comma separated --update-kernel list, or --update-kernel=ALL when all kernels are updated the same way.
+        :param add: arguments to add, key or key=value, an existing key gets the new value
+        :param remove: arguments to remove, key removes the argument with any value
+        :param kernels: grub indexes, kernel paths or version substrings, all kernels by default
+        :return: dict of the kernel path to the tuples of the added and removed arguments, for the changed kernels
+        :raise: content_exception.TestError if an argument is both added and removed, a kernel command line
+            can not be parsed or grubby fails"""
+        add = list(add or [])
+        remove = list(remove or [])
+        conflicts = set(add) & set(remove)
+        if conflicts:
+            raise content_exceptions.TestError(f"Kernel args {sorted(conflicts)} are both added and removed!")
+        inventory = self.get_grub_inventory()
+        entries = inventory.kernels if kernels is None else self._resolve_kernels(inventory, kernels)
+        # kernels which need the same change share one grubby call
+        groups: Dict[Tuple[Tuple, Tuple], List[GrubKernel]] = dict()
+        for entry in entries:
+            diff = self._get_kernel_args_diff(entry.args, add, remove)
+            if diff[0] or diff[1]:
+                groups.setdefault(diff, list()).append(entry)
+        if not groups:
+            self._log.debug(f"Kernel args are already up to date, add={add} remove={remove}. Nothing to do.")
+            return dict()
+
+        commands: List[str] = list()
+        for (to_add, to_remove), group in groups.items():
+            if len(group) == len(inventory.kernels):
+                target = self.GRUBBY_UPDATE_ALL_KERNELS
+            else:
+                target = ",".join(entry.kernel for entry in group)
+            command = f"grubby --update-kernel={shlex.quote(target)}"
+            if to_add:
+                command += f" --args={shlex.quote(' '.join(to_add))}"
+            if to_remove:
+                command += f" --remove-args={shlex.quote(' '.join(to_remove))}"
+            commands.append(command)
+        combined_command = " && ".join(commands)
+        self._log.debug(f"Updating kernel args with '{combined_command}'")
+        try:
+            results = self._common_content_lib.execute_sut_cmd(combined_command, "update kernel args with grubby",
+                                                               self._command_timeout).strip()
+        finally:
+            self.invalidate_grub_inventory()
+        if results != "":
+            raise content_exceptions.TestError(f"Failed to update kernel args add={add} remove={remove}: {results}")
+        return {entry.kernel: diff for diff, group in groups.items() for entry in group}
+
     def get_current_kernel_version(self) -> str:
         """Get current kernel version.
         :return: version of current kernel used in OS"""
         return self._common_content_lib.execute_sut_cmd(self.GET_CURRENT_KERNEL_VERSION_CMD,
                                                         "get current kernel command", self._command_timeout).strip()
 
+    @staticmethod
+    def _unquote_grub_word(word: str) -> str:
+        """Removes the quotes and escapes of a grub.cfg word, variables are kept as is"""
+        def unquote(match):
+            if match.group(1) is not None:
+                return match.group(1)
+            if match.group(2) is not None:
+                return grub_escape_re.sub(r"\1", match.group(2))
+            return match.group(3)
+        return grub_quote_re.sub(unquote, word)
+
+    @classmethod
+    def iter_entries(cls, config: str) -> Iterator[GrubEntry]:
+        '''Lazily yield the menu and submenu entries of a grub.cfg file in file order
+        :param config: String with data from a grub.cfg file
+        :raises SyntaxError: If the blocks of the grub.cfg file are not balanced
+        :returns: Iterator of GrubEntry, kind is either "submenu" or "menuentry"
+        '''
+        # one (kind, name) per open block, blocks which are not submenus are kept to match the closing brace
+        blocks: List[Tuple[str, str]] = list()
+        submenus: Tuple[str, ...] = tuple()
+        words: List[str] = list()
+        line_n: int = 1
+        for token in grub_token_re.finditer(config):
+            kind = token.lastgroup
+            if kind == "word":
+                words.append(token.group())
+                # quoted strings may span lines
+                line_n += token.group().count("\n")
+            elif kind == "open":
+                keyword = words[0] if words else ""
+                if keyword in ("submenu", "menuentry") and len(words) > 1:
+                    name = cls._unquote_grub_word(words[1])
+                    yield GrubEntry(keyword, name, submenus, line_n)
+                    if keyword == "submenu":
+                        submenus += (name,)
+                    blocks.append((keyword, name))
+                else:
+                    blocks.append((keyword, ""))
+                words = list()
+            elif kind == "close":
+                if not blocks:
+                    raise SyntaxError(f"Unexpected closure on line {line_n}")
+                if blocks.pop()[0] == "submenu":
+                    submenus = submenus[:-1]
+                words = list()
+            elif kind == "newline":
+                line_n += 1
+                words = list()
+            elif kind == "separator":
+                words = list()
+        if blocks:
+            raise SyntaxError(f"Unclosed '{blocks[-1][0]}' block at the end of the config")
+
     @classmethod
     def get_entries(cls, config: str) -> Dict:
         '''Get menu and submenu entries from a grub.cfg file
         :param config: String with data from a grub.cfg file
-        :raises Exception: If there's an error in the grub.cfg file
+        :raises SyntaxError: If the blocks of the grub.cfg file are not balanced
         :returns: Dictionary reflecting boot entries
-        Note: This isn't intended to be a perfect parser/tokenizer; just something that digs
-        out the names of menu and submenu entries and returns them in a dictionary reflecting
-        the structure thereof.
         '''
         # Final output. Nested dict with submenu names as keys reflecting the
         # hierarchy detailed in the config. Each level will have an 'entries'
@@ -295,52 +572,16 @@ class GrubUtil(object):
         # submenus will be their own dict with the same.
         cfg_data: Dict = dict()
         cfg_data['entries'] = list()
-        # Current submenu hierarchy. When empty, at the top level
-        submenus: List[str] = list()
-        # current submenu dict
-        curr_level: Dict = cfg_data
-        # Keeps track of open/closing braces to ensure proper parsing
-        open_cnt: int = 0
-        # indicates if the last open was a submenu or a menu entry so
-        # we know when to pop from the submenu list
-        in_sub: bool = False
-
-        for (line_n, line) in enumerate(config.splitlines()):
-            e: Union[None, Match] = entry_re.search(line)
-            if e:
-                open_cnt += 1
-                if e.group("submenu"):
-                    name: str = e.group("submenu")
-                    submenus.append(name)
-                    in_sub = True
-                    curr_level[name] = dict()
-                    curr_level = curr_level[name]
-                    curr_level['entries'] = list()
-                elif e.group("menuentry"):
-                    in_sub = False
-                    curr_level['entries'].append(e.group("menuentry"))
+        # levels[n] is the dict of the submenu at depth n, cfg_data is the top level
+        levels: List[Dict] = [cfg_data]
+        for entry in cls.iter_entries(config):
+            depth: int = len(entry.submenus)
+            del levels[depth + 1:]
+            if entry.kind == "submenu":
+                level: Dict = levels[depth].setdefault(entry.name, dict(entries=list()))
+                levels.append(level)
             else:
-                open: Union[None, Match] = open_token.search(line)
-                close: Union[None, Match] = close_token.search(line)
-                if open and close:
-                    # Configs use ${NAME} to use variables which we don't care about
-                    continue
-                elif close:
-                    open_cnt -= 1
-                    if open_cnt < 0:
-                        raise SyntaxError(f"Unexpected closure on line {line_n+1}")
-                    if in_sub:
-                        curr_level = cfg_data
-                        submenus.pop()
-                        if not submenus:
-                            in_sub = False
-                        else:
-                            for s in submenus:
-                                curr_level = curr_level[s]
-                    elif submenus:
-                        in_sub = True
-                elif open:
-                    open_cnt += 1
+                levels[depth]['entries'].append(entry.name)
 
         return cfg_data
 
@@ -363,3 +604,28 @@ class GrubUtil(object):
                 paths.extend(cls.dict_to_paths(values, _level_path=new_path))
 
         return paths
+
+
+def benchmark_get_entries(config_paths: List[str], repeat: int = 20) -> Dict[str, Dict]:
+    """Time GrubUtil.get_entries on a corpus of grub.cfg files
+    :param config_paths: paths of the grub.cfg files, e.g. copied from RHEL, CentOS and SLES SUTs
+    :param repeat: number of parses of each file
+    :return: dict of file path to the number of entries and the mean parse time in milliseconds
+    """
+    results: Dict[str, Dict] = dict()
+    for config_path in config_paths:
+        with open(config_path) as config_file:
+            config: str = config_file.read()
+        start_time: float = time.perf_counter()
+        for _ in range(repeat):
+            entries: Dict = GrubUtil.get_entries(config)
+        parse_time: float = (time.perf_counter() - start_time) * 1000 / repeat
+        results[config_path] = dict(entries=len(GrubUtil.dict_to_paths(entries)), size=len(config),
+                                    parse_time_ms=parse_time)
+    return results
+
+
+if __name__ == "__main__":
+    # usage: python grub_util.py <grub.cfg> [<grub.cfg> ...]
+    for path, result in benchmark_get_entries(sys.argv[1:]).items():
+        print(f"{path}: {result['entries']} entries, {result['size']} bytes, {result['parse_time_ms']:.3f} ms")
@@ -0,0 +1,386 @@
+#!/usr/bin/env python
+#################################################################################
+# INTEL CONFIDENTIAL
+# Copyright Intel Corporation All Rights Reserved.
+#
+# The source code contained or described herein and all documents related to
+# the source code ("Material") are owned by Intel Corporation or its suppliers
+# or licensors. Title to the Material remains with Intel Corporation or its
+# suppliers and licensors. The Material may contain trade secrets and proprietary
+# and confidential information of Intel Corporation and its suppliers and
+# licensors, and is protected by worldwide copyright and trade secret laws and
+# treaty provisions. No part of the Material may be used, copied, reproduced,
+# modified, published, uploaded, posted, transmitted, distributed, or disclosed
+# in any way without Intel's prior express written permission.
+#
+# No license under any patent, copyright, trade secret or other intellectual
+# property right is granted to or conferred upon you by disclosure or delivery
+# of the Materials, either expressly, by implication, inducement, estoppel or
+# otherwise. Any license under such intellectual property rights must be express
+# and approved by Intel in writing.
+#################################################################################
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+
+
+class LogTailer(object):
+    """
+    Follows a growing log file and fires callbacks as soon as a registered pattern appears.
+
+    Only the bytes appended since the last read are scanned, with a single compiled regex matching all the
+    registered patterns. The unfinished last line of the previous read is kept to find patterns split across
+    two reads, so the memory used does not grow with the log size. New data is waited for with inotify when the
+    inotify_simple package is available, else the file size is polled.
+    """
+    READ_SIZE = 64 * 1024
+    POLL_INTERVAL_SEC = 0.005
+    MAX_LINE_LENGTH = 4096
+
+    def __init__(self, log_file_path, log=None):
+        """
+        :param log_file_path: log file to follow, it is read from the beginning
+        :param log: log object
+        """
+        self._log_file_path = log_file_path
+        self._log = log
+        self._file = None
+        self._offset = 0
+        self._tail = ""
+        self._patterns = OrderedDict()
+        self._pattern_list = []
+        self._matched = {}
+        self._matched_lines = {}
+        self._regex = None
+        self._max_pattern_length = 0
+        self._inotify = None
+
+    def register(self, pattern, callback=None):
+        """
+        Registers a literal pattern and an optional callback which is called with the pattern and the matching
+        line the first time the pattern is found.
+
+        :param pattern: literal text to search for
+        :param callback: function taking (pattern, line)
+        :return: None
+        """
+        callbacks = self._patterns.setdefault(pattern, [])
+        if callback is not None:
+            callbacks.append(callback)
+        self._pattern_list = list(self._patterns)
+        self._regex = re.compile("|".join("({})".format(re.escape(registered)) for registered in self._pattern_list))
+        self._max_pattern_length = max(len(registered) for registered in self._patterns)
+
+    def is_matched(self, pattern):
+        """Checks if the pattern was already found in the log"""
+        return pattern in self._matched
+
+    def get_match_time(self, pattern):
+        """Gets the time.time() at which the pattern was found, None if not found yet"""
+        return self._matched.get(pattern)
+
+    def get_match_line(self, pattern):
+        """Gets the log line in which the pattern was found, None if not found yet"""
+        return self._matched_lines.get(pattern)
+
+    def read_new_data(self):
+        """
+        Reads and scans the data appended to the log file since the last read.
+
+        :return: True if new data was read else False
+        """
+        if self._file is None:
+            if not os.path.exists(self._log_file_path):
+                return False
+            self._file = open(self._log_file_path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < self._offset:
+            # log file was truncated, start over
+            self._offset = 0
+            self._tail = ""
+        if size == self._offset:
+            return False
+        self._file.seek(self._offset)
+        while True:
+            data = self._file.read(self.READ_SIZE)
+            if not data:
+                break
+            self._offset += len(data)
+            self.__scan(data.decode("utf-8", "replace"))
+        return True
+
+    def __scan(self, text):
+        """Scans the new text together with the end of the previous text for the registered patterns"""
+        if self._regex is None:
+            return
+        text = self._tail + text
+        for match in self._regex.finditer(text):
+            pattern = self._pattern_list[match.lastindex - 1]
+            if pattern in self._matched:
+                continue
+            self._matched[pattern] = time.time()
+            line_start = text.rfind("\n", 0, match.start()) + 1
+            line_end = text.find("\n", match.end())
+            line = text[line_start:line_end if line_end != -1 else len(text)]
+            self._matched_lines[pattern] = line
+            for callback in self._patterns[pattern]:
+                callback(pattern, line)
+        # keep the unfinished last line, bounded, and at least enough text to match a split pattern
+        tail_start = min(text.rfind("\n") + 1, len(text) - self._max_pattern_length + 1)
+        self._tail = text[max(tail_start, len(text) - self.MAX_LINE_LENGTH, 0):]
+
+    def wait_for_data(self, timeout):
+        """
+        Waits until the log file is modified or the timeout in seconds expires.
+
+        :param timeout: timeout in seconds
+        :return: None
+        """
+        if INotify is not None and self._inotify is None and os.path.exists(self._log_file_path):
+            try:
+                self._inotify = INotify()
+                self._inotify.add_watch(self._log_file_path, inotify_flags.MODIFY)
+            except OSError as ex:
+                if self._log:
+                    self._log.debug("inotify is not available for '{}' due to '{}', polling the log "
+                                    "file".format(self._log_file_path, ex))
+                self._inotify = False
+        if self._inotify:
+            self._inotify.read(timeout=int(max(timeout, 0) * 1000))
+        else:
+            time.sleep(min(self.POLL_INTERVAL_SEC, max(timeout, 0)))
+
+    def follow(self, timeout, until=None):
+        """
+        Follows the log file and fires the callbacks until the condition is met or the timeout expires.
+
+        :param timeout: timeout in seconds
+        :param until: function returning True to stop following, by default all registered patterns found
+        :return: True if the condition was met else False
+        """
+        if until is None:
+            until = lambda: all(pattern in self._matched for pattern in self._patterns)
+        time_end = time.time() + timeout
+        while True:
+            self.read_new_data()
+            if until():
+                return True
+            remaining_time = time_end - time.time()
+            if remaining_time <= 0:
+                return False
+            self.wait_for_data(min(remaining_time, 1))
+
+    def wait_for(self, pattern, timeout):
+        """
+        Waits until the pattern appears in the log file, a pattern found in an earlier read returns right away.
+
+        :param pattern: literal text to search for
+        :param timeout: timeout in seconds
+        :return: True if the pattern was found else False
+        """
+        if pattern not in self._patterns:
+            self.register(pattern)
+        return self.follow(timeout, until=lambda: pattern in self._matched)
+
+    def close(self):
+        """Closes the log file and the inotify watch"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._inotify:
+            self._inotify.close()
+        self._inotify = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+# Outcome of a trigger rule, latency is the time from finding the pattern to starting the action
+TriggerResult = namedtuple("TriggerResult", ["name", "pattern", "fired", "match_time", "latency", "action_duration",
+                                             "error"])
+
+
+class TriggerAbort(Exception):
+    """Raised by a trigger action to stop the trigger engine, the remaining rules are not run"""
+
+
+class TriggerRule(object):
+    """Pattern to wait for in the log and the action to run when it appears"""
+    __slots__ = ("name", "pattern", "action", "timeout", "after_previous")
+
+    def __init__(self, name, pattern, action, timeout, after_previous=True):
+        """
+        :param name: rule name used in the logs and the results
+        :param pattern: literal text to wait for
+        :param action: function taking (pattern, line) which is run when the pattern appears
+        :param timeout: time in seconds to wait for the pattern, counted from the time the rule is armed
+        :param after_previous: True to arm the rule once the previous rule fired or timed out, False to arm it
+        when the engine starts
+        """
+        self.name = name
+        self.pattern = pattern
+        self.action = action
+        self.timeout = timeout
+        self.after_previous = after_previous
+
+
+class LogTriggerEngine(object):
+    """
+    Runs a list of trigger rules against a growing log file on a single loop, e.g. AC off on one pattern, AC on
+    on the next one, capture the postcode or abort the flow on an error pattern.
+
+    Patterns are tracked from the start of the log, so a pattern which appeared before its rule was armed fires
+    the rule as soon as it is armed.
+    """
+
+    def __init__(self, log_file_path, log):
+        """
+        :param log_file_path: log file to follow
+        :param log: log object
+        """
+        self._log_file_path = log_file_path
+        self._log = log
+        self._rules = []
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._start_time = None
+        self.results = OrderedDict()
+
+    def add_rule(self, pattern, action, timeout, name=None, after_previous=True):
+        """
+        Adds a trigger rule, see TriggerRule.
+
+        :return: self to chain the calls
+        """
+        self._rules.append(TriggerRule(name or pattern, pattern, action, timeout, after_previous))
+        return self
+
+    def run(self):
+        """
+        Follows the log file and runs the trigger rules until all of them fired or timed out, a rule action
+        raised TriggerAbort or stop was called.
+
+        :return: OrderedDict of rule name to TriggerResult
+        """
+        self.results = OrderedDict()
+        start_time = time.time()
+        arm_times = {}
+        done_times = {}
+        with LogTailer(self._log_file_path, self._log) as log_tailer:
+            for rule in self._rules:
+                log_tailer.register(rule.pattern)
+            pending = list(range(len(self._rules)))
+            while pending and not self._stop_event.is_set():
+                log_tailer.read_new_data()
+                next_timeout = 1
+                for index in list(pending):
+                    rule = self._rules[index]
+                    if index not in arm_times:
+                        if rule.after_previous and index > 0:
+                            if index - 1 not in done_times:
+                                continue
+                            arm_times[index] = done_times[index - 1]
+                        else:
+                            arm_times[index] = start_time
+                    now = time.time()
+                    if log_tailer.is_matched(rule.pattern):
+                        pending.remove(index)
+                        aborted = self.__fire(rule, log_tailer)
+                        done_times[index] = time.time()
+                        if aborted:
+                            self._stop_event.set()
+                            break
+                    elif now - arm_times[index] > rule.timeout:
+                        pending.remove(index)
+                        done_times[index] = now
+                        self._log.error("Did not get the trigger '{}' in {} seconds...".format(rule.name,
+                                                                                              rule.timeout))
+                        self.results[rule.name] = TriggerResult(rule.name, rule.pattern, False, None, None, None,
+                                                                None)
+                    else:
+                        next_timeout = min(next_timeout, arm_times[index] + rule.timeout - now)
+                if pending and not self._stop_event.is_set():
+                    log_tailer.wait_for_data(max(next_timeout, 0))
+        return self.results
+
+    def __fire(self, rule, log_tailer):
+        """
+        Runs the rule action and records its result.
+
+        :return: True if the action aborted the engine else False
+        """
+        match_time = log_tailer.get_match_time(rule.pattern)
+        action_start_time = time.time()
+        self._log.info("Got the trigger '{}'...".format(rule.name))
+        error = None
+        aborted = False
+        try:
+            rule.action(rule.pattern, log_tailer.get_match_line(rule.pattern))
+        except TriggerAbort as ex:
+            self._log.error("Trigger '{}' aborted the flow due to '{}'".format(rule.name, ex))
+            error = ex
+            aborted = True
+        except Exception as ex:
+            self._log.error("Trigger '{}' action failed due to exception '{}'".format(rule.name, ex))
+            error = ex
+        action_duration = time.time() - action_start_time
+        self.results[rule.name] = TriggerResult(rule.name, rule.pattern, True, match_time,
+                                                action_start_time - match_time, action_duration, error)
+        self._log.debug("Trigger '{}' latency {:.3f}s, action took {:.3f}s".format(
+            rule.name, action_start_time - match_time, action_duration))
+        return aborted
+
+    def get_max_run_time(self):
+        """Gets the longest time in seconds the rules can wait for their patterns, without the action run times"""
+        return sum(rule.timeout for rule in self._rules)
+
+    def start(self):
+        """Runs the engine on a background thread"""
+        self._stop_event.clear()
+        self._start_time = time.time()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the engine, the rules not fired yet are not run"""
+        self._stop_event.set()
+
+    def is_alive(self):
+        """Checks if the background thread is still running"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def wait(self, action_timeout):
+        """
+        Waits for the rules not fired yet to fire or time out, at most the rule timeouts counted from the start
+        plus the action timeout.
+
+        :param action_timeout: time in seconds added for the actions to run
+        :return: True if the engine completed else False
+        """
+        if self._thread is None:
+            return True
+        deadline = self._start_time + self.get_max_run_time() + action_timeout
+        self._thread.join(max(deadline - time.time(), 0))
+        return not self._thread.is_alive()
+
+    def join(self, timeout=None):
+        """
+        Waits for the background thread to complete.
+
+        :param timeout: timeout in seconds
+        :return: OrderedDict of rule name to TriggerResult
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.results
@@ -0,0 +1,525 @@
+#!/usr/bin/env python
+#################################################################################
+# INTEL CONFIDENTIAL
+# Copyright Intel Corporation All Rights Reserved.
+#
+# The source code contained or described herein and all documents related to
+# the source code ("Material") are owned by Intel Corporation or its suppliers
+# or licensors. Title to the Material remains with Intel Corporation or its
+# suppliers and licensors. The Material may contain trade secrets and proprietary
+# and confidential information of Intel Corporation and its suppliers and
+# licensors, and is protected by worldwide copyright and trade secret laws and
+# treaty provisions. No part of the Material may be used, copied, reproduced,
+# modified, published, uploaded, posted, transmitted, distributed, or disclosed
+# in any way without Intel's prior express written permission.
+#
+# No license under any patent, copyright, trade secret or other intellectual
+# property right is granted to or conferred upon you by disclosure or delivery
+# of the Materials, either expressly, by implication, inducement, estoppel or
+# otherwise. Any license under such intellectual property rights must be express
+# and approved by Intel in writing.
+#################################################################################
+import struct
+from collections import OrderedDict, namedtuple
+
+import six
+
+# struct.unpack_from of Python 2 does not take a memoryview, a slice of a buffer is a str there
+_table_view = getattr(six.moves.builtins, "buffer") if six.PY2 else memoryview
+
+# One SMBIOS structure. formatted is a memoryview of the formatted area (header included) into the table buffer, a
+# str on Python 2, strings are the decoded strings of the string set, string number 1 is strings[0].
+SmbiosStructure = namedtuple("SmbiosStructure", ["type", "handle", "length", "formatted", "strings"])
+# Entry point of the table, version is a (major, minor) tuple
+SmbiosEntryPoint = namedtuple("SmbiosEntryPoint", ["anchor", "version", "table_offset", "table_length"])
+
+
+class SmbiosTableDecoder(object):
+    """
+    Decodes a raw SMBIOS table, as written by 'dmidecode --dump-bin' or read from /sys/firmware/dmi/tables/DMI,
+    into SmbiosStructure records and into the dict of DMIParse, keyed by the handle with the dmidecode field names
+    and values, so that the dmidecode verifications work on both.
+
+    On Python 3 the table is never copied, the structures are memoryview slices of the buffer and only the strings
+    are decoded.
+    """
+    SM3_ANCHOR = b"_SM3_"
+    SM_ANCHOR = b"_SM_"
+    DMI_ANCHOR = b"_DMI_"
+    HEADER_FORMAT = "<BBH"
+    HEADER_SIZE = 4
+    END_OF_TABLE_TYPE = 127
+    NOT_SPECIFIED = "Not Specified"
+    # version of the raw table without an entry point, only changes how the UUID is printed
+    DEFAULT_VERSION = (3, 0)
+
+    DMI_NAMES = {0: "BIOS Information", 1: "System Information", 2: "Base Board Information",
+                 3: "Chassis Information", 4: "Processor Information", 7: "Cache Information",
+                 8: "Port Connector Information", 9: "System Slot Information", 10: "On Board Device Information",
+                 11: "OEM Strings", 12: "System Configuration Options", 13: "BIOS Language Information",
+                 14: "Group Associations", 15: "System Event Log", 16: "Physical Memory Array",
+                 17: "Memory Device", 18: "32-bit Memory Error Information", 19: "Memory Array Mapped Address",
+                 20: "Memory Device Mapped Address", 24: "Hardware Security", 26: "Voltage Probe",
+                 27: "Cooling Device", 28: "Temperature Probe", 29: "Electrical Current Probe",
+                 32: "System Boot Information", 33: "64-bit Memory Error Information",
+                 38: "IPMI Device Information", 39: "System Power Supply", 40: "Additional Information",
+                 41: "Onboard Device", 42: "Management Controller Host Interface", 43: "TPM Device",
+                 127: "End Of Table"}
+
+    WAKE_UP_TYPES = ("Reserved", "Other", "Unknown", "APM Timer", "Modem Ring", "LAN Remote", "Power Switch",
+                     "PCI PME#", "AC Power Restored")
+    PROCESSOR_TYPES = (None, "Other", "Unknown", "Central Processor", "Math Processor", "DSP Processor",
+                       "Video Processor")
+    PROCESSOR_FAMILIES = {0x01: "Other", 0x02: "Unknown", 0xB3: "Xeon", 0xC6: "Core i7", 0xCD: "Core i5",
+                          0xCE: "Core i3", 0xCF: "Core i9"}
+    PROCESSOR_STATUS = {0: "Unknown", 1: "Enabled", 2: "Disabled By User", 3: "Disabled By BIOS", 4: "Idle",
+                        7: "Other"}
+    PROCESSOR_UPGRADES = (None, "Other", "Unknown", "Daughter Board", "ZIF Socket", "Replaceable Piggy Back",
+                          "None", "LIF Socket", "Slot 1", "Slot 2", "370-pin Socket", "Slot A", "Slot M",
+                          "Socket 423", "Socket A (Socket 462)", "Socket 478", "Socket 754", "Socket 940",
+                          "Socket 939", "Socket mPGA604", "Socket LGA771", "Socket LGA775", "Socket S1",
+                          "Socket AM2", "Socket F (1207)", "Socket LGA1366", "Socket G34", "Socket AM3",
+                          "Socket C32", "Socket LGA1156", "Socket LGA1567", "Socket PGA988A", "Socket BGA1288",
+                          "Socket rPGA988B", "Socket BGA1023", "Socket BGA1224", "Socket BGA1155", "Socket LGA1356",
+                          "Socket LGA2011", "Socket FS1", "Socket FS2", "Socket FM1", "Socket FM2",
+                          "Socket LGA2011-3", "Socket LGA1356-3", "Socket LGA1150", "Socket BGA1168",
+                          "Socket BGA1234", "Socket BGA1364", "Socket AM4", "Socket LGA1151", "Socket BGA1356",
+                          "Socket BGA1440", "Socket BGA1515", "Socket LGA3647-1", "Socket SP3", "Socket SP3r2",
+                          "Socket LGA2066", "Socket BGA1392", "Socket BGA1510", "Socket BGA1528", "Socket LGA4189",
+                          "Socket LGA1200", "Socket LGA4677", "Socket LGA1700")
+    ARRAY_LOCATIONS = (None, "Other", "Unknown", "System Board Or Motherboard", "ISA Add-on Card",
+                       "EISA Add-on Card", "PCI Add-on Card", "MCA Add-on Card", "PCMCIA Add-on Card",
+                       "Proprietary Add-on Card", "NuBus")
+    ARRAY_USES = (None, "Other", "Unknown", "System Memory", "Video Memory", "Flash Memory", "Non-volatile RAM",
+                  "Cache Memory")
+    ERROR_CORRECTION_TYPES = (None, "Other", "Unknown", "None", "Parity", "Single-bit ECC", "Multi-bit ECC", "CRC")
+    FORM_FACTORS = (None, "Other", "Unknown", "SIMM", "SIP", "Chip", "DIP", "ZIP", "Proprietary Card", "DIMM",
+                    "TSOP", "Row Of Chips", "RIMM", "SODIMM", "SRIMM", "FB-DIMM", "Die")
+    MEMORY_TYPES = (None, "Other", "Unknown", "DRAM", "EDRAM", "VRAM", "SRAM", "RAM", "ROM", "Flash", "EEPROM",
+                    "FEPROM", "EPROM", "CDRAM", "3DRAM", "SDRAM", "SGRAM", "RDRAM", "DDR", "DDR2", "DDR2 FB-DIMM",
+                    "Reserved", "Reserved", "Reserved", "DDR3", "FBD2", "DDR4", "LPDDR", "LPDDR2", "LPDDR3",
+                    "LPDDR4", "Logical non-volatile device", "HBM", "HBM2", "DDR5", "LPDDR5", "HBM3")
+    # memory type detail by bit, bit 0 is reserved
+    MEMORY_TYPE_DETAILS = (None, "Other", "Unknown", "Fast-paged", "Static Column", "Pseudo-static", "RAMBus",
+                           "Synchronous", "CMOS", "EDO", "Window DRAM", "Cache DRAM", "Non-Volatile",
+                           "Registered (Buffered)", "Unbuffered (Unregistered)", "LRDIMM")
+    SIZE_UNITS = ("bytes", "kB", "MB", "GB", "TB", "PB", "EB", "ZB")
+
+    def __init__(self, table, version=None):
+        """
+        :param table: bytes of the dmidecode binary dump, of the raw table or of an entry point followed by the
+        table
+        :param version: SMBIOS (major, minor) version of a raw table, read from the entry point when there is one
+        """
+        self._buffer = bytes(table)
+        self._view = _table_view(self._buffer)
+        self.entry_point = self.parse_entry_point(self._view)
+        if self.entry_point:
+            self.version = self.entry_point.version
+            self._table_offset = self.entry_point.table_offset
+            self._table_end = min(len(self._buffer), self._table_offset + self.entry_point.table_length)
+        else:
+            self.version = version or self.DEFAULT_VERSION
+            self._table_offset = 0
+            self._table_end = len(self._buffer)
+        self._structures = None
+
+    @classmethod
+    def load(cls, table_path, version=None):
+        """
+        Reads the dmidecode binary dump or the raw table from a file.
+
+        :param table_path: path of the file
+        :param version: SMBIOS version of a raw table
+        :return: SmbiosTableDecoder
+        """
+        with open(table_path, "rb") as table_file:
+            return cls(table_file.read(), version)
+
+    @classmethod
+    def parse_entry_point(cls, view):
+        """
+        Parses the 64-bit (_SM3_), 32-bit (_SM_) or legacy (_DMI_) entry point at the start of a dmidecode binary
+        dump. dmidecode writes the table right after the entry point and sets the table address to its offset.
+
+        :param view: memoryview of the dump
+        :return: SmbiosEntryPoint, None if the buffer starts with the table
+        """
+        if bytes(view[:5]) == cls.SM3_ANCHOR and len(view) >= 0x18:
+            major, minor = struct.unpack_from("<BB", view, 0x07)
+            table_length, table_offset = struct.unpack_from("<IQ", view, 0x0C)
+            return SmbiosEntryPoint(cls.SM3_ANCHOR, (major, minor), table_offset, table_length)
+        if bytes(view[:4]) == cls.SM_ANCHOR and len(view) >= 0x1F:
+            major, minor = struct.unpack_from("<BB", view, 0x06)
+            table_length, table_offset = struct.unpack_from("<HI", view, 0x16)
+            return SmbiosEntryPoint(cls.SM_ANCHOR, (major, minor), table_offset, table_length)
+        if bytes(view[:5]) == cls.DMI_ANCHOR and len(view) >= 0x0F:
+            table_length, table_offset, _, bcd_revision = struct.unpack_from("<HIHB", view, 0x06)
+            return SmbiosEntryPoint(cls.DMI_ANCHOR, (bcd_revision >> 4, bcd_revision & 0x0F), table_offset,
+                                    table_length)
+        return None
+
+    def iter_structures(self):
+        """
+        Walks the table up to the end of table structure or the end of the buffer.
+
+        :return: generator of SmbiosStructure
+        :raise RuntimeError: if a structure is truncated
+        """
+        offset = self._table_offset
+        while offset + self.HEADER_SIZE <= self._table_end:
+            struct_type, length, handle = struct.unpack_from(self.HEADER_FORMAT, self._view, offset)
+            strings_offset = offset + length
+            if length < self.HEADER_SIZE or strings_offset > self._table_end:
+                raise RuntimeError("SMBIOS structure at offset {} is truncated".format(offset))
+            strings_end = self._buffer.find(b"\x00\x00", strings_offset, self._table_end)
+            if strings_end < 0:
+                raise RuntimeError("SMBIOS structure at offset {} has no string set end".format(offset))
+            if strings_end == strings_offset:
+                strings = ()
+            else:
+                strings = tuple(string.decode("ascii", "replace") for string in
+                                self._buffer[strings_offset:strings_end].split(b"\x00"))
+            yield SmbiosStructure(struct_type, handle, length, self._view[offset:strings_offset], strings)
+            if struct_type == self.END_OF_TABLE_TYPE:
+                break
+            offset = strings_end + 2
+
+    def get_structures(self, struct_type=None):
+        """
+        Gets the structures of the table, the table is walked only once.
+
+        :param struct_type: only the structures of this SMBIOS type, all if None
+        :return: list of SmbiosStructure
+        """
+        if self._structures is None:
+            self._structures = list(self.iter_structures())
+        if struct_type is None:
+            return list(self._structures)
+        return [structure for structure in self._structures if structure.type == struct_type]
+
+    def to_dmidecode_dict(self):
+        """
+        Decodes the table into the dict DMIParse builds from the dmidecode text output: handle (e.g. 0x0001) to a
+        dict of DMIType, DMISize, DMIName and the dmidecode fields. Only the fields of the BIOS, system, processor
+        and memory structures are decoded, the other structures only have their type, size and name.
+
+        :return: OrderedDict of the handle to the fields
+        """
+        decoders = {0: self.decode_bios_information, 1: self.decode_system_information,
+                    4: self.decode_processor_information, 16: self.decode_physical_memory_array,
+                    17: self.decode_memory_device, 19: self.decode_memory_array_mapped_address,
+                    20: self.decode_memory_device_mapped_address}
+        dmi_dict = OrderedDict()
+        for structure in self.get_structures():
+            fields = OrderedDict([("DMIType", structure.type), ("DMISize", structure.length),
+                                  ("DMIName", self.get_dmi_name(structure.type))])
+            if structure.type in decoders:
+                fields.update(decoders[structure.type](structure))
+            dmi_dict["0x{:04X}".format(structure.handle)] = fields
+        return dmi_dict
+
+    @classmethod
+    def get_dmi_name(cls, struct_type):
+        """Gets the dmidecode name of the structure type"""
+        if struct_type in cls.DMI_NAMES:
+            return cls.DMI_NAMES[struct_type]
+        return "OEM-specific Type" if struct_type >= 128 else "Unknown Type"
+
+    @classmethod
+    def get_string(cls, structure, offset):
+        """
+        Gets the string referenced by the byte at the offset of the structure, as dmidecode prints it.
+
+        :return: the string, None if the structure is too short for the offset
+        """
+        number = cls.read(structure, "B", offset)
+        if number is None:
+            return None
+        if number == 0:
+            return cls.NOT_SPECIFIED
+        if number > len(structure.strings):
+            return "BAD INDEX"
+        return structure.strings[number - 1].strip()
+
+    @staticmethod
+    def read(structure, fmt, offset):
+        """
+        Reads a little endian field of the formatted area.
+
+        :return: the value, None if the structure is too short for the field
+        """
+        if offset + struct.calcsize(fmt) > structure.length:
+            return None
+        return struct.unpack_from("<" + fmt, structure.formatted, offset)[0]
+
+    @staticmethod
+    def lookup(names, value):
+        """Gets the name of an enumerated value, dmidecode prints the values out of the table as out of spec"""
+        if value is not None and 0 <= value < len(names) and names[value]:
+            return names[value]
+        return "OUT OF SPEC"
+
+    @classmethod
+    def format_size(cls, value, unit=0):
+        """
+        Formats a size like dmidecode, with the biggest unit that keeps the precision of the two biggest units.
+
+        :param value: size
+        :param unit: index of the unit of the value in SIZE_UNITS
+        """
+        parts = []
+        while value:
+            parts.append(value & 0x3FF)
+            value >>= 10
+        if not parts:
+            return "0 {}".format(cls.SIZE_UNITS[unit])
+        top = len(parts) - 1
+        if top > 0 and parts[top - 1]:
+            return "{} {}".format((parts[top] << 10) + parts[top - 1], cls.SIZE_UNITS[unit + top - 1])
+        return "{} {}".format(parts[top], cls.SIZE_UNITS[unit + top])
+
+    @staticmethod
+    def format_speed(speed, unit="MHz"):
+        """Formats a speed field, 0 is unknown"""
+        return "{} {}".format(speed, unit) if speed else "Unknown"
+
+    @staticmethod
+    def format_handle(handle):
+        """Formats a handle reference"""
+        return "0x{:04X}".format(handle)
+
+    @staticmethod
+    def format_voltage(millivolts):
+        """Formats a memory device voltage in mV like dmidecode"""
+        if not millivolts:
+            return "Unknown"
+        if millivolts % 100:
+            return "{:g} V".format(millivolts / 1000.0)
+        return "{:.1f} V".format(millivolts / 1000.0)
+
+    @staticmethod
+    def format_address(start, end, extended=False):
+        """
+        Formats the starting and the ending address of a mapped address structure.
+
+        :param start: starting address in kB, in bytes if extended
+        :param end: ending address in kB, in bytes if extended
+        :param extended: addresses of the extended fields
+        :return: (starting address, ending address, range size in bytes)
+        """
+        if extended:
+            return "0x{:016X}".format(start), "0x{:016X}".format(end), end - start + 1
+        return ("0x{:08X}{:03X}".format(start >> 2, (start & 0x3) << 10),
+                "0x{:08X}{:03X}".format(end >> 2, ((end & 0x3) << 10) + 0x3FF), (end - start + 1) << 10)
+
+    def format_uuid(self, structure, offset):
+        """Formats the UUID, the first three fields are little endian since SMBIOS 2.6"""
+        raw = bytes(structure.formatted[offset:offset + 16])
+        if raw == b"\x00" * 16:
+            return "Not Settable"
+        if raw == b"\xff" * 16:
+            return "Not Present"
+        if self.version >= (2, 6):
+            raw = raw[3::-1] + raw[5:3:-1] + raw[7:5:-1] + raw[8:]
+        digits = "".join("{:02X}".format(byte) for byte in bytearray(raw))
+        return "-".join((digits[:8], digits[8:12], digits[12:16], digits[16:20], digits[20:]))
+
+    def decode_bios_information(self, structure):
+        """Decodes the fields of a type 0 structure"""
+        fields = OrderedDict()
+        fields["Vendor"] = self.get_string(structure, 0x04)
+        fields["Version"] = self.get_string(structure, 0x05)
+        fields["Release Date"] = self.get_string(structure, 0x08)
+        segment = self.read(structure, "H", 0x06)
+        if segment:
+            fields["Address"] = "0x{:04X}0".format(segment)
+            runtime_size = (0x10000 - segment) << 4
+            fields["Runtime Size"] = "{} bytes".format(runtime_size) if runtime_size & 0x3FF else \
+                "{} kB".format(runtime_size >> 10)
+        rom_size = self.read(structure, "B", 0x09)
+        extended_rom_size = self.read(structure, "H", 0x18)
+        if rom_size == 0xFF and extended_rom_size is not None:
+            fields["ROM Size"] = self.format_size(extended_rom_size & 0x3FFF, 2 + (extended_rom_size >> 14))
+        elif rom_size is not None:
+            fields["ROM Size"] = self.format_size((rom_size + 1) << 6, 1)
+        bios_revision = (self.read(structure, "B", 0x14), self.read(structure, "B", 0x15))
+        if None not in bios_revision and bios_revision != (0xFF, 0xFF):
+            fields["BIOS Revision"] = "{}.{}".format(*bios_revision)
+        firmware_revision = (self.read(structure, "B", 0x16), self.read(structure, "B", 0x17))
+        if None not in firmware_revision and firmware_revision != (0xFF, 0xFF):
+            fields["Firmware Revision"] = "{}.{}".format(*firmware_revision)
+        return fields
+
+    def decode_system_information(self, structure):
+        """Decodes the fields of a type 1 structure"""
+        fields = OrderedDict()
+        fields["Manufacturer"] = self.get_string(structure, 0x04)
+        fields["Product Name"] = self.get_string(structure, 0x05)
+        fields["Version"] = self.get_string(structure, 0x06)
+        fields["Serial Number"] = self.get_string(structure, 0x07)
+        if structure.length >= 0x19:
+            fields["UUID"] = self.format_uuid(structure, 0x08)
+            fields["Wake-up Type"] = self.lookup(self.WAKE_UP_TYPES, self.read(structure, "B", 0x18))
+        if structure.length >= 0x1B:
+            fields["SKU Number"] = self.get_string(structure, 0x19)
+            fields["Family"] = self.get_string(structure, 0x1A)
+        return fields
+
+    def decode_processor_information(self, structure):
+        """Decodes the fields of a type 4 structure"""
+        fields = OrderedDict()
+        fields["Socket Designation"] = self.get_string(structure, 0x04)
+        fields["Type"] = self.lookup(self.PROCESSOR_TYPES, self.read(structure, "B", 0x05))
+        family = self.read(structure, "B", 0x06)
+        if family == 0xFE and structure.length >= 0x2A:
+            family = self.read(structure, "H", 0x28)
+        fields["Family"] = self.PROCESSOR_FAMILIES.get(family, "Unknown" if family is None else
+                                                       "0x{:02X}".format(family))
+        fields["Manufacturer"] = self.get_string(structure, 0x07)
+        fields["ID"] = " ".join("{:02X}".format(byte) for byte in bytearray(structure.formatted[0x08:0x10]))
+        eax = self.read(structure, "I", 0x08)
+        if eax:
+            base_family = (eax >> 8) & 0x0F
+            if base_family in (0x06, 0x0F):
+                cpu_family = base_family + ((eax >> 20) & 0xFF)
+                model = (((eax >> 16) & 0x0F) << 4) + ((eax >> 4) & 0x0F)
+            else:
+                cpu_family = base_family
+                model = (eax >> 4) & 0x0F
+            fields["Signature"] = "Type {}, Family {}, Model {}, Stepping {}".format((eax >> 12) & 0x03, cpu_family,
+                                                                                    model, eax & 0x0F)
+        fields["Version"] = self.get_string(structure, 0x10)
+        voltage = self.read(structure, "B", 0x11)
+        if voltage is None:
+            fields["Voltage"] = "Unknown"
+        elif voltage & 0x80:
+            fields["Voltage"] = "{:.1f} V".format((voltage & 0x7F) / 10.0)
+        else:
+            fields["Voltage"] = " ".join(name for bit, name in enumerate(("5.0 V", "3.3 V", "2.9 V"))
+                                         if voltage & (1 << bit)) or "Unknown"
+        fields["External Clock"] = self.format_speed(self.read(structure, "H", 0x12))
+        fields["Max Speed"] = self.format_speed(self.read(structure, "H", 0x14))
+        fields["Current Speed"] = self.format_speed(self.read(structure, "H", 0x16))
+        status = self.read(structure, "B", 0x18)
+        fields["Status"] = "Populated, {}".format(self.PROCESSOR_STATUS.get(status & 0x07, "OUT OF SPEC")) \
+            if status is not None and status & 0x40 else "Unpopulated"
+        fields["Upgrade"] = self.lookup(self.PROCESSOR_UPGRADES, self.read(structure, "B", 0x19))
+        if structure.length >= 0x20:
+            for level, offset in ((1, 0x1A), (2, 0x1C), (3, 0x1E)):
+                handle = self.read(structure, "H", offset)
+                fields["L{} Cache Handle".format(level)] = "Not Provided" if handle == 0xFFFF else \
+                    self.format_handle(handle)
+        if structure.length >= 0x23:
+            fields["Serial Number"] = self.get_string(structure, 0x20)
+            fields["Asset Tag"] = self.get_string(structure, 0x21)
+            fields["Part Number"] = self.get_string(structure, 0x22)
+        for name, offset, extended_offset in (("Core Count", 0x23, 0x2A), ("Core Enabled", 0x24, 0x2C),
+                                              ("Thread Count", 0x25, 0x2E)):
+            count = self.read(structure, "B", offset)
+            if count == 0xFF and structure.length >= extended_offset + 2:
+                count = self.read(structure, "H", extended_offset)
+            if count is not None:
+                fields[name] = str(count)
+        return fields
+
+    def decode_physical_memory_array(self, structure):
+        """Decodes the fields of a type 16 structure"""
+        fields = OrderedDict()
+        fields["Location"] = self.lookup(self.ARRAY_LOCATIONS, self.read(structure, "B", 0x04))
+        fields["Use"] = self.lookup(self.ARRAY_USES, self.read(structure, "B", 0x05))
+        fields["Error Correction Type"] = self.lookup(self.ERROR_CORRECTION_TYPES, self.read(structure, "B", 0x06))
+        capacity = self.read(structure, "I", 0x07)
+        if capacity == 0x80000000 and structure.length >= 0x17:
+            fields["Maximum Capacity"] = self.format_size(self.read(structure, "Q", 0x0F))
+        else:
+            fields["Maximum Capacity"] = self.format_size(capacity, 1)
+        error_handle = self.read(structure, "H", 0x0B)
+        fields["Error Information Handle"] = {0xFFFE: "Not Provided", 0xFFFF: "No Error"}.get(
+            error_handle, self.format_handle(error_handle))
+        fields["Number Of Devices"] = str(self.read(structure, "H", 0x0D))
+        return fields
+
+    def decode_memory_device(self, structure):
+        """Decodes the fields of a type 17 structure"""
+        fields = OrderedDict()
+        fields["Array Handle"] = self.format_handle(self.read(structure, "H", 0x04))
+        error_handle = self.read(structure, "H", 0x06)
+        fields["Error Information Handle"] = {0xFFFE: "Not Provided", 0xFFFF: "No Error"}.get(
+            error_handle, self.format_handle(error_handle))
+        for name, offset in (("Total Width", 0x08), ("Data Width", 0x0A)):
+            width = self.read(structure, "H", offset)
+            fields[name] = "Unknown" if width in (0, 0xFFFF) else "{} bits".format(width)
+        size = self.read(structure, "H", 0x0C)
+        if size == 0:
+            fields["Size"] = "No Module Installed"
+        elif size == 0xFFFF:
+            fields["Size"] = "Unknown"
+        elif size == 0x7FFF and structure.length >= 0x20:
+            fields["Size"] = self.format_size(self.read(structure, "I", 0x1C) & 0x7FFFFFFF, 2)
+        else:
+            fields["Size"] = self.format_size(size & 0x7FFF, 1 if size & 0x8000 else 2)
+        fields["Form Factor"] = self.lookup(self.FORM_FACTORS, self.read(structure, "B", 0x0E))
+        device_set = self.read(structure, "B", 0x0F)
+        fields["Set"] = {0: "None", 0xFF: "Unknown"}.get(device_set, str(device_set))
+        fields["Locator"] = self.get_string(structure, 0x10)
+        fields["Bank Locator"] = self.get_string(structure, 0x11)
+        fields["Type"] = self.lookup(self.MEMORY_TYPES, self.read(structure, "B", 0x12))
+        type_detail = self.read(structure, "H", 0x13)
+        fields["Type Detail"] = " ".join(name for bit, name in enumerate(self.MEMORY_TYPE_DETAILS)
+                                         if name and type_detail & (1 << bit)) or "None"
+        if structure.length >= 0x17:
+            speed = self.read(structure, "H", 0x15)
+            if speed == 0xFFFF and structure.length >= 0x58:
+                speed = self.read(structure, "I", 0x54)
+            fields["Speed"] = self.format_speed(speed, "MT/s")
+        if structure.length >= 0x1B:
+            fields["Manufacturer"] = self.get_string(structure, 0x17)
+            fields["Serial Number"] = self.get_string(structure, 0x18)
+            fields["Asset Tag"] = self.get_string(structure, 0x19)
+            fields["Part Number"] = self.get_string(structure, 0x1A)
+        if structure.length >= 0x1C:
+            rank = self.read(structure, "B", 0x1B) & 0x0F
+            fields["Rank"] = str(rank) if rank else "Unknown"
+        if structure.length >= 0x22:
+            speed = self.read(structure, "H", 0x20)
+            if speed == 0xFFFF and structure.length >= 0x5C:
+                speed = self.read(structure, "I", 0x58)
+            fields["Configured Memory Speed"] = self.format_speed(speed, "MT/s")
+        if structure.length >= 0x28:
+            fields["Minimum Voltage"] = self.format_voltage(self.read(structure, "H", 0x22))
+            fields["Maximum Voltage"] = self.format_voltage(self.read(structure, "H", 0x24))
+            fields["Configured Voltage"] = self.format_voltage(self.read(structure, "H", 0x26))
+        return fields
+
+    def __decode_mapped_address(self, structure, extended_offset):
+        """Decodes the starting address, the ending address and the range size of a type 19 or 20 structure"""
+        start = self.read(structure, "I", 0x04)
+        end = self.read(structure, "I", 0x08)
+        extended = start == 0xFFFFFFFF and structure.length >= extended_offset + 16
+        if extended:
+            start = self.read(structure, "Q", extended_offset)
+            end = self.read(structure, "Q", extended_offset + 8)
+        start_address, end_address, range_size = self.format_address(start, end, extended)
+        return OrderedDict([("Starting Address", start_address), ("Ending Address", end_address),
+                            ("Range Size", self.format_size(range_size))])
+
+    def decode_memory_array_mapped_address(self, structure):
+        """Decodes the fields of a type 19 structure"""
+        fields = self.__decode_mapped_address(structure, 0x0F)
+        fields["Physical Array Handle"] = self.format_handle(self.read(structure, "H", 0x0C))
+        fields["Partition Width"] = str(self.read(structure, "B", 0x0E))
+        return fields
+
+    def decode_memory_device_mapped_address(self, structure):
+        """Decodes the fields of a type 20 structure"""
+        fields = self.__decode_mapped_address(structure, 0x13)
+        fields["Physical Device Handle"] = self.format_handle(self.read(structure, "H", 0x0C))
+        fields["Memory Array Mapped Address Handle"] = self.format_handle(self.read(structure, "H", 0x0E))
+        for name, offset in (("Partition Row Position", 0x10), ("Interleave Position", 0x11),
+                             ("Interleaved Data Depth", 0x12)):
+            value = self.read(structure, "B", offset)
+            # dmidecode leaves out the interleave fields of a device which is not interleaved
+            if value or offset == 0x10:
+                fields[name] = "Unknown" if value == 0xFF else str(value)
+        return fields
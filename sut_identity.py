@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+#################################################################################
+# INTEL CONFIDENTIAL
+# Copyright Intel Corporation All Rights Reserved.
+#
+# The source code contained or described herein and all documents related to
+# the source code ("Material") are owned by Intel Corporation or its suppliers
+# or licensors. Title to the Material remains with Intel Corporation or its
+# suppliers and licensors. The Material may contain trade secrets and proprietary
+# and confidential information of Intel Corporation and its suppliers and
+# licensors, and is protected by worldwide copyright and trade secret laws and
+# treaty provisions. No part of the Material may be used, copied, reproduced,
+# modified, published, uploaded, posted, transmitted, distributed, or disclosed
+# in any way without Intel's prior express written permission.
+#
+# No license under any patent, copyright, trade secret or other intellectual
+# property right is granted to or conferred upon you by disclosure or delivery
+# of the Materials, either expressly, by implication, inducement, estoppel or
+# otherwise. Any license under such intellectual property rights must be express
+# and approved by Intel in writing.
+#################################################################################
+import threading
+import weakref
+from collections import namedtuple
+
+from dtaf_core.lib.dtaf_constants import OperatingSystems
+
+# Identity of the booted SUT. boot_id changes on every boot, os_release has the key value pairs of /etc/os-release,
+# values keep their quotes as in the file
+SutIdentity = namedtuple("SutIdentity", ["boot_id", "os_name", "os_version", "os_release", "kernel", "bios_version",
+                                         "platform"])
+
+
+class SutIdentityProbe(object):
+    """
+    Collects the OS, kernel, BIOS version and platform of the SUT with one remote command and keeps them until the
+    SUT reboots.
+
+    The probe of a SUT is shared by all the utilities created with the same common content lib object, see
+    for_sut. A cached identity is read without any SUT command. The code which reboots, power cycles or flashes the
+    SUT drops it with invalidate_sut, and validate checks the boot id with one small command when a reboot may have
+    happened elsewhere.
+    """
+    SECTION_MARKER = "#sut_identity_section#"
+    PROBE_CMDS = {
+        OperatingSystems.LINUX: ["cat /proc/sys/kernel/random/boot_id", "cat /etc/os-release", "uname -r",
+                                 "dmidecode -s bios-version", "dmidecode -s system-product-name"],
+        OperatingSystems.WINDOWS: ["wmic os get lastbootuptime", "wmic os get caption,version /value", "ver",
+                                   "wmic bios get smbiosbiosversion", "wmic computersystem get model"]
+    }
+    CMD_SEPARATORS = {
+        OperatingSystems.LINUX: "; ",
+        OperatingSystems.WINDOWS: " & "
+    }
+    _probes = weakref.WeakKeyDictionary()
+    _probes_lock = threading.Lock()
+
+    def __init__(self, log, common_content_lib, os_type, command_timeout):
+        """
+        :param log: log object
+        :param common_content_lib: common content lib object to execute the SUT commands
+        :param os_type: OS type of the SUT, OperatingSystems.LINUX or OperatingSystems.WINDOWS
+        :param command_timeout: timeout of the SUT commands in seconds
+        :raise: KeyError if the OS type is not supported
+        """
+        if os_type not in self.PROBE_CMDS:
+            raise KeyError("SUT identity probe does not currently support " + str(os_type))
+        self._log = log
+        self._common_content_lib = common_content_lib
+        self._os_type = os_type
+        self._command_timeout = command_timeout
+        self._identity = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_sut(cls, log, common_content_lib, os_type, command_timeout):
+        """
+        Gets the probe shared by all the utilities of the SUT.
+
+        :param log: log object
+        :param common_content_lib: common content lib object of the SUT
+        :param os_type: OS type of the SUT
+        :param command_timeout: timeout of the SUT commands in seconds
+        :return: SutIdentityProbe object
+        """
+        with cls._probes_lock:
+            probes = cls._probes.setdefault(common_content_lib, {})
+            if os_type not in probes:
+                probes[os_type] = cls(log, common_content_lib, os_type, command_timeout)
+            return probes[os_type]
+
+    def __execute(self, cmds, description):
+        """Executes the commands in one remote command and splits the output in one section per command"""
+        separator = self.CMD_SEPARATORS[self._os_type]
+        cmd = separator.join("{}{}echo {}".format(cmd, separator, self.SECTION_MARKER) for cmd in cmds)
+        output = self._common_content_lib.execute_sut_cmd(cmd, description, self._command_timeout)
+        sections = output.split(self.SECTION_MARKER)
+        if len(sections) < len(cmds):
+            raise RuntimeError("Could not find the {} sections in the output '{}'".format(description, output))
+        return [section.strip() for section in sections[:len(cmds)]]
+
+    @staticmethod
+    def __parse_key_values(output):
+        """Parses KEY=value lines, quotes of the values are kept"""
+        values = {}
+        for line in output.splitlines():
+            if "=" in line and not line.lstrip().startswith("#"):
+                key, value = line.strip().split("=", 1)
+                values[key.strip()] = value.strip()
+        return values
+
+    @staticmethod
+    def __last_line(output):
+        """Gets the last non empty line, wmic prints the column name first"""
+        lines = [line.strip() for line in output.splitlines() if line.strip()]
+        return lines[-1] if lines else ""
+
+    def __parse(self, sections):
+        """Parses the probe sections into a SutIdentity"""
+        boot_id, os_release, kernel, bios_version, platform = sections
+        os_release = self.__parse_key_values(os_release)
+        if self._os_type == OperatingSystems.WINDOWS:
+            return SutIdentity(self.__last_line(boot_id), os_release.get("Caption"), os_release.get("Version"),
+                               os_release, self.__last_line(kernel), self.__last_line(bios_version) or None,
+                               self.__last_line(platform))
+        return SutIdentity(boot_id, os_release.get("NAME"), os_release.get("VERSION_ID"), os_release, kernel,
+                           bios_version or None, platform)
+
+    def __read_boot_id(self):
+        """Reads the boot id of the SUT"""
+        boot_id = self.__execute(self.PROBE_CMDS[self._os_type][:1], "SUT boot id")[0]
+        return self.__last_line(boot_id) if self._os_type == OperatingSystems.WINDOWS else boot_id
+
+    def get_identity(self, refresh=False):
+        """
+        Gets the identity of the SUT, collected with one SUT command when there is no cached identity.
+
+        :param refresh: True to collect the identity again
+        :return: SutIdentity
+        :raise: RuntimeError if the probe output can not be parsed
+        """
+        with self._lock:
+            if self._identity is None or refresh:
+                self._identity = self.__parse(self.__execute(self.PROBE_CMDS[self._os_type], "SUT identity"))
+                self._log.debug("SUT identity: {}".format(self._identity))
+            return self._identity
+
+    def validate(self):
+        """
+        Reads the boot id of the SUT and drops the cached identity if the SUT rebooted since it was collected.
+
+        :return: True if the cached identity is still valid, False if there is none
+        """
+        with self._lock:
+            if self._identity is not None and self.__read_boot_id() != self._identity.boot_id:
+                self._log.info("SUT rebooted since its identity was collected, dropping it")
+                self._identity = None
+            return self._identity is not None
+
+    def invalidate(self):
+        """Drops the cached identity, e.g. after flashing the SUT"""
+        with self._lock:
+            self._identity = None
+
+    @classmethod
+    def invalidate_sut(cls, common_content_lib):
+        """
+        Drops the cached identity of all the probes of the SUT, after a reboot or a power cycle of the SUT.
+
+        :param common_content_lib: common content lib object of the SUT
+        :return: None
+        """
+        with cls._probes_lock:
+            probes = list(cls._probes.get(common_content_lib, {}).values())
+        for probe in probes:
+            probe.invalidate()